@@ -0,0 +1,462 @@
+#!/usr/bin/env python3
+"""
+update_data.py のベンチマーク
+合成したボットデータで各ステージと main() 全体の所要時間・メモリを計測し、JSONで書き出す
+
+    python3 bench.py --days 90 --output bench_results.json
+    python3 bench.py --days 90 --compare bench_results.json   # 前回の結果より遅くなった箇所を表示（あれば終了コード1）
+
+計測は次の順に行う（RPC / CoinGecko / Jupiter は stub_server.py のスタブ）:
+  main:cold   状態も出力もない状態から update_data.py を別プロセスで実行
+  main:warm   入力を変えずにもう一度（変わっていないステージは飛ばされる）
+  stages:cold 各ステージの関数を同じプロセスで順に実行（tracemalloc でピークメモリも計測）
+  stages:warm 入力を変えずにもう一度
+  （最終日のログ・日報・tasks.json に追記）
+  stages:append / main:append 追記分だけの差分更新
+"""
+import argparse
+import contextlib
+import gc
+import hashlib
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from stub_server import start_stub_server
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULT_VERSION = 1
+
+TOKEN_PRICES = {'SOL': 150.0, 'WBTC': 95000.0, 'BNB': 600.0}
+TOKEN_DECIMALS = {'SOL': 9, 'USDC': 6, 'WBTC': 8, 'BNB': 8}
+PAIR_PRICES = {'BTCUSDT': 95000.0, 'BNBUSDT': 600.0, 'ETHUSDT': 3300.0, 'SOLUSDT': 150.0,
+               'TRXUSDT': 0.25, 'BCHUSDT': 450.0, 'PAXGUSDT': 2700.0, 'ZECUSDT': 60.0}
+MEMBERS = {'hikarimaru': ('👑', 'owner'), 'clawdia': ('🩶', 'manager'),
+           'talon': ('🦅', 'agent'), 'velvet': ('🌙', 'agent')}
+TASK_STATUSES = ['completed', 'completed', 'in_progress', 'pending', 'blocked']
+BASE58 = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
+
+# ─── 合成データ ───
+def signature(rng):
+    return ''.join(rng.choice(BASE58) for _ in range(88))
+
+def write_jsonl(path, records, mode='w'):
+    with open(path, mode, encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+def day_times(day, count, rng):
+    """その日の中でばらけた時刻（昇順）"""
+    start = datetime.combine(day, datetime.min.time())
+    return sorted(start + timedelta(seconds=rng.uniform(0, 86399)) for _ in range(count))
+
+def trade_records(day, count, rng):
+    """ボットの trades_*.jsonl と同じ形のスワップ記録"""
+    records = []
+    for ts in day_times(day, count, rng):
+        token = rng.choice(list(TOKEN_PRICES))
+        price = TOKEN_PRICES[token] * rng.uniform(0.9, 1.1)
+        usd = round(rng.uniform(5, 50), 2)
+        buy = rng.random() < 0.5
+        input_token, output_token = ('USDC', token) if buy else (token, 'USDC')
+        input_amount = usd if buy else usd / price
+        output_amount = usd / price if buy else usd
+        ok = rng.random() < 0.97
+        fee_lamports = rng.randint(5000, 400000)
+        records.append({
+            'timestamp': ts.isoformat() + '+09:00',
+            'unix_time': int(ts.timestamp()),
+            'signature': signature(rng),
+            'status': 'Success' if ok else 'Failed',
+            'input_token': input_token,
+            'output_token': output_token,
+            'input_amount': round(input_amount, 9),
+            'output_amount': round(output_amount, 9) if ok else 0,
+            'input_amount_raw': int(input_amount * 10 ** TOKEN_DECIMALS[input_token]),
+            'output_amount_raw': int(output_amount * 10 ** TOKEN_DECIMALS[output_token]) if ok else 0,
+            'fee_lamports': fee_lamports,
+            'fee_sol': fee_lamports / 1e9,
+            'swap_type': rng.choice(['dflow', 'aggregator']),
+            'slot': rng.randint(300000000, 400000000),
+            'block_time': int(ts.timestamp()),
+            'latency_ms': rng.uniform(0, 3000),
+            'pre_balance_sol': 0.1,
+            'post_balance_sol': 0.0999,
+            'error': '' if ok else 'Slippage tolerance exceeded',
+        })
+    return records
+
+def signal_records(day, count, pairs, rng, walk):
+    """ペアごとに count 件のシグナル（価格はランダムウォーク）"""
+    records = []
+    for pair in pairs:
+        for ts in day_times(day, count, rng):
+            walk[pair] *= rng.uniform(0.995, 1.005)
+            cci = rng.uniform(-250, 250)
+            entry = cci < -100 and rng.random() < 0.3
+            records.append({
+                'checked_at': ts.isoformat() + '+09:00',
+                'pair': pair,
+                'btc_price': round(walk[pair], 2),
+                'cci': cci,
+                'donchian_low': round(walk[pair] * 0.98, 2),
+                'in_position': rng.random() < 0.2,
+                'action': 'BUY' if entry else rng.choice(['NONE'] * 20 + ['SELL']),
+                'entry_condition_met': entry,
+                'sl_triggered': rng.random() < 0.01,
+                'donchian_triggered': rng.random() < 0.01,
+            })
+    records.sort(key=lambda r: r['checked_at'])
+    return records
+
+def grid_records(day, count, rng):
+    """グリッドBotの jgrid_*.jsonl（買い → TP/SL の繰り返し）"""
+    records = []
+    for i, ts in enumerate(day_times(day, count, rng)):
+        if i % 2 == 0:
+            records.append({'timestamp': ts.isoformat() + '+09:00', 'action': 'buy',
+                            'usdc_spent': round(rng.uniform(15, 25), 2)})
+        else:
+            records.append({'timestamp': ts.isoformat() + '+09:00',
+                            'action': 'sell_tp' if rng.random() < 0.6 else 'sell_sl'})
+    return records
+
+def report_text(day, rng):
+    """memory/YYYY-MM-DD.md の日報"""
+    lines = [f'# {day.isoformat()} メモ', '']
+    for section in rng.sample(['完了タスク', '進行中タスク', 'トレード成績', '学び・教訓', '重要決定', '翌日タスク計画'],
+                              rng.randint(2, 6)):
+        lines += [f'## {section}']
+        for _ in range(rng.randint(2, 12)):
+            pair = rng.choice(list(PAIR_PRICES))
+            lines.append(f'- {pair}: CCI({rng.randint(10, 30)}) **{rng.uniform(-50, 200):+.1f}%** '
+                         f'`backtest_{rng.randint(1, 999)}.py` [log](https://example.com/{rng.randint(1, 9999)})')
+        lines.append('')
+    return '\n'.join(lines)
+
+def task_tree(prefix, depth, breadth, rng, counter):
+    """depth 段までサブタスクが入れ子になったタスク"""
+    tasks = []
+    for i in range(1, breadth + 1):
+        counter[0] += 1
+        task = {
+            'id': f'{prefix}-{i:02d}',
+            'title': f'タスク {counter[0]}',
+            'assignee': rng.choice(list(MEMBERS)),
+            'status': rng.choice(TASK_STATUSES),
+            'priority': rng.choice(['high', 'medium', 'low']),
+            'estimated_hours': rng.choice([0.5, 1, 2, 4]),
+            'created_at': '2026-01-01T10:00:00',
+            'description': 'ベンチマーク用の合成タスク',
+            'tags': rng.sample(['strategy', 'backtest', 'infra', 'dashboard'], 2),
+        }
+        if i > 1:
+            task['depends_on'] = [f'{prefix}-{i - 1:02d}']
+        if depth > 1:
+            task['subtasks'] = task_tree(task['id'], depth - 1, breadth, rng, counter)
+        tasks.append(task)
+    return tasks
+
+def generate_dataset(root, args):
+    """root/bot, root/memory, root/tasks.json に合成データを作り、規模の概要を返す"""
+    rng = random.Random(args.seed)
+    trades_dir = os.path.join(root, 'bot', 'data', 'trades')
+    signals_dir = os.path.join(root, 'bot', 'data', 'signal_logs')
+    memory_dir = os.path.join(root, 'memory')
+    for d in (trades_dir, signals_dir, memory_dir):
+        os.makedirs(d, exist_ok=True)
+
+    end = datetime.now().date()
+    pairs = list(PAIR_PRICES)[:args.pairs]
+    walk = dict(PAIR_PRICES)
+    counts = {'trades': 0, 'signals': 0, 'grid': 0, 'reports': 0, 'tasks': 0}
+    for offset in range(args.days - 1, -1, -1):
+        day = end - timedelta(days=offset)
+        trades = trade_records(day, args.trades_per_day, rng)
+        signals = signal_records(day, args.signals_per_day, pairs, rng, walk)
+        grid = grid_records(day, args.grid_per_day, rng)
+        write_jsonl(os.path.join(trades_dir, f'trades_{day}.jsonl'), trades)
+        write_jsonl(os.path.join(signals_dir, f'signals_{day}.jsonl'), signals)
+        write_jsonl(os.path.join(trades_dir, f'jgrid_{day}.jsonl'), grid)
+        counts['trades'] += len(trades)
+        counts['signals'] += len(signals)
+        counts['grid'] += len(grid)
+    for offset in range(args.report_days - 1, -1, -1):
+        day = end - timedelta(days=offset)
+        with open(os.path.join(memory_dir, f'{day}.md'), 'w', encoding='utf-8') as f:
+            f.write(report_text(day, rng))
+        counts['reports'] += 1
+
+    counter = [0]
+    tasks = {
+        'members': {name: {'emoji': e, 'role': role} for name, (e, role) in MEMBERS.items()},
+        'projects': [{'id': f'P{p:03d}', 'name': f'プロジェクト {p}', 'status': 'active',
+                      'tasks': task_tree(f'P{p:03d}-T', args.task_depth, args.task_breadth, rng, counter)}
+                     for p in range(1, args.projects + 1)],
+    }
+    with open(os.path.join(root, 'tasks.json'), 'w', encoding='utf-8') as f:
+        json.dump(tasks, f, ensure_ascii=False, indent=2)
+    counts['tasks'] = counter[0]
+
+    trading_pairs = {pair: {'strategy': 'CCI', 'enabled': True, 'trade_symbol': pair[:-4],
+                            'cci_period': 14, 'cci_threshold': -100, 'sl_pct': 0.9, 'donchian_period': 15}
+                     for pair in pairs}
+    with open(os.path.join(root, 'bot', 'live_trader.py'), 'w', encoding='utf-8') as f:
+        f.write(f'TRADING_PAIRS = {trading_pairs!r}\n')
+    with open(os.path.join(root, 'bot', 'jupiter_grid.py'), 'w', encoding='utf-8') as f:
+        f.write('GRID_SPACING_PCT = 1.5\nTP_PCT = 1.5\nSL_PCT = 1.5\nBUDGET_USDC = 20.0\n')
+
+    total_bytes = sum(os.path.getsize(os.path.join(d, name))
+                      for d, _, names in os.walk(root) for name in names)
+    return {'end_date': end.isoformat(), 'records': counts, 'bytes': total_bytes}
+
+def append_increment(root, args):
+    """最終日のログ・日報・tasks.json に追記する（差分更新の計測用）"""
+    rng = random.Random(args.seed + 1)
+    day = datetime.now().date()
+    pairs = list(PAIR_PRICES)[:args.pairs]
+    walk = dict(PAIR_PRICES)
+    n = max(1, args.trades_per_day // 10)
+    data_dir = os.path.join(root, 'bot', 'data')
+    write_jsonl(os.path.join(data_dir, 'trades', f'trades_{day}.jsonl'), trade_records(day, n, rng), 'a')
+    write_jsonl(os.path.join(data_dir, 'signal_logs', f'signals_{day}.jsonl'),
+                signal_records(day, max(1, args.signals_per_day // 10), pairs, rng, walk), 'a')
+    write_jsonl(os.path.join(data_dir, 'trades', f'jgrid_{day}.jsonl'), grid_records(day, 2, rng), 'a')
+    with open(os.path.join(root, 'memory', f'{day}.md'), 'a', encoding='utf-8') as f:
+        f.write('\n## 追記\n- 差分更新の計測\n')
+    tasks_path = os.path.join(root, 'tasks.json')
+    with open(tasks_path, 'r', encoding='utf-8') as f:
+        tasks = json.load(f)
+    tasks['projects'][0]['tasks'][0]['status'] = 'completed'
+    with open(tasks_path, 'w', encoding='utf-8') as f:
+        json.dump(tasks, f, ensure_ascii=False, indent=2)
+
+# ─── 計測 ───
+def output_bytes(outputs):
+    """ステージ出力ファイルの合計サイズ"""
+    total = 0
+    for out in outputs:
+        path = os.path.join('data', out)
+        if not out.startswith('store:') and os.path.exists(path):
+            total += os.path.getsize(path)
+    return total
+
+def measure_stages(update_data, trace_memory, log_path):
+    """STAGES を依存順に同じプロセスで実行し、{ステージ: 計測結果}"""
+    with open(log_path, 'a', encoding='utf-8') as log, contextlib.redirect_stdout(log):
+        return _measure_stages(update_data, trace_memory)
+
+def _measure_stages(update_data, trace_memory):
+    results = {}
+    for name, stage in update_data.STAGES.items():
+        gc.collect()
+        if trace_memory:
+            tracemalloc.start()
+        started = time.perf_counter()
+        status, error = 'ok', None
+        try:
+            stage['func']()
+        except Exception as e:
+            status, error = 'error', f'{type(e).__name__}: {e}'
+        seconds = time.perf_counter() - started
+        peak = None
+        if trace_memory:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+        results[name] = {'status': status, 'seconds': round(seconds, 4), 'peak_bytes': peak,
+                         'output_bytes': output_bytes(stage['outputs'])}
+        if error:
+            results[name]['error'] = error
+    update_data.flush_states()
+    return results
+
+def run_main(workdir, env, log_path):
+    """update_data.py を別プロセスで実行し、所要時間・最大RSS・ステージ別の所要時間を返す"""
+    with open(log_path, 'a', encoding='utf-8') as log:
+        started = time.perf_counter()
+        proc = subprocess.Popen([sys.executable, os.path.join(REPO_DIR, 'update_data.py')],
+                                cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+        _, status, usage = os.wait4(proc.pid, 0)
+        seconds = time.perf_counter() - started
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    stages = {}
+    try:
+        with open(os.path.join(workdir, 'data', 'summary.json'), 'r', encoding='utf-8') as f:
+            stages = json.load(f).get('stages', {})
+    except (OSError, ValueError):
+        pass
+    return {
+        'exit_code': proc.returncode,
+        'seconds': round(seconds, 4),
+        # ru_maxrss は Linux では KiB、macOS ではバイト
+        'max_rss_bytes': usage.ru_maxrss * (1 if sys.platform == 'darwin' else 1024),
+        'stages': stages,
+    }
+
+def git_revision():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=REPO_DIR,
+                                    capture_output=True, text=True).stdout.strip())
+        return {'commit': commit, 'dirty': dirty}
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_benchmark(args):
+    root = args.keep or tempfile.mkdtemp(prefix='update_data_bench_')
+    if os.path.exists(root) and os.listdir(root):
+        raise SystemExit(f"{root} is not empty")
+    server, base_url = start_stub_server(delay=args.stub_delay)
+    env = dict(os.environ,
+               SOLANA_RPC_URL=f'{base_url}/rpc',
+               COINGECKO_URL=f'{base_url}/simple/price',
+               JUPITER_PRICE_URL=f'{base_url}/price/v2')
+    os.environ.update(env)  # 同じプロセスで import する update_data の CONFIG にも効かせる
+    cwd = os.getcwd()
+    try:
+        print(f"Generating dataset in {root} ...")
+        dataset = generate_dataset(root, args)
+        print(f"  {dataset['records']}, {dataset['bytes'] / 1e6:.1f} MB")
+
+        # update_data.py は ../bot/data などの相対パスを使うので、ワークスペース直下に作業ディレクトリを置く
+        main_dir = os.path.join(root, 'dashboard_main')
+        stages_dir = os.path.join(root, 'dashboard_stages')
+        os.makedirs(main_dir)
+        os.makedirs(stages_dir)
+        log_path = os.path.join(root, 'update_data.log')
+        results = {'main': {}, 'stages': {}}
+
+        for phase in ('cold', 'warm'):
+            print(f"main:{phase} ...")
+            results['main'][phase] = run_main(main_dir, env, log_path)
+
+        os.chdir(stages_dir)
+        sys.path.insert(0, REPO_DIR)
+        import update_data
+        update_data.ensure_output_dir()
+        for phase in ('cold', 'warm'):
+            print(f"stages:{phase} ...")
+            results['stages'][phase] = measure_stages(update_data, not args.no_memory, log_path)
+
+        append_increment(root, args)
+        print("stages:append ...")
+        results['stages']['append'] = measure_stages(update_data, not args.no_memory, log_path)
+        print("main:append ...")
+        results['main']['append'] = run_main(main_dir, env, log_path)
+    finally:
+        os.chdir(cwd)
+        server.shutdown()
+        if not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+    params = {k: getattr(args, k) for k in PARAM_KEYS}
+    return {
+        'version': RESULT_VERSION,
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'revision': git_revision(),
+        'update_data_sha256': hashlib.sha256(open(os.path.join(REPO_DIR, 'update_data.py'), 'rb').read()).hexdigest(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'params': params,
+        'dataset': dataset,
+        'memory_traced': not args.no_memory,
+        **results,
+    }
+
+# ─── 比較 ───
+def iter_metrics(result):
+    """(名前, 値) を計測値ごとに返す（比較用）"""
+    for phase, r in result.get('main', {}).items():
+        yield f'main:{phase}:seconds', r.get('seconds')
+        yield f'main:{phase}:max_rss_bytes', r.get('max_rss_bytes')
+    for phase, stages in result.get('stages', {}).items():
+        for name, r in stages.items():
+            yield f'stages:{phase}:{name}:seconds', r.get('seconds')
+            yield f'stages:{phase}:{name}:peak_bytes', r.get('peak_bytes')
+
+def compare(old, new, threshold, min_seconds, min_bytes):
+    """前回の結果より threshold 以上悪化した計測値を返す"""
+    if old.get('params') != new.get('params'):
+        print(f"⚠️  Dataset parameters differ: {old.get('params')} vs {new.get('params')}")
+    before = dict(iter_metrics(old))
+    regressions = []
+    for key, value in iter_metrics(new):
+        prev = before.get(key)
+        if value is None or not prev:
+            continue
+        floor = min_seconds if key.endswith('seconds') else min_bytes
+        if value > prev * (1 + threshold) and value - prev > floor:
+            regressions.append({'metric': key, 'before': prev, 'after': value, 'ratio': round(value / prev, 2)})
+    return regressions
+
+PARAM_KEYS = ('days', 'trades_per_day', 'signals_per_day', 'pairs', 'grid_per_day', 'report_days',
+              'projects', 'task_depth', 'task_breadth', 'seed')
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='update_data.py benchmark')
+    parser.add_argument('--days', type=int, default=30, help='トレード・シグナル・グリッドログの日数')
+    parser.add_argument('--trades-per-day', type=int, default=50)
+    parser.add_argument('--signals-per-day', type=int, default=96, help='1ペアあたり')
+    parser.add_argument('--pairs', type=int, default=3, help=f'シグナルのペア数（最大{len(PAIR_PRICES)}）')
+    parser.add_argument('--grid-per-day', type=int, default=20)
+    parser.add_argument('--report-days', type=int, default=730, help='memory/*.md の日数')
+    parser.add_argument('--projects', type=int, default=5)
+    parser.add_argument('--task-depth', type=int, default=4, help='サブタスクの入れ子の深さ')
+    parser.add_argument('--task-breadth', type=int, default=4, help='各階層のタスク数')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--stub-delay', type=float, default=0.0, help='スタブの応答遅延（秒）')
+    parser.add_argument('--no-memory', action='store_true', help='tracemalloc を使わない（時間だけを計測）')
+    parser.add_argument('--keep', metavar='DIR', help='合成データと出力をこの空ディレクトリに残す')
+    parser.add_argument('--output', default='bench_results.json', help='結果のJSON')
+    parser.add_argument('--compare', metavar='FILE', help='前回の結果と比較する')
+    parser.add_argument('--threshold', type=float, default=0.3, help='悪化とみなす増加率')
+    parser.add_argument('--min-seconds', type=float, default=0.05, help='これ未満の増加は無視')
+    parser.add_argument('--min-bytes', type=int, default=1 << 20, help='これ未満の増加は無視')
+    args = parser.parse_args(argv)
+    args.pairs = max(1, min(args.pairs, len(PAIR_PRICES)))
+    if args.keep:
+        args.keep = os.path.abspath(args.keep)
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    previous = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+
+    result = run_benchmark(args)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+
+    print(f"\n{'':24}{'seconds':>10}{'peak MB':>10}")
+    for phase, stages in result['stages'].items():
+        for name, r in stages.items():
+            peak = f"{r['peak_bytes'] / 1e6:.1f}" if r['peak_bytes'] is not None else '-'
+            mark = '' if r['status'] == 'ok' else f"  ❌ {r.get('error')}"
+            print(f"{phase + ':' + name:24}{r['seconds']:>10.3f}{peak:>10}{mark}")
+    for phase, r in result['main'].items():
+        print(f"{'main:' + phase:24}{r['seconds']:>10.3f}{r['max_rss_bytes'] / 1e6:>10.1f}"
+              f"{'' if r['exit_code'] == 0 else '  ❌ exit ' + str(r['exit_code'])}")
+    print(f"\nSaved results to {args.output}")
+
+    if previous is not None:
+        regressions = compare(previous, result, args.threshold, args.min_seconds, args.min_bytes)
+        for r in regressions:
+            print(f"  🐢 {r['metric']}: {r['before']} → {r['after']} (x{r['ratio']})")
+        if regressions:
+            sys.exit(1)
+        print("No regressions")
+
+if __name__ == '__main__':
+    main()
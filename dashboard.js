@@ -1,20 +1,36 @@
 // Dashboard State
 let dashboardData = {
     trades: [],
-    signals: [],
+    pnl: null,
+    signalManifest: null,
     wallet: null,
+    equity: null,
     tasks: [],
-    dailyReports: [],
+    dailyReports: null,
 };
 
 let signalChart = null;
 let portfolioChart = null;
+let equityChart = null;
+const loadedEtags = {};
+
+// Signal chunks (data/signals/manifest.json + per-day column chunks)
+const SIGNAL_PERIOD_MS = { '1d': 86400000, '7d': 7*86400000, '30d': 30*86400000 };
+const signalChunkCache = new Map();
+let signalPeriod = '1d';
+
+// Daily reports: daily_reports.json is an index of dates/titles; bodies live in reports/YYYY-MM.json
+const REPORT_PAGE_SIZE = 10;
+const reportMonthCache = new Map();
+const expandedReports = new Set();
+let reportLimit = REPORT_PAGE_SIZE;
 
 // Initialize
 document.addEventListener('DOMContentLoaded', async () => {
     initializeTabs();
     await loadAllData();
     setupEventListeners();
+    connectLiveUpdates();
 });
 
 // ─── Tab System ───
@@ -46,25 +62,43 @@ async function loadAllData() {
     let errors = 0;
 
     const loaders = [
-        ['wallet', './data/wallet.json'],
-        ['trades', './data/trades.json'],
-        ['signals', './data/signals.json'],
-        ['tasks', './data/tasks.json'],
-        ['dailyReports', './data/daily_reports.json'],
-        ['strategies', './data/strategies.json'],
+        ['wallet', 'wallet.json'],
+        ['equity', 'equity.json'],
+        ['trades', 'trades.json'],
+        ['pnl', 'pnl.json'],
+        ['signalManifest', 'signals/manifest.json'],
+        ['tasks', 'tasks.json'],
+        ['dailyReports', 'daily_reports.json'],
+        ['strategies', 'strategies.json'],
+        ['processes', 'processes.json'],
     ];
 
-    await Promise.all(loaders.map(async ([key, url]) => {
+    // data/manifest.json lists each file's version/ETag; unchanged files are not refetched
+    let manifest = null;
+    try {
+        const r = await fetch('./data/manifest.json', { cache: 'no-store' });
+        if (r.ok) manifest = await r.json();
+    } catch (e) {
+        console.warn('manifest load failed:', e);
+    }
+
+    await Promise.all(loaders.map(async ([key, file]) => {
+        const etag = manifest?.files?.[file]?.etag;
+        if (etag && loadedEtags[key] === etag) return;
         try {
-            const r = await fetch(url);
+            // Versioned URL lets the browser cache each version; without a manifest fall back to revalidation
+            const url = etag ? `./data/${file}?v=${encodeURIComponent(etag.replace(/"/g, ''))}` : `./data/${file}`;
+            const r = await fetch(url, etag ? {} : { cache: 'no-cache' });
             if (!r.ok) throw new Error(`HTTP ${r.status}`);
             dashboardData[key] = await r.json();
+            loadedEtags[key] = etag;
         } catch (e) {
             console.warn(`${key} load failed:`, e);
             errors++;
+            delete loadedEtags[key];
             if (key === 'tasks') dashboardData[key] = {members:{}, projects:[], statistics:{}};
-            else if (key === 'wallet') dashboardData[key] = null;
-            else if (key === 'dailyReports') dashboardData[key] = [];
+            else if (key === 'wallet' || key === 'equity' || key === 'pnl' || key === 'dailyReports' || key === 'processes') dashboardData[key] = null;
+            else if (key === 'signalManifest') dashboardData[key] = await loadLegacySignals();
             else dashboardData[key] = [];
         }
     }));
@@ -76,6 +110,7 @@ async function loadAllData() {
         updateTradesSection,
         updateSignalSection,
         updateStrategiesSection,
+        updateProcessesSection,
         updateDailyReportsSection,
     ];
     for (const fn of sections) {
@@ -85,6 +120,117 @@ async function loadAllData() {
     updateStatusIndicator('online', errors ? `接続中 (${errors}件の警告)` : '接続中');
 }
 
+// ─── Live Updates (update_data.py --serve) ───
+const LIVE_FILES = {
+    'trades.json': ['trades', [updateOverviewSection, updateTradesSection]],
+    'signals/manifest.json': ['signalManifest', [updateSignalSection]],
+    'wallet.json': ['wallet', [updateOverviewSection, updateTradesSection]],
+    'equity.json': ['equity', [updateOverviewSection]],
+    'pnl.json': ['pnl', [updateOverviewSection, updateTradesSection]],
+    'tasks.json': ['tasks', [updateTasksSection]],
+    'daily_reports.json': ['dailyReports', [updateDailyReportsSection]],
+    'strategies.json': ['strategies', [updateStrategiesSection]],
+    'processes.json': ['processes', [updateProcessesSection]],
+};
+
+function connectLiveUpdates() {
+    // Only the --serve server has /events; a plain static server fails the first connect and we stop there
+    if (!window.EventSource) return;
+    const source = new EventSource('./events');
+    let opened = false;
+    source.addEventListener('open', () => {
+        // After a reconnect we may have missed events, so resync from the manifest
+        if (opened) loadAllData();
+        opened = true;
+        updateStatusIndicator('online', '接続中 (ライブ)');
+    });
+    source.addEventListener('error', () => {
+        if (!opened) source.close();
+        else updateStatusIndicator('loading', '再接続中...');
+    });
+    const on = (event, fn) => source.addEventListener(event, e => {
+        try { fn(JSON.parse(e.data)); } catch (err) { console.warn(`${event} event failed:`, err); }
+    });
+    on('trades', applyTradesDelta);
+    on('signals', applySignalsDelta);
+    on('wallet', d => {
+        if (!d.wallet) return;
+        dashboardData.wallet = d.wallet;
+        // Fresh snapshots are also the newest raw point of the equity curve
+        const cols = dashboardData.equity?.columns;
+        if (cols && !d.wallet.stale) {
+            cols.t.push(new Date(d.wallet.timestamp).getTime());
+            cols.usd.push(d.wallet.total_usd);
+        }
+        redrawSections([updateOverviewSection, updateTradesSection]);
+    });
+    on('reload', d => reloadFiles(d.files || []));
+}
+
+function redrawSections(fns) {
+    for (const fn of new Set(fns)) {
+        try { fn(); } catch (e) { console.warn('Section error:', e); }
+    }
+}
+
+function applyTradesDelta(d) {
+    if (!Array.isArray(dashboardData.trades)) dashboardData.trades = [];
+    dashboardData.trades.push(...d.append);
+    redrawSections([updateOverviewSection, updateTradesSection]);
+}
+
+function applySignalsDelta(d) {
+    const previous = dashboardData.signalManifest;
+    if (d.manifest) dashboardData.signalManifest = d.manifest;
+    const chunks = dashboardData.signalManifest?.chunks || [];
+    for (const part of d.append) {
+        const meta = chunks.find(c => c.date === part.date);
+        const cached = meta && signalChunkCache.get(meta.file);
+        const before = previous?.chunks?.find(c => c.date === part.date);
+        // Only extend a chunk we hold in full; anything else is fetched on demand
+        if (cached && before && cached.version === signalFileVersion(before)) {
+            appendSignalColumns(cached, part);
+            cached.count = meta.count;
+            cached.version = signalFileVersion(meta);
+        }
+    }
+    redrawSections([updateSignalSection]);
+}
+
+function appendSignalColumns(chunk, part) {
+    // Delta rows use their own pair/action dictionaries; remap into the cached chunk's
+    const remap = (dict, into) => dict.map(v => {
+        if (!into.includes(v)) into.push(v);
+        return into.indexOf(v);
+    });
+    const pairs = remap(part.pairs, chunk.pairs);
+    const actions = chunk.actions ? remap(part.actions, chunk.actions) : null;
+    for (const [name, values] of Object.entries(part.columns)) {
+        if (!chunk.columns[name]) continue;
+        if (name === 'pair') chunk.columns.pair.push(...values.map(i => pairs[i]));
+        else if (name === 'action' && actions) chunk.columns.action.push(...values.map(i => actions[i]));
+        else chunk.columns[name].push(...values);
+    }
+}
+
+async function reloadFiles(files) {
+    const redraw = [];
+    await Promise.all(files.map(async file => {
+        const entry = LIVE_FILES[file];
+        if (!entry) return;
+        try {
+            const r = await fetch(`./data/${file}`, { cache: 'no-cache' });
+            if (!r.ok) throw new Error(`HTTP ${r.status}`);
+            dashboardData[entry[0]] = await r.json();
+            delete loadedEtags[entry[0]];
+            redraw.push(...entry[1]);
+        } catch (e) {
+            console.warn(`${file} reload failed:`, e);
+        }
+    }));
+    redrawSections(redraw);
+}
+
 // ─── Overview Tab ───
 function updateOverviewSection() {
     if (!dashboardData.wallet) return;
@@ -110,12 +256,17 @@ function updateOverviewSection() {
 
     // Last updated
     if (w.timestamp) {
-        document.getElementById('last-updated').textContent = `最終更新: ${fmtDateTime(w.timestamp)}`;
+        // Stale = balance or some price fell back to an older cached value
+        const note = w.stale ? ` (価格: ${fmtDateTime(w.prices_fetched_at)} 時点)` : '';
+        document.getElementById('last-updated').textContent = `最終更新: ${fmtDateTime(w.timestamp)}${note}`;
     }
 
     // Portfolio pie chart
     buildPortfolioPieChart(w);
 
+    // Equity curve (daily / 15m / raw tiers from equity.json)
+    buildEquityChart();
+
     // PnL summary
     updatePnLSummary();
 }
@@ -173,18 +324,67 @@ function buildPortfolioPieChart(w) {
     });
 }
 
+function buildEquityChart() {
+    const cols = dashboardData.equity?.columns;
+    const canvas = document.getElementById('equityChart');
+    if (!canvas || !cols?.t?.length) return;
+
+    // Thin evenly to the point budget, always keeping the latest point
+    const n = cols.t.length;
+    const step = Math.max(1, Math.ceil(n / Math.max(200, Math.floor((canvas.clientWidth || 800) / 2))));
+    const labels = [], values = [];
+    for (let i = 0; i < n; i += step) {
+        if (i + step >= n) i = n - 1;
+        labels.push(fmtDateTime(cols.t[i]));
+        values.push(cols.usd[i]);
+    }
+
+    if (equityChart) equityChart.destroy();
+    equityChart = new Chart(canvas.getContext('2d'), {
+        type: 'line',
+        data: {
+            labels,
+            datasets: [{
+                label: '総資産 (USD)',
+                data: values,
+                borderColor: '#00ff88',
+                fill: false,
+                pointRadius: 0
+            }]
+        },
+        options: {
+            responsive: true,
+            maintainAspectRatio: false,
+            plugins: {
+                legend: { display: false },
+                tooltip: { callbacks: { label: ctx => fmtCurrency(ctx.raw) } }
+            },
+            scales: {
+                x: { ticks: { color: '#888', maxTicksLimit: 8 }, grid: { color: '#333' } },
+                y: { ticks: { color: '#888', callback: v => fmtCurrency(v) }, grid: { color: '#333' } }
+            }
+        }
+    });
+}
+
 function updatePnLSummary() {
     const trades = dashboardData.trades;
     const total = trades.length;
     const success = trades.filter(t => t.status === 'Success').length;
     const rate = total > 0 ? Math.round((success / total) * 100) : 0;
-    const totalFees = trades.reduce((s, t) => s + (parseFloat(t.fee_sol) || 0), 0);
-    const solPrice = dashboardData.wallet?.sol_price_usd || 0;
+    // Realized / unrealized PnL and fees are precomputed in pnl.json
+    const totals = dashboardData.pnl?.totals;
 
     document.getElementById('total-trades').textContent = total;
     document.getElementById('successful-trades').textContent = success;
     document.getElementById('success-rate').textContent = `${rate}%`;
-    document.getElementById('total-fees').textContent = fmtCurrency(totalFees * solPrice);
+    document.getElementById('total-fees').textContent = totals ? fmtCurrency(totals.fees_usd) : '--';
+    for (const [id, value] of [['realized-pnl', totals?.realized_usd], ['unrealized-pnl', totals?.unrealized_usd]]) {
+        const el = document.getElementById(id);
+        if (!el) continue;
+        el.textContent = value != null ? `${value >= 0 ? '+' : ''}${fmtCurrency(value)}` : '--';
+        el.className = `value ${value > 0 ? 'positive' : value < 0 ? 'negative' : ''}`;
+    }
 }
 
 // ─── Tasks Tab ───
@@ -198,28 +398,37 @@ function updateTasksSection() {
 }
 
 function updateTaskStatistics() {
-    const allTasks = flattenAllTasks();
+    const stats = dashboardData.tasks.statistics || {};
+    const index = dashboardData.tasks.index;
     const today = new Date().toISOString().split('T')[0];
 
-    const hikPending = allTasks.filter(t => t.assignee === 'hikarimaru' && t.status === 'pending').length;
-    const inProgress = allTasks.filter(t => t.status === 'in_progress').length;
-    const completedToday = allTasks.filter(t => t.status === 'completed' && t.completed_at && t.completed_at.startsWith(today)).length;
+    const completedToday = (index?.by_status?.completed || [])
+        .filter(row => String(index.rows[row].completed_at || '').startsWith(today)).length;
 
-    document.getElementById('tasks-hikarimaru-pending').textContent = hikPending;
-    document.getElementById('tasks-in-progress').textContent = inProgress;
+    document.getElementById('tasks-hikarimaru-pending').textContent = stats.hikarimaru_pending ?? 0;
+    document.getElementById('tasks-in-progress').textContent = stats.status_counts?.in_progress ?? 0;
     document.getElementById('tasks-today-completed').textContent = completedToday;
 }
 
-function flattenAllTasks() {
-    const result = [];
-    function walk(tasks) {
-        for (const t of tasks) {
-            result.push(t);
-            if (t.subtasks?.length) walk(t.subtasks);
+// フィルターに一致する行とその祖先の行番号（フィルターなしは null）
+function visibleTaskRows(statusFilter, assigneeFilter) {
+    if (!statusFilter && !assigneeFilter) return null;
+    const index = dashboardData.tasks.index || {rows: [], by_status: {}, by_assignee: {}};
+    const byStatus = statusFilter ? index.by_status[statusFilter] || [] : null;
+    const byAssignee = assigneeFilter ? index.by_assignee[assigneeFilter] || [] : null;
+    let matches = byStatus || byAssignee;
+    if (byStatus && byAssignee) {
+        const assigned = new Set(byAssignee);
+        matches = byStatus.filter(row => assigned.has(row));
+    }
+    const visible = new Set();
+    for (let row of matches) {
+        while (row != null && !visible.has(row)) {
+            visible.add(row);
+            row = index.rows[row].parent;
         }
     }
-    for (const p of dashboardData.tasks.projects || []) walk(p.tasks || []);
-    return result;
+    return visible;
 }
 
 function renderProjectAccordion() {
@@ -227,10 +436,11 @@ function renderProjectAccordion() {
     const statusFilter = document.getElementById('task-status-filter')?.value || '';
     const assigneeFilter = document.getElementById('task-assignee-filter')?.value || '';
 
-    const html = dashboardData.tasks.projects.map(project => {
-        const stats = dashboardData.tasks.statistics?.projects?.find(p => p.id === project.id) || {};
-        const tasks = filterTasks(project.tasks || [], statusFilter, assigneeFilter);
-        if (tasks.length === 0 && (statusFilter || assigneeFilter)) return '';
+    const visible = visibleTaskRows(statusFilter, assigneeFilter);
+
+    const html = dashboardData.tasks.projects.map((project, i) => {
+        const stats = dashboardData.tasks.statistics?.projects?.[i] || {};
+        if (visible && !(stats.roots || []).some(row => visible.has(row))) return '';
 
         return `
             <div class="project-accordion">
@@ -245,7 +455,7 @@ function renderProjectAccordion() {
                     <div class="toggle-icon" id="toggle-${project.id}">▼</div>
                 </div>
                 <div class="project-tasks" id="project-${project.id}" style="display:none;">
-                    ${renderTaskList(tasks, 0)}
+                    ${renderTaskList(project.tasks || [], 0, visible)}
                 </div>
             </div>`;
     }).join('');
@@ -253,20 +463,11 @@ function renderProjectAccordion() {
     container.innerHTML = html || '<div class="loading">フィルター条件に一致するタスクがありません</div>';
 }
 
-function filterTasks(tasks, statusFilter, assigneeFilter) {
-    return tasks.map(t => {
-        const subs = t.subtasks?.length ? filterTasks(t.subtasks, statusFilter, assigneeFilter) : [];
-        const match = (!statusFilter || t.status === statusFilter) && (!assigneeFilter || t.assignee === assigneeFilter);
-        if (match || subs.length > 0) return {...t, subtasks: subs};
-        return null;
-    }).filter(Boolean);
-}
-
-function renderTaskList(tasks, level) {
-    return tasks.map(t => {
+function renderTaskList(tasks, level, visible) {
+    return tasks.filter(t => !visible || visible.has(t.row)).map(t => {
         const isHik = t.assignee === 'hikarimaru' && t.status === 'pending';
         const emoji = dashboardData.tasks.members?.[t.assignee]?.emoji || '❓';
-        const hasSubs = t.subtasks?.length > 0;
+        const hasSubs = (t.subtasks || []).some(s => !visible || visible.has(s.row));
 
         return `
             <div class="task-tree-item ${isHik ? 'hikarimaru-pending' : ''}" style="margin-left:${level*16}px">
@@ -292,7 +493,7 @@ function renderTaskList(tasks, level) {
                         ${t.notes?.length ? `<div class="task-detail-notes">${t.notes.map(n => `<div class="note-line"><span class="note-ts">${fmtTime(n.timestamp)}</span> ${esc(n.text)}</div>`).join('')}</div>` : ''}
                     </div>
                 </div>
-                ${hasSubs ? `<div class="subtasks-container" id="subtasks-${t.id}" style="display:none">${renderTaskList(t.subtasks, level+1)}</div>` : ''}
+                ${hasSubs ? `<div class="subtasks-container" id="subtasks-${t.id}" style="display:none">${renderTaskList(t.subtasks, level+1, visible)}</div>` : ''}
             </div>`;
     }).join('');
 }
@@ -369,32 +570,17 @@ function updateTradesSection() {
     const wallet = dashboardData.wallet;
     if (!wallet) return;
 
-    // Categorize trades
-    // Open positions = tokens we currently hold (from wallet data)
-    const openPositions = [];
-    if (wallet.wbtc_balance > 0) {
-        // Find the buy trade for WBTC
-        const wbtcBuy = trades.filter(t => t.output_token === 'WBTC' && t.status === 'Success').slice(-1)[0];
-        openPositions.push({
-            token: 'WBTC',
-            amount: wallet.wbtc_balance,
-            currentValueUsd: wallet.wbtc_value_usd,
-            entryUsd: wbtcBuy ? wbtcBuy.input_amount : null,
-            entryDate: wbtcBuy?.timestamp,
-            pnlUsd: wbtcBuy ? (wallet.wbtc_value_usd - wbtcBuy.input_amount) : null
-        });
-    }
-    if (wallet.bnb_balance > 0) {
-        const bnbBuy = trades.filter(t => t.output_token === 'BNB' && t.status === 'Success').slice(-1)[0];
-        openPositions.push({
-            token: 'BNB',
-            amount: wallet.bnb_balance,
-            currentValueUsd: wallet.bnb_value_usd,
-            entryUsd: bnbBuy ? bnbBuy.input_amount : null,
-            entryDate: bnbBuy?.timestamp,
-            pnlUsd: bnbBuy ? (wallet.bnb_value_usd - bnbBuy.input_amount) : null
-        });
-    }
+    // Open positions = tokens with remaining FIFO lots (pnl.json)
+    const openPositions = Object.entries(dashboardData.pnl?.tokens || {})
+        .filter(([, p]) => p.quantity > 0 && (p.value_usd == null || p.value_usd >= 0.01))
+        .map(([token, p]) => ({
+            token,
+            amount: p.quantity,
+            currentValueUsd: p.value_usd,
+            entryUsd: p.cost_usd,
+            entryDate: p.entry_date,
+            pnlUsd: p.unrealized_usd
+        }));
 
     // Open positions section
     const openContainer = document.getElementById('open-positions-container');
@@ -407,7 +593,7 @@ function updateTradesSection() {
                 <div class="position-card">
                     <div class="position-header">
                         <span class="position-token">${p.token}</span>
-                        <span class="position-value">${fmtCurrency(p.currentValueUsd)}</span>
+                        <span class="position-value">${p.currentValueUsd != null ? fmtCurrency(p.currentValueUsd) : '--'}</span>
                     </div>
                     <div class="position-details">
                         <span>数量: ${fmtNum(p.amount, 8)}</span>
@@ -419,10 +605,9 @@ function updateTradesSection() {
         }).join('');
     }
 
-    // Completed round-trips: buy then sell of same token
-    // For now find sell-backs (e.g. SOL→USDC after USDC→SOL)
+    // Completed round-trips: FIFO-matched sells from pnl.json, newest first
     const completedContainer = document.getElementById('completed-trades-container');
-    const roundTrips = findRoundTrips(trades, wallet);
+    const roundTrips = [...(dashboardData.pnl?.round_trips || [])].reverse();
     if (roundTrips.length === 0) {
         completedContainer.innerHTML = '<div class="no-position">完了済みトレードはまだありません</div>';
     } else {
@@ -435,8 +620,9 @@ function updateTradesSection() {
                         <span class="rt-pnl ${pnlClass}">${rt.pnl >= 0 ? '+' : ''}${fmtCurrency(rt.pnl)}</span>
                     </div>
                     <div class="rt-details">
-                        <div>買い: ${fmtCurrency(rt.buyUsd)} (${fmtDateTime(rt.buyDate)})</div>
-                        <div>売り: ${fmtCurrency(rt.sellUsd)} (${fmtDateTime(rt.sellDate)})</div>
+                        <div>買い: ${fmtCurrency(rt.buy_usd)} (${fmtDateTime(rt.buy_date)})</div>
+                        <div>売り: ${fmtCurrency(rt.sell_usd)} (${fmtDateTime(rt.sell_date)})</div>
+                        <div>数量: ${fmtNum(rt.qty, 6)} / 手数料: ${fmtNum(rt.fee_sol, 6)} SOL</div>
                     </div>
                 </div>`;
         }).join('');
@@ -446,38 +632,6 @@ function updateTradesSection() {
     updateTradeTable(trades, wallet);
 }
 
-function findRoundTrips(trades, wallet) {
-    // Match buy→sell pairs for the same token (simple FIFO)
-    const trips = [];
-    const successTrades = trades.filter(t => t.status === 'Success');
-
-    // SOL round-trip: USDC→SOL then SOL→USDC
-    const solBuys = successTrades.filter(t => t.input_token === 'USDC' && t.output_token === 'SOL');
-    const solSells = successTrades.filter(t => t.input_token === 'SOL' && t.output_token === 'USDC');
-
-    // Match pairs
-    const usedSells = new Set();
-    for (const buy of solBuys) {
-        for (let i = 0; i < solSells.length; i++) {
-            if (usedSells.has(i)) continue;
-            if (new Date(solSells[i].timestamp) > new Date(buy.timestamp)) {
-                trips.push({
-                    token: 'SOL',
-                    buyUsd: buy.input_amount,
-                    sellUsd: solSells[i].output_amount,
-                    buyDate: buy.timestamp,
-                    sellDate: solSells[i].timestamp,
-                    pnl: solSells[i].output_amount - buy.input_amount
-                });
-                usedSells.add(i);
-                break;
-            }
-        }
-    }
-
-    return trips;
-}
-
 function updateTradeTable(trades, wallet) {
     const tbody = document.getElementById('trade-table-body');
     if (trades.length === 0) {
@@ -485,16 +639,11 @@ function updateTradeTable(trades, wallet) {
         return;
     }
 
-    const solPrice = wallet?.sol_price_usd || 0;
-    const btcPrice = wallet?.btc_price_usd || 0;
-    const bnbPrice = wallet?.bnb_price_usd || 0;
-
     tbody.innerHTML = [...trades].reverse().map(t => {
         const direction = t.input_token === 'USDC' ? '🟢 買い' : '🔴 売り';
         const pair = `${t.input_token} → ${t.output_token}`;
-        const inputUsd = estimateUsd(t.input_token, t.input_amount, solPrice, btcPrice, bnbPrice);
-        const outputUsd = estimateUsd(t.output_token, t.output_amount, solPrice, btcPrice, bnbPrice);
-        const usdDisplay = t.input_token === 'USDC' ? fmtCurrency(t.input_amount) : fmtCurrency(outputUsd);
+        const outputUsd = estimateUsd(t.output_token, t.output_amount, wallet);
+        const usdDisplay = t.input_token === 'USDC' ? fmtCurrency(t.input_amount) : outputUsd != null ? fmtCurrency(outputUsd) : '--';
 
         return `
             <tr class="trade-row ${t.status === 'Success' ? 'success' : 'failed'}">
@@ -507,33 +656,110 @@ function updateTradeTable(trades, wallet) {
     }).join('');
 }
 
-function estimateUsd(token, amount, solPrice, btcPrice, bnbPrice) {
+function estimateUsd(token, amount, wallet) {
+    // wallet.prices is keyed by symbol (or mint) and covers other_tokens too; null when unpriced
     if (token === 'USDC') return amount;
-    if (token === 'SOL') return amount * solPrice;
-    if (token === 'WBTC') return amount * btcPrice;
-    if (token === 'BNB') return amount * bnbPrice;
-    return 0;
+    const legacy = { SOL: wallet?.sol_price_usd, WBTC: wallet?.btc_price_usd, BNB: wallet?.bnb_price_usd };
+    const price = wallet?.prices?.[token]?.usd ?? legacy[token];
+    return price != null ? amount * price : null;
 }
 
 // ─── Signals Tab ───
+async function loadLegacySignals() {
+    // Older updaters wrote a single signals.json; wrap it as one in-memory chunk
+    try {
+        const r = await fetch('./data/signals.json');
+        if (!r.ok) throw new Error(`HTTP ${r.status}`);
+        const rows = await r.json();
+        const chunk = toSignalChunk(rows);
+        const meta = { file: 'legacy', count: chunk.count, start: null, end: null };
+        chunk.version = signalFileVersion(meta);
+        signalChunkCache.set('legacy', chunk);
+        const latest = {};
+        for (const s of rows) latest[s.pair || 'BTCUSDT'] = s;
+        return { chunks: [meta], latest };
+    } catch (e) {
+        console.warn('signals load failed:', e);
+        return { chunks: [], latest: {} };
+    }
+}
+
+function toSignalChunk(rows) {
+    const pairs = [];
+    const columns = { t: [], pair: [], price: [], cci: [] };
+    for (const s of rows) {
+        const pair = s.pair || 'BTCUSDT';
+        if (!pairs.includes(pair)) pairs.push(pair);
+        columns.t.push(new Date(s.checked_at || s.timestamp).getTime());
+        columns.pair.push(pairs.indexOf(pair));
+        columns.price.push(s.btc_price || s.price || s.close || 0);
+        columns.cci.push(s.cci ?? s.cci_value ?? 0);
+    }
+    return { count: rows.length, pairs, columns };
+}
+
+function signalFileVersion(meta) {
+    // Content hash from the manifest; older updaters only give count/end
+    return meta.etag || `${meta.count}-${meta.end}`;
+}
+
+async function fetchSignalFile(meta) {
+    // Cached by file + content hash so rewritten chunks/series are refetched even at the same count
+    const version = signalFileVersion(meta);
+    const cached = signalChunkCache.get(meta.file);
+    if (cached && cached.version === version) return cached;
+    const r = await fetch(`./data/${meta.file}?v=${encodeURIComponent(version)}`);
+    if (!r.ok) throw new Error(`HTTP ${r.status}`);
+    const data = await r.json();
+    data.version = version;
+    signalChunkCache.set(meta.file, data);
+    return data;
+}
+
+function chartPointBudget() {
+    // About one point per 2px of chart width
+    const canvas = document.getElementById('signalChart');
+    return Math.max(200, Math.floor((canvas?.clientWidth || 800) / 2));
+}
+
+function pickSignalSeries(period, pair) {
+    // Finest downsampled series that covers the window within the point budget
+    const windowMs = SIGNAL_PERIOD_MS[period];
+    const budget = chartPointBudget();
+    const series = Object.values(dashboardData.signalManifest?.series?.[pair] || {})
+        .sort((a, b) => a.bucket_seconds - b.bucket_seconds);
+    for (const meta of series) {
+        const covers = !meta.retention_seconds || meta.retention_seconds * 1000 >= windowMs;
+        if (covers && windowMs / (meta.bucket_seconds * 1000) <= budget) return meta;
+    }
+    return series[series.length - 1] || null;
+}
+
+async function loadSignalWindow(period, pair = 'BTCUSDT') {
+    // Raw chunks when they fit the point budget, otherwise a pre-aggregated series
+    const manifest = dashboardData.signalManifest;
+    if (!manifest) return { chunks: [] };
+    const cutoff = Date.now() - SIGNAL_PERIOD_MS[period];
+    const needed = manifest.chunks.filter(c => c.end == null || c.end >= cutoff);
+    const rawCount = needed.reduce((n, c) => n + c.count, 0);
+    if (rawCount > chartPointBudget()) {
+        const meta = pickSignalSeries(period, pair);
+        if (meta) return { series: await fetchSignalFile(meta) };
+    }
+    return { chunks: await Promise.all(needed.map(fetchSignalFile)) };
+}
+
 function updateSignalSection() {
-    const signals = dashboardData.signals;
-    const wallet = dashboardData.wallet;
+    const byPair = dashboardData.signalManifest?.latest || {};
 
     // Summary - what human should care about
     const summaryEl = document.getElementById('signal-summary');
-    if (!signals.length) {
+    if (!Object.keys(byPair).length) {
         summaryEl.innerHTML = '<div class="loading">シグナルデータなし</div>';
         return;
     }
 
-    // Group by pair, show latest for each
-    const byPair = {};
-    for (const s of signals) {
-        const pair = s.pair || 'BTCUSDT';
-        byPair[pair] = s;
-    }
-
+    // Latest for each pair (precomputed in the manifest)
     let html = '<div class="signal-cards">';
     for (const [pair, s] of Object.entries(byPair)) {
         const cci = s.cci ?? s.cci_value ?? 0;
@@ -568,14 +794,14 @@ function updateSignalSection() {
     summaryEl.innerHTML = html;
 
     // Chart
-    setupSignalChart();
+    setupSignalChart().catch(e => console.warn('Signal chart error:', e));
 }
 
-function setupSignalChart() {
+async function setupSignalChart() {
+    const chartData = prepareChartData(signalPeriod, await loadSignalWindow(signalPeriod));
     const ctx = document.getElementById('signalChart').getContext('2d');
     if (signalChart) signalChart.destroy();
 
-    const chartData = prepareChartData('1d');
     signalChart = new Chart(ctx, {
         type: 'line',
         data: chartData,
@@ -605,21 +831,39 @@ function setupSignalChart() {
     });
 }
 
-function prepareChartData(period) {
-    const signals = dashboardData.signals.filter(s => (s.pair || 'BTCUSDT') === 'BTCUSDT');
-    if (!signals.length) return { labels: [], datasets: [] };
-
-    const now = new Date();
-    const ms = period === '30d' ? 30*86400000 : period === '7d' ? 7*86400000 : 86400000;
-    const cutoff = new Date(now.getTime() - ms);
-    const filtered = signals.filter(s => new Date(s.checked_at || s.timestamp) >= cutoff);
+function prepareChartData(period, data) {
+    const cutoff = Date.now() - SIGNAL_PERIOD_MS[period];
+    const labels = [], cci = [], price = [];
+
+    if (data.series) {
+        // Downsampled: close for price, last CCI in each bucket
+        const c = data.series.columns;
+        for (let i = 0; i < data.series.count; i++) {
+            if (c.t[i] < cutoff) continue;
+            labels.push(fmtTime(c.t[i]));
+            cci.push(c.cci_last[i] ?? 0);
+            price.push(c.close[i] || 0);
+        }
+    }
+    for (const chunk of data.chunks || []) {
+        const pairIdx = chunk.pairs.indexOf('BTCUSDT');
+        if (pairIdx < 0) continue;
+        const c = chunk.columns;
+        for (let i = 0; i < chunk.count; i++) {
+            if (c.pair[i] !== pairIdx || c.t[i] < cutoff) continue;
+            labels.push(fmtTime(c.t[i]));
+            cci.push(c.cci[i] ?? 0);
+            price.push(c.price[i] || 0);
+        }
+    }
+    if (!labels.length) return { labels: [], datasets: [] };
 
     return {
-        labels: filtered.map(s => fmtTime(s.checked_at || s.timestamp)),
+        labels,
         datasets: [
             {
                 label: 'CCI',
-                data: filtered.map(s => s.cci ?? s.cci_value ?? 0),
+                data: cci,
                 borderColor: '#4488ff',
                 fill: false,
                 yAxisID: 'y',
@@ -627,7 +871,7 @@ function prepareChartData(period) {
             },
             {
                 label: 'BTC Price',
-                data: filtered.map(s => s.btc_price || s.price || s.close || 0),
+                data: price,
                 borderColor: '#ffaa00',
                 fill: false,
                 yAxisID: 'y1',
@@ -687,12 +931,22 @@ function updateStrategiesSection() {
             html += `</div>`;
         } else if (s.strategy === 'GRID') {
             html += `<div class="strategy-params">`;
-            html += `<div class="param"><span>グリッド間隔</span><span>${p.grid_spacing_pct}%</span></div>`;
-            html += `<div class="param"><span>TP</span><span>${p.tp_pct}%</span></div>`;
-            html += `<div class="param"><span>SL</span><span>${p.sl_pct}%</span></div>`;
-            html += `<div class="param"><span>予算/回</span><span>$${p.budget}</span></div>`;
+            // Read from the grid bot's own config; null when it could not be read
+            html += `<div class="param"><span>グリッド間隔</span><span>${p.grid_spacing_pct != null ? p.grid_spacing_pct + '%' : '-'}</span></div>`;
+            html += `<div class="param"><span>TP</span><span>${p.tp_pct != null ? p.tp_pct + '%' : '-'}</span></div>`;
+            html += `<div class="param"><span>SL</span><span>${p.sl_pct != null ? p.sl_pct + '%' : '-'}</span></div>`;
+            html += `<div class="param"><span>予算/回</span><span>${p.budget != null ? '$' + p.budget : '-'}</span></div>`;
             html += `<div class="param"><span>取引所</span><span>${p.exchange || 'Jupiter'}</span></div>`;
             html += `</div>`;
+        } else if (Object.keys(p).length) {
+            // Other strategy types: every scalar setting as-is
+            html += `<div class="strategy-params">`;
+            for (const [k, v] of Object.entries(p)) {
+                if (v === null || typeof v !== 'object') {
+                    html += `<div class="param"><span>${esc(k)}</span><span>${esc(String(v ?? '-'))}</span></div>`;
+                }
+            }
+            html += `</div>`;
         }
         
         // Stats section
@@ -731,41 +985,126 @@ function updateStrategiesSection() {
     container.innerHTML = html;
 }
 
+const PROCESS_REASONS = {
+    no_pid_file: 'PIDファイルなし',
+    bad_pid_file: 'PIDファイル不正',
+    not_running: '停止',
+    cmdline_mismatch: '別プロセス (PID不一致)',
+    pid_reused: '別プロセス (PID再利用)',
+    unverified: '稼働中 (未検証)',
+};
+
+function fmtDuration(sec) {
+    if (sec == null) return '-';
+    const d = Math.floor(sec / 86400), h = Math.floor(sec % 86400 / 3600), m = Math.floor(sec % 3600 / 60);
+    return d ? `${d}日${h}時間` : h ? `${h}時間${m}分` : `${m}分`;
+}
+
+function updateProcessesSection() {
+    const container = document.getElementById('processes-container');
+    if (!container) return;
+
+    const processes = dashboardData.processes?.processes || [];
+    if (!processes.length) {
+        container.innerHTML = '<p class="empty-state">プロセスデータがありません</p>';
+        return;
+    }
+
+    container.innerHTML = `<div class="trade-table-container"><table class="trade-table">
+        <thead><tr><th>ボット</th><th>状態</th><th>PID</th><th>稼働時間</th><th>RSS</th><th>CPU</th></tr></thead>
+        <tbody>${processes.map(p => `
+            <tr>
+                <td>${esc(p.name)}</td>
+                <td>${p.running && p.verified ? '🟢 稼働中' : (p.running ? '🟡 ' : '⏸️ ') + (PROCESS_REASONS[p.reason] || p.reason || '')}</td>
+                <td>${p.pid ?? '-'}</td>
+                <td>${fmtDuration(p.uptime_seconds)}</td>
+                <td>${p.rss_bytes != null ? fmtNum(p.rss_bytes / 1048576, 1) + ' MB' : '-'}</td>
+                <td>${p.cpu_percent != null ? fmtNum(p.cpu_percent, 1) + '%' : '-'}</td>
+            </tr>`).join('')}
+        </tbody>
+    </table></div>`;
+}
+
 // ─── Daily Reports Tab ───
 function updateDailyReportsSection() {
     const container = document.getElementById('daily-reports-container');
     const today = new Date().toISOString().split('T')[0];
 
     // Filter out future dates
-    const reports = dashboardData.dailyReports.filter(r => r.date <= today);
+    const reports = (dashboardData.dailyReports?.reports || []).filter(r => r.date <= today);
 
     if (!reports.length) {
         container.innerHTML = '<div class="loading">日報データなし</div>';
         return;
     }
 
-    container.innerHTML = reports.slice(0, 10).map(r => `
+    const more = reports.length - reportLimit;
+    container.innerHTML = reports.slice(0, reportLimit).map(r => `
         <div class="report-item">
             <div class="report-header" onclick="toggleReport('${r.date}')">
-                <div class="report-date">${r.date}</div>
+                <div class="report-date">${r.date}<span class="report-title">${esc(r.title || '')}</span></div>
                 <div class="toggle-icon">▼</div>
             </div>
-            <div class="report-content" id="report-${r.date}">
-                ${simpleMarkdown(r.content || '')}
-            </div>
+            <div class="report-content" id="report-${r.date}" data-month="${r.month}"></div>
         </div>
-    `).join('');
+    `).join('') + (more > 0 ? `
+        <button class="chart-btn report-more" onclick="showMoreReports()">さらに表示（残り${more}件）</button>
+    ` : '');
+
+    // Re-rendering (live reload, paging) keeps the reports that were open
+    expandedReports.forEach(date => {
+        if (document.getElementById(`report-${date}`)) openReport(date);
+        else expandedReports.delete(date);
+    });
+}
+
+function showMoreReports() {
+    reportLimit += REPORT_PAGE_SIZE;
+    updateDailyReportsSection();
+}
+
+async function loadReportMonth(month) {
+    // The index carries a per-month version, so an unchanged month is served from cache
+    const meta = dashboardData.dailyReports?.months?.find(m => m.month === month);
+    if (!meta) return {};
+    const key = `${month}@${meta.version}`;
+    if (!reportMonthCache.has(key)) {
+        const promise = fetch(`./data/${meta.file}?v=${encodeURIComponent(meta.version)}`)
+            .then(r => {
+                if (!r.ok) throw new Error(`HTTP ${r.status}`);
+                return r.json();
+            })
+            .then(data => Object.fromEntries(data.reports.map(r => [r.date, r.html])));
+        promise.catch(() => reportMonthCache.delete(key));
+        reportMonthCache.set(key, promise);
+    }
+    return reportMonthCache.get(key);
+}
+
+async function openReport(date) {
+    const el = document.getElementById(`report-${date}`);
+    el.classList.add('expanded');
+    el.parentElement.querySelector('.toggle-icon').textContent = '▲';
+    if (!el.innerHTML.trim()) el.innerHTML = '<div class="loading">読み込み中...</div>';
+    try {
+        // html is rendered and sanitized by update_data.py
+        const bodies = await loadReportMonth(el.dataset.month);
+        el.innerHTML = bodies[date] ?? '<div class="loading">日報データなし</div>';
+    } catch (e) {
+        console.warn('Report load failed:', e);
+        el.innerHTML = '<div class="loading">読み込みに失敗しました</div>';
+    }
 }
 
 function toggleReport(date) {
     const el = document.getElementById(`report-${date}`);
-    const icon = el.parentElement.querySelector('.toggle-icon');
     if (el.classList.contains('expanded')) {
         el.classList.remove('expanded');
-        icon.textContent = '▼';
+        el.parentElement.querySelector('.toggle-icon').textContent = '▼';
+        expandedReports.delete(date);
     } else {
-        el.classList.add('expanded');
-        icon.textContent = '▲';
+        expandedReports.add(date);
+        openReport(date);
     }
 }
 
@@ -778,11 +1117,13 @@ function setupEventListeners() {
         document.getElementById(id)?.addEventListener('click', () => {
             document.querySelectorAll('.chart-btn').forEach(b => b.classList.remove('active'));
             document.getElementById(id).classList.add('active');
-            const period = id.replace('chart-', '');
-            if (signalChart) {
-                signalChart.data = prepareChartData(period);
-                signalChart.update();
-            }
+            signalPeriod = id.replace('chart-', '');
+            loadSignalWindow(signalPeriod).then(data => {
+                if (signalChart) {
+                    signalChart.data = prepareChartData(signalPeriod, data);
+                    signalChart.update();
+                }
+            }).catch(e => console.warn('Signal chunk load failed:', e));
         });
     });
 }
@@ -816,16 +1157,3 @@ function esc(t) { const d = document.createElement('div'); d.textContent = t; re
 function statusLabel(s) {
     return {pending:'未着手',in_progress:'進行中',completed:'完了',blocked:'ブロック'}[s] || s;
 }
-function simpleMarkdown(text) {
-    if (!text) return '';
-    return text
-        .replace(/&/g,'&amp;').replace(/</g,'&lt;').replace(/>/g,'&gt;')
-        .replace(/^### (.+)$/gm,'<h4>$1</h4>')
-        .replace(/^## (.+)$/gm,'<h3>$1</h3>')
-        .replace(/^# (.+)$/gm,'<h2>$1</h2>')
-        .replace(/\*\*(.+?)\*\*/g,'<strong>$1</strong>')
-        .replace(/^- (.+)$/gm,'<li>$1</li>')
-        .replace(/(<li>.*<\/li>)/gs,'<ul>$1</ul>')
-        .replace(/\n\n/g,'<br><br>')
-        .replace(/\n/g,'<br>');
-}
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Solana RPC / CoinGecko のローカルスタブ
+update_data.py をネットワークなしで動かすためのテスト用HTTPサーバー
+
+    python3 stub_server.py --port 8899 --delay 0.5 --fail-rate 0.2
+    SOLANA_RPC_URL=http://127.0.0.1:8899/rpc \\
+    COINGECKO_URL=http://127.0.0.1:8899/simple/price \\
+    JUPITER_PRICE_URL=http://127.0.0.1:8899/price/v2 python3 update_data.py
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+TOKEN_PROGRAM = 'TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA'
+TOKEN_2022_PROGRAM = 'TokenzQdBNbLqP5VEhdkAS6EPFLC1PHnBqCXEpPxuEb'
+SYSTEM_PROGRAM = '11111111111111111111111111111111'
+
+STUB_DATA = {
+    # wallets に無いアドレスはこの既定値を返す
+    'lamports': 85100463,
+    'token_accounts': [
+        {'mint': 'EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v', 'amount': 480.97533, 'decimals': 6},
+        {'mint': '3NZ9JMVBmGAqocybic2c7LQCJScmgsAZ6vQqTDzcqmJh', 'amount': 0.00028823, 'decimals': 8},
+    ],
+    'wallets': {
+        'BotWa11et2222222222222222222222222222222222': {
+            'lamports': 12000000,
+            'token_accounts': [
+                {'mint': 'EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v', 'amount': 25.0, 'decimals': 6},
+                {'mint': '2b1kV6DkPAnxd5ixfnxCpjxmKwqjjaYmCZfHsFu24GXo', 'amount': 12.5, 'decimals': 6,
+                 'program': TOKEN_2022_PROGRAM},
+            ],
+        },
+    },
+    # getMultipleAccounts (jsonParsed) で返すミント情報
+    'mints': {
+        'EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v': {'decimals': 6},
+        '3NZ9JMVBmGAqocybic2c7LQCJScmgsAZ6vQqTDzcqmJh': {'decimals': 8},
+        '9gP2kCy3wA1ctvYWQk75guqXuHfrEomqydHLtcTCqiLa': {'decimals': 8},
+        '2b1kV6DkPAnxd5ixfnxCpjxmKwqjjaYmCZfHsFu24GXo': {'decimals': 6, 'program': TOKEN_2022_PROGRAM,
+                                                         'name': 'PayPal USD', 'symbol': 'PYUSD'},
+    },
+    'prices': {
+        'solana': {'usd': 89.43},
+        'bitcoin': {'usd': 70293},
+        'binancecoin': {'usd': 630.02},
+    },
+    # /simple/token_price/solana（コントラクトアドレス → 価格）
+    'token_prices': {
+        '2b1kV6DkPAnxd5ixfnxCpjxmKwqjjaYmCZfHsFu24GXo': {'usd': 0.9998},
+    },
+    # Jupiter /price/v2（ミント → 価格）
+    'jupiter_prices': {
+        'So11111111111111111111111111111111111111112': '89.41',
+        '3NZ9JMVBmGAqocybic2c7LQCJScmgsAZ6vQqTDzcqmJh': '70280.5',
+        '9gP2kCy3wA1ctvYWQk75guqXuHfrEomqydHLtcTCqiLa': '629.9',
+        '2b1kV6DkPAnxd5ixfnxCpjxmKwqjjaYmCZfHsFu24GXo': '0.9997',
+    },
+}
+
+
+def token_account(entry, program=TOKEN_PROGRAM):
+    """getTokenAccountsByOwner (jsonParsed) 形式の1アカウント"""
+    raw = int(round(entry['amount'] * 10 ** entry['decimals']))
+    return {
+        'pubkey': entry.get('pubkey', entry['mint'][:32]),
+        'account': {
+            'owner': program,
+            'data': {
+                'program': 'spl-token',
+                'parsed': {
+                    'type': 'account',
+                    'info': {
+                        'mint': entry['mint'],
+                        'tokenAmount': {
+                            'amount': str(raw),
+                            'decimals': entry['decimals'],
+                            'uiAmount': entry['amount'],
+                        },
+                    },
+                },
+            },
+        },
+    }
+
+
+def wallet_data(address):
+    return STUB_DATA['wallets'].get(address, STUB_DATA)
+
+
+def account_info(pubkey):
+    """getMultipleAccounts の1要素（ミントは jsonParsed、ウォレットは lamports のみ）"""
+    mint = STUB_DATA['mints'].get(pubkey)
+    if mint:
+        program = mint.get('program', TOKEN_PROGRAM)
+        info = {'decimals': mint['decimals'], 'isInitialized': True, 'supply': '0'}
+        if mint.get('symbol'):
+            info['extensions'] = [{
+                'extension': 'tokenMetadata',
+                'state': {'mint': pubkey, 'name': mint['name'], 'symbol': mint['symbol'], 'uri': ''},
+            }]
+        return {
+            'lamports': 1461600,
+            'owner': program,
+            'data': {
+                'program': 'spl-token-2022' if program == TOKEN_2022_PROGRAM else 'spl-token',
+                'parsed': {'type': 'mint', 'info': info},
+            },
+        }
+    return {'lamports': wallet_data(pubkey)['lamports'], 'owner': SYSTEM_PROGRAM, 'data': ['', 'base64']}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+    delay = 0.0
+    fail_rate = 0.0
+    stats = {'requests': 0, 'rpc_calls': 0}
+    stats_lock = threading.Lock()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _maybe_fail(self):
+        if self.delay:
+            time.sleep(self.delay)
+        if self.fail_rate and random.random() < self.fail_rate:
+            self._send(503, {'error': 'stub failure'})
+            return True
+        return False
+
+    def _send(self, status, body):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _count(self, rpc_calls=0):
+        with self.stats_lock:
+            self.stats['requests'] += 1
+            self.stats['rpc_calls'] += rpc_calls
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == '/stats':
+            return self._send(200, self.stats)
+        self._count()
+        if self._maybe_fail():
+            return
+        query = parse_qs(url.query)
+        if url.path.endswith('/simple/price'):
+            ids = query.get('ids', [''])[0].split(',')
+            return self._send(200, {i: STUB_DATA['prices'][i] for i in ids if i in STUB_DATA['prices']})
+        if url.path.endswith('/simple/token_price/solana'):
+            addresses = query.get('contract_addresses', [''])[0].split(',')
+            prices = STUB_DATA['token_prices']
+            return self._send(200, {a.lower(): prices[a] for a in addresses if a in prices})
+        if url.path.endswith('/price/v2'):
+            ids = query.get('ids', [''])[0].split(',')
+            prices = STUB_DATA['jupiter_prices']
+            return self._send(200, {'data': {i: {'id': i, 'type': 'derivedPrice', 'price': prices[i]} if i in prices else None
+                                             for i in ids}})
+        self._send(404, {'error': 'not found'})
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        body = json.loads(self.rfile.read(length) or b'null')
+        calls = body if isinstance(body, list) else [body]
+        self._count(len(calls))
+        if self._maybe_fail():
+            return
+        results = [self.rpc(call) for call in calls]
+        self._send(200, results if isinstance(body, list) else results[0])
+
+    def rpc(self, call):
+        method = call.get('method')
+        params = call.get('params', [])
+        if method == 'getBalance':
+            result = {'context': {'slot': 1}, 'value': wallet_data(params[0])['lamports']}
+        elif method == 'getMultipleAccounts':
+            result = {'context': {'slot': 1}, 'value': [account_info(pubkey) for pubkey in params[0]]}
+        elif method == 'getTokenAccountsByOwner':
+            program = params[1].get('programId', TOKEN_PROGRAM)
+            accounts = [e for e in wallet_data(params[0])['token_accounts']
+                        if e.get('program', TOKEN_PROGRAM) == program]
+            result = {'context': {'slot': 1}, 'value': [token_account(e, program) for e in accounts]}
+        else:
+            return {'jsonrpc': '2.0', 'id': call.get('id'), 'error': {'code': -32601, 'message': 'Method not found'}}
+        return {'jsonrpc': '2.0', 'id': call.get('id'), 'result': result}
+
+
+def start_stub_server(port=0, delay=0.0, fail_rate=0.0):
+    """バックグラウンドスレッドでスタブを起動し、(server, base_url) を返す"""
+    StubHandler.delay = delay
+    StubHandler.fail_rate = fail_rate
+    server = ThreadingHTTPServer(('127.0.0.1', port), StubHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Solana RPC / CoinGecko stub server')
+    parser.add_argument('--port', type=int, default=8899)
+    parser.add_argument('--delay', type=float, default=0.0, help='レスポンス遅延（秒）')
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='503を返す確率 (0-1)')
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server(args.port, args.delay, args.fail_rate)
+    print(f"Stub listening on {base_url}")
+    print(f"  SOLANA_RPC_URL={base_url}/rpc")
+    print(f"  COINGECKO_URL={base_url}/simple/price")
+    print(f"  JUPITER_PRICE_URL={base_url}/price/v2")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
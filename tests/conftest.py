@@ -0,0 +1,28 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import update_data  # noqa: E402
+
+
+@pytest.fixture
+def workspace(tmp_path, monkeypatch):
+    """CONFIG のディレクトリと履歴ストアを一時ディレクトリに向ける"""
+    bot_data = tmp_path / 'bot' / 'data'
+    output = tmp_path / 'dashboard' / 'data'
+    for directory in (bot_data / 'trades', bot_data / 'signal_logs', output):
+        directory.mkdir(parents=True)
+    monkeypatch.setitem(update_data.CONFIG, 'BOT_DATA_DIR', str(bot_data))
+    monkeypatch.setitem(update_data.CONFIG, 'WORKSPACE_DIR', str(tmp_path))
+    monkeypatch.setitem(update_data.CONFIG, 'OUTPUT_DIR', str(output))
+    monkeypatch.setitem(update_data.CONFIG, 'STATE_DIR', str(tmp_path / 'dashboard' / '.state'))
+    monkeypatch.setitem(update_data.CONFIG, 'HISTORY_DB', str(tmp_path / 'dashboard' / '.state' / 'history.sqlite3'))
+    monkeypatch.setitem(update_data.CONFIG, 'PRECOMPRESS', ())
+    monkeypatch.setattr(update_data, 'HISTORY', update_data.HistoryStore())
+    monkeypatch.setattr(update_data, 'LOG_STORE', update_data.LogStore())
+    monkeypatch.setattr(update_data, '_state_cache', None)
+    update_data.METRICS.reset()
+    return tmp_path
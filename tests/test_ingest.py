@@ -0,0 +1,126 @@
+import json
+
+import update_data
+from update_data import CONFIG
+
+
+def _trade(n, day='2026-02-15', **fields):
+    return dict({'timestamp': f'{day}T10:00:{n:02d}+09:00', 'signature': f'sig{day}{n}', 'status': 'Success',
+                 'input_token': 'USDC', 'output_token': 'SOL', 'input_amount': 10.0, 'output_amount': 0.1}, **fields)
+
+
+def _append(workspace, name, records):
+    path = workspace / 'bot' / 'data' / 'trades' / name
+    with open(path, 'a', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record) + '\n')
+    return path
+
+
+def _ingest_state():
+    with open(f"{CONFIG['STATE_DIR']}/ingest_trades.json", encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_checkpoint_state_does_not_hold_records(workspace):
+    _append(workspace, 'trades_2026-02-15.jsonl', [_trade(i) for i in range(3)])
+    store = update_data.LOG_STORE.load(['trades'])
+    assert len(store.new['trades']) == 3
+
+    _append(workspace, 'trades_2026-02-15.jsonl', [_trade(10)])
+    store.load(['trades'])
+    assert [t['signature'] for t in store.new['trades']] == ['sig2026-02-1510']
+    assert store.appended['trades'] is True
+    assert store.count('trades') == 4
+    assert set(_ingest_state()) == {'files'}
+
+
+def test_legacy_records_are_dropped_from_state(workspace):
+    path = _append(workspace, 'trades_2026-02-15.jsonl', [_trade(1)])
+    update_data.save_state('ingest_trades', {'files': {}, 'records': {str(path): [_trade(1)]}})
+    update_data.LOG_STORE.load(['trades'])
+    assert 'records' not in _ingest_state()
+
+
+def test_empty_history_is_rebuilt_from_files(workspace, monkeypatch):
+    _append(workspace, 'trades_2026-02-15.jsonl', [_trade(i) for i in range(3)])
+    update_data.LOG_STORE.load(['trades'])
+
+    # 履歴DBだけ消えた場合はチェックポイントを無視して読み直す
+    monkeypatch.setitem(CONFIG, 'HISTORY_DB', str(workspace / 'fresh.sqlite3'))
+    monkeypatch.setattr(update_data, 'HISTORY', update_data.HistoryStore())
+    store = update_data.LOG_STORE.load(['trades'])
+    assert len(store.new['trades']) == 3
+    assert store.appended['trades'] is False
+    assert update_data.HISTORY.count('trades') == 3
+
+
+def test_store_queries_use_history_indexes(workspace):
+    _append(workspace, 'trades_2026-02-14.jsonl', [_trade(1, '2026-02-14')])
+    _append(workspace, 'trades_2026-02-15.jsonl', [_trade(1), _trade(2, input_token='SOL', output_token='WBTC')])
+    store = update_data.LOG_STORE.load(['trades'])
+
+    assert store.values('trades', 'date') == ['2026-02-14', '2026-02-15']
+    assert store.count('trades', token='wbtc') == 1
+    assert store.count('trades', token='SOL', date=['2026-02-15']) == 2
+    assert store.count('trades', token='SOL', date=[]) == 0
+    assert store.last('trades', token='SOL')['signature'] == 'sig2026-02-152'
+
+
+def _write_lines(workspace, name, lines):
+    path = workspace / 'bot' / 'data' / 'trades' / name
+    path.write_text(''.join(line + '\n' for line in lines), encoding='utf-8')
+    return path
+
+
+def _counter(name, **labels):
+    return sum(m['value'] for m in update_data.METRICS.snapshot()['counters']
+               if m['name'] == name and all(m['labels'].get(k) == v for k, v in labels.items()))
+
+
+def test_unconvertible_fields_keep_the_record(workspace):
+    _write_lines(workspace, 'trades_2026-02-15.jsonl', [
+        json.dumps(_trade(1, fee_lamports=1.5, input_amount_raw='1e6')),
+        json.dumps(_trade(2, input_amount='n/a', unix_time=1771110770)),
+    ])
+    store = update_data.LOG_STORE.load(['trades'])
+
+    first, second = store.new['trades']
+    assert first['fee_lamports'] == 1.5
+    assert first['input_amount_raw'] == 1000000
+    assert second['input_amount'] == 'n/a'
+    assert update_data.HISTORY.count('trades') == 2
+    assert _counter('record_field_errors_total', field='fee_lamports') == 1
+    assert _counter('record_field_errors_total', field='input_amount') == 1
+    assert _counter('records_quarantined_total') == 0
+
+
+def test_bad_lines_and_timestamps_are_quarantined(workspace):
+    _write_lines(workspace, 'trades_2026-02-15.jsonl', [
+        json.dumps(_trade(1, timestamp=1771110770)),
+        json.dumps(_trade(2, timestamp={'at': 'noon'})),
+        '{"timestamp": "2026-02-15T10:00:03+09:00", "cci": NaN}',
+        '{"timestamp": ',
+        '[1, 2]',
+    ])
+    store = update_data.LOG_STORE.load(['trades'])
+
+    assert [t['timestamp'] for t in store.new['trades']] == [
+        update_data.datetime.fromtimestamp(1771110770).isoformat(), '2026-02-15T10:00:03+09:00']
+    assert _counter('records_quarantined_total', reason='schema') == 2
+    assert _counter('records_quarantined_total', reason='decode') == 1
+    quarantine = workspace / 'dashboard' / '.state' / 'quarantine' / 'ingest_trades.jsonl'
+    entries = [json.loads(line) for line in quarantine.read_text(encoding='utf-8').splitlines()]
+    assert [e['reason'] for e in entries] == ['schema', 'decode', 'schema']
+    assert entries[0]['error'].startswith('timestamp:')
+
+
+def test_file_with_only_bad_lines_is_not_reread(workspace):
+    _write_lines(workspace, 'trades_2026-02-15.jsonl', ['{"timestamp": ', '[1, 2]'])
+    update_data.LOG_STORE.load(['trades'])
+    update_data.LOG_STORE.load(['trades'])
+
+    assert update_data.HISTORY.count('trades') == 0
+    assert _counter('records_quarantined_total') == 2
+    quarantine = workspace / 'dashboard' / '.state' / 'quarantine' / 'ingest_trades.jsonl'
+    assert len(quarantine.read_text(encoding='utf-8').splitlines()) == 2
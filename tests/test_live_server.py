@@ -0,0 +1,55 @@
+import http.client
+
+import pytest
+
+import update_data
+
+
+@pytest.fixture
+def server(workspace, monkeypatch):
+    root = workspace / 'dashboard'
+    monkeypatch.chdir(root)
+    (root / '.state').mkdir(exist_ok=True)
+    (root / '.state' / 'history.sqlite3').write_bytes(b'secret')
+    (root / 'update_data.py').write_text('# source')
+    (root / 'index.html').write_text('<html></html>')
+    (root / 'data' / 'wallet.json').write_text('{}')
+    (workspace / 'tasks.json').write_text('{}')
+    server = update_data.start_live_server(0, update_data.EventBus())
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _status(server, path, method='GET'):
+    conn = http.client.HTTPConnection('127.0.0.1', server.server_port, timeout=5)
+    try:
+        conn.request(method, path)
+        return conn.getresponse().status
+    finally:
+        conn.close()
+
+
+def test_binds_to_localhost_by_default(server):
+    assert server.server_address[0] == '127.0.0.1'
+
+
+@pytest.mark.parametrize('path', ['/', '/index.html', '/data/wallet.json', '/data/wallet.json?v=abc'])
+def test_serves_dashboard_assets(server, path):
+    assert _status(server, path) == 200
+
+
+@pytest.mark.parametrize('path', [
+    '/.state/history.sqlite3',
+    '/%2estate/history.sqlite3',
+    '/%2Estate/history.sqlite3',
+    '/data/%2e%2e/.state/history.sqlite3',
+    '/data/%2e%2e%2fupdate_data.py',
+    '/%2e%2e/tasks.json',
+    '/update_data.py',
+    '/data/',
+    '/data%2fwallet.json%00',
+])
+def test_rejects_paths_outside_the_allowlist(server, path):
+    assert _status(server, path) == 404
+    assert _status(server, path, 'HEAD') == 404
@@ -0,0 +1,26 @@
+import json
+
+import pytest
+
+import update_data
+
+ROWS = [{'id': i, 'title': 'タスク', 'parent': None, 1: True} for i in range(3000)]
+
+
+@pytest.mark.parametrize('data', [
+    {'rows': ROWS, 2: {'x': [1.5]}, True: 't', None: []},
+    ROWS,
+    {},
+    'text',
+])
+def test_write_json_matches_json_dumps(workspace, data):
+    path = workspace / 'out.json'
+    assert update_data.write_json(str(path), data) is True
+    assert path.read_text(encoding='utf-8') == json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+    assert update_data.write_json(str(path), data) is False
+
+
+def test_write_json_streams_generators(workspace):
+    path = workspace / 'out.json'
+    update_data.write_json(str(path), (row for row in ROWS))
+    assert json.loads(path.read_text(encoding='utf-8')) == json.loads(json.dumps(ROWS))
@@ -0,0 +1,71 @@
+import subprocess
+
+import pytest
+
+import update_data
+from update_data import CONFIG
+
+
+@pytest.fixture
+def grid_bot(workspace, monkeypatch):
+    """PIDファイル付きで動いているグリッドBotの代わり（sleep）"""
+    process = subprocess.Popen(['sleep', '60'])
+    pid_file = workspace / 'jupiter_grid.pid'
+    pid_file.write_text(str(process.pid))
+    monkeypatch.setitem(CONFIG, 'PROCESSES', {'jupiter_grid': {'pid_file': str(pid_file), 'cmdline': 'sleep'}})
+    yield process
+    process.kill()
+    process.wait()
+
+
+def _grid_enabled():
+    strategies = update_data.read_output('strategies.json')
+    return next(s['enabled'] for s in strategies if s['pair_id'] == 'SOL_GRID')
+
+
+def test_strategies_follow_grid_bot_crash_without_pid_file_change(grid_bot):
+    names = ['logs', 'processes', 'strategies']
+    _, results = update_data.run_pipeline(names, use_processes=False)
+    assert results['strategies']['status'] == 'ok'
+    assert _grid_enabled() is True
+
+    # クラッシュ: PIDファイルはそのまま、プロセスだけがいなくなる
+    grid_bot.kill()
+    grid_bot.wait()
+    _, results = update_data.run_pipeline(names, use_processes=False)
+    assert results['strategies']['status'] == 'ok'
+    assert _grid_enabled() is False
+
+
+def test_manifest_etag_matches_metrics_file(workspace):
+    update_data.run_update(['tasks'], use_processes=False)
+    manifest = update_data.read_output('manifest.json')
+    metrics_path = workspace / 'dashboard' / 'data' / 'metrics.json'
+    etag = f'"{update_data.file_sha256(str(metrics_path))[:16]}"'
+    assert manifest['files']['metrics.json']['etag'] == etag
+
+
+def test_trades_stage_streams_history(workspace, monkeypatch):
+    path = workspace / 'bot' / 'data' / 'trades' / 'trades_2026-02-15.jsonl'
+    path.write_text(''.join(
+        f'{{"timestamp": "2026-02-15T10:00:{i:02d}+09:00", "signature": "sig{i}", "status": "Success"}}\n'
+        for i in range(5)), encoding='utf-8')
+    update_data.LOG_STORE.load(['trades'])
+
+    def query(*args, **kwargs):
+        raise AssertionError('trade history loaded into a list')
+    monkeypatch.setattr(update_data.HISTORY, 'query', query)
+    fields, results = update_data.run_pipeline(['trades'], use_processes=False)
+
+    assert results['trades']['status'] == 'ok'
+    assert fields['trades_count'] == 5
+    assert [t['signature'] for t in update_data.read_output('trades.json')] == [f'sig{i}' for i in range(5)]
+
+
+def test_cpu_stage_runs_in_spawned_worker_with_parent_config(workspace):
+    (workspace / 'tasks.json').write_text('{"projects": [{"id": "P1", "tasks": [{"id": "T1"}]}]}', encoding='utf-8')
+    fields, results = update_data.run_pipeline(['tasks'])
+
+    assert results['tasks']['status'] == 'ok'
+    assert fields['tasks_count'] == 1
+    assert update_data.read_output('tasks.json')['index']['rows'][0]['id'] == 'T1'
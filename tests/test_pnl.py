@@ -0,0 +1,158 @@
+import json
+
+import pytest
+
+import update_data
+
+
+def _swap(n, src, dst, amount_in, amount_out, fee_sol=0.0, day='2026-02-15', **fields):
+    return dict({'timestamp': f'{day}T10:00:{n:02d}+09:00', 'signature': f'sig{day}{n}', 'status': 'Success',
+                 'input_token': src, 'output_token': dst, 'input_amount': amount_in, 'output_amount': amount_out,
+                 'fee_sol': fee_sol}, **fields)
+
+
+def _apply(*trades):
+    state = update_data._new_pnl_state()
+    for trade in trades:
+        update_data.apply_trade_fifo(state, trade)
+    return state
+
+
+def test_partial_sell_consumes_part_of_a_lot():
+    state = _apply(_swap(1, 'USDC', 'SOL', 100.0, 1.0, fee_sol=0.01),
+                   _swap(2, 'SOL', 'USDC', 0.4, 50.0, fee_sol=0.002))
+    sol = state['tokens']['SOL']
+
+    [lot] = sol['lots']
+    assert lot['qty'] == pytest.approx(0.6)
+    assert lot['cost_usd'] == pytest.approx(60.0)
+    assert lot['fee_sol'] == pytest.approx(0.006)
+    assert sol['realized_usd'] == pytest.approx(10.0)
+    [trip] = state['round_trips']
+    assert trip['qty'] == pytest.approx(0.4)
+    assert trip['buy_usd'] == pytest.approx(40.0)
+    assert trip['fee_sol'] == pytest.approx(0.006)
+    assert trip['buy_date'] == '2026-02-15T10:00:01+09:00'
+    assert state['fees_sol'] == pytest.approx(0.012)
+
+
+def test_sell_spans_lots_oldest_first():
+    state = _apply(_swap(1, 'USDC', 'SOL', 100.0, 1.0),
+                   _swap(2, 'USDC', 'SOL', 200.0, 1.0),
+                   _swap(3, 'SOL', 'USDC', 1.5, 300.0))
+    sol = state['tokens']['SOL']
+
+    assert sol['realized_usd'] == pytest.approx(100.0)
+    [lot] = sol['lots']
+    assert lot['qty'] == pytest.approx(0.5)
+    assert lot['cost_usd'] == pytest.approx(100.0)
+    assert lot['timestamp'] == '2026-02-15T10:00:02+09:00'
+    assert state['round_trips'][0]['buy_date'] == '2026-02-15T10:00:01+09:00'
+
+
+def test_oversell_is_split_into_matched_and_unmatched():
+    state = _apply(_swap(1, 'USDC', 'SOL', 100.0, 1.0),
+                   _swap(2, 'SOL', 'USDC', 2.0, 300.0))
+    sol = state['tokens']['SOL']
+
+    assert not sol['lots']
+    assert sol['realized_usd'] == pytest.approx(50.0)
+    assert sol['unmatched_qty'] == pytest.approx(1.0)
+    assert sol['unmatched_proceeds_usd'] == pytest.approx(150.0)
+    assert state['round_trips'][0]['sell_usd'] == pytest.approx(150.0)
+
+
+def test_sell_without_lots_is_not_realized():
+    state = _apply(_swap(1, 'SOL', 'USDC', 1.0, 120.0, fee_sol=0.001))
+    sol = state['tokens']['SOL']
+
+    assert sol['realized_usd'] == 0.0
+    assert sol['unmatched_qty'] == pytest.approx(1.0)
+    assert sol['unmatched_proceeds_usd'] == pytest.approx(120.0)
+    assert sol['fees_sol'] == pytest.approx(0.001)
+    assert state['round_trips'] == []
+
+
+def test_token_swap_carries_cost_basis():
+    state = _apply(_swap(1, 'USDC', 'SOL', 100.0, 1.0, fee_sol=0.01),
+                   _swap(2, 'SOL', 'WBTC', 0.5, 0.001, fee_sol=0.002))
+
+    [lot] = state['tokens']['WBTC']['lots']
+    assert lot['qty'] == pytest.approx(0.001)
+    assert lot['cost_usd'] == pytest.approx(50.0)
+    assert lot['fee_sol'] == pytest.approx(0.007)
+    assert lot['timestamp'] == '2026-02-15T10:00:01+09:00'
+    assert state['round_trips'] == []
+
+
+def test_failed_trade_only_pays_the_fee():
+    state = _apply(_swap(1, 'USDC', 'SOL', 100.0, 1.0, fee_sol=0.01, status='Failed'))
+    assert state['fees_sol'] == pytest.approx(0.01)
+    assert state['tokens'] == {}
+
+
+def _append(workspace, trades):
+    path = workspace / 'bot' / 'data' / 'trades' / 'trades_2026-02-15.jsonl'
+    with open(path, 'a', encoding='utf-8') as f:
+        for trade in trades:
+            f.write(json.dumps(trade) + '\n')
+    update_data.LOG_STORE.load(['trades'])
+
+
+def _rebuilt():
+    update_data.save_state('pnl', {})
+    return update_data.update_pnl_data()
+
+
+def _comparable(pnl):
+    return {k: pnl[k] for k in ('totals', 'tokens', 'round_trips')}
+
+
+def test_incremental_update_matches_full_rebuild(workspace):
+    _append(workspace, [_swap(1, 'USDC', 'SOL', 100.0, 1.0, fee_sol=0.01)])
+    update_data.update_pnl_data()
+
+    # 保存済みの状態に無いトークンを、同じバッチ内で買って一部売る
+    _append(workspace, [_swap(2, 'USDC', 'BNB', 60.0, 0.1),
+                        _swap(3, 'BNB', 'USDC', 0.04, 30.0),
+                        _swap(4, 'SOL', 'USDC', 0.5, 70.0)])
+    incremental = update_data.update_pnl_data()
+
+    assert incremental['tokens']['BNB']['quantity'] == pytest.approx(0.06)
+    assert incremental['tokens']['BNB']['realized_usd'] == pytest.approx(6.0)
+    assert incremental['totals']['round_trips'] == 2
+    assert _comparable(incremental) == _comparable(_rebuilt())
+
+
+def test_late_trade_triggers_full_rebuild(workspace):
+    _append(workspace, [_swap(5, 'USDC', 'SOL', 100.0, 1.0),
+                        _swap(6, 'SOL', 'USDC', 1.0, 110.0)])
+    update_data.update_pnl_data()
+
+    # 最後の反映より前の時刻のトレードが後から届く: 売りの原価が変わる
+    _append(workspace, [_swap(1, 'USDC', 'SOL', 80.0, 1.0)])
+    pnl = update_data.update_pnl_data()
+
+    assert pnl['tokens']['SOL']['realized_usd'] == pytest.approx(30.0)
+    assert pnl['tokens']['SOL']['cost_usd'] == pytest.approx(100.0)
+    assert _comparable(pnl) == _comparable(_rebuilt())
+
+
+def test_untimed_trade_does_not_force_rebuilds(workspace, monkeypatch):
+    _append(workspace, [_swap(1, 'USDC', 'SOL', 100.0, 1.0)])
+    update_data.update_pnl_data()
+
+    rebuilds = []
+    new_state = update_data._new_pnl_state
+    monkeypatch.setattr(update_data, '_new_pnl_state', lambda: rebuilds.append(1) or new_state())
+    untimed = _swap(9, 'USDC', 'SOL', 50.0, 0.5)
+    del untimed['timestamp']
+    _append(workspace, [untimed, _swap(2, 'SOL', 'USDC', 0.5, 60.0)])
+    pnl = update_data.update_pnl_data()
+    update_data.update_pnl_data()
+
+    assert rebuilds == []
+    assert pnl['totals']['untimed_trades'] == 1
+    assert pnl['tokens']['SOL']['quantity'] == pytest.approx(0.5)
+    assert pnl['tokens']['SOL']['realized_usd'] == pytest.approx(10.0)
+    assert _comparable(pnl) == _comparable(_rebuilt())
@@ -0,0 +1,30 @@
+import update_data
+
+
+def _signal(checked_at, price, cci):
+    return {'checked_at': checked_at, 'pair': 'BTCUSDT', 'btc_price': price, 'cci': cci, 'action': 'NONE'}
+
+
+def _series_meta():
+    update_data.update_signals_data()
+    manifest = update_data.read_output('signals/manifest.json')
+    return manifest['series']['BTCUSDT']['1m'], manifest['chunks'][0]
+
+
+def test_etag_changes_when_current_bucket_is_rewritten(workspace):
+    update_data.HISTORY.upsert('signals', [_signal('2026-02-15T10:00:05+09:00', 100.0, 10.0)])
+    series, chunk = _series_meta()
+
+    # 同じ1分バケット・同じ日に1件追加: 系列の件数は変わらないが内容は変わる
+    update_data.HISTORY.upsert('signals', [_signal('2026-02-15T10:00:40+09:00', 120.0, -150.0)])
+    series_after, chunk_after = _series_meta()
+
+    assert series_after['count'] == series['count'] == 1
+    assert series_after['etag'] != series['etag']
+    assert chunk_after['etag'] != chunk['etag']
+
+
+def test_etag_is_stable_when_nothing_changes(workspace):
+    update_data.HISTORY.upsert('signals', [_signal('2026-02-15T10:00:05+09:00', 100.0, 10.0)])
+    first = _series_meta()
+    assert _series_meta() == first
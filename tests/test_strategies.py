@@ -0,0 +1,31 @@
+import json
+
+import update_data
+
+LIVE_TRADER = """TRADING_PAIRS = {
+    'BTCUSDT': {'strategy': 'CCI', 'enabled': True},
+    'ETHUSDT': {'strategy': 'CCI', 'enabled': True, 'trade_symbol': 'ETH'},
+    'BNBUSDT': {'strategy': 'CCI', 'enabled': False, 'trade_symbol': 'BNB'},
+}
+"""
+
+
+def _trade(n, day, src, dst):
+    return {'timestamp': f'{day}T10:00:{n:02d}+09:00', 'signature': f'sig{day}{n}', 'status': 'Success',
+            'input_token': src, 'output_token': dst, 'input_amount': 10.0, 'output_amount': 0.1}
+
+
+def test_cci_stats_match_tokens_containing_the_symbol(workspace):
+    (workspace / 'bot' / 'live_trader.py').write_text(LIVE_TRADER, encoding='utf-8')
+    trades = [_trade(1, '2026-02-01', 'USDC', 'WBTC'), _trade(2, '2026-02-01', 'WBTC', 'USDC'),
+              _trade(3, '2026-02-15', 'USDC', 'WETH'), _trade(4, '2026-02-15', 'USDC', 'SOL')]
+    trades += [_trade(n, f'2026-02-{n:02d}', 'USDC', 'SOL') for n in range(5, 12)]
+    with open(workspace / 'bot' / 'data' / 'trades' / 'trades_2026-02-15.jsonl', 'w', encoding='utf-8') as f:
+        f.writelines(json.dumps(t) + '\n' for t in trades)
+    update_data.LOG_STORE.load(['trades'])
+
+    stats = {s['pair_id']: s['stats'] for s in update_data.update_portfolio_strategies()}
+
+    assert stats['BTCUSDT'] == {'total_trades': 2, 'last_7d_trades': 0}
+    assert stats['ETHUSDT'] == {'total_trades': 1, 'last_7d_trades': 1}
+    assert stats['BNBUSDT'] == {'total_trades': 0, 'last_7d_trades': 0}
@@ -0,0 +1,68 @@
+import json
+
+import pytest
+
+import update_data
+
+TASKS = {
+    'members': {'hikarimaru': {'emoji': '👑'}},
+    'projects': [
+        {'id': 'P1', 'name': 'Bot', 'tasks': [
+            {'id': 'T1', 'status': 'in_progress', 'assignee': 'clawdia', 'subtasks': [
+                {'id': 'T1-S1', 'status': 'pending', 'assignee': 'hikarimaru'},
+                {'id': 'T1-S2', 'status': 'completed', 'assignee': 'clawdia', 'subtasks': [
+                    {'id': 'T1-S2-a', 'status': 'pending', 'assignee': 'hikarimaru'},
+                ]},
+            ]},
+            {'id': 'T2', 'status': 'completed', 'assignee': 'talon'},
+        ]},
+        {'id': 'P2', 'name': 'Ops', 'tasks': [{'id': 'T3', 'status': 'pending'}]},
+    ],
+}
+
+
+@pytest.fixture
+def tasks_file(workspace):
+    path = workspace / 'tasks.json'
+    path.write_text(json.dumps(TASKS), encoding='utf-8')
+    return path
+
+
+def test_task_table_counts_and_adjacency(tasks_file):
+    statistics = update_data.update_tasks_data()
+    data = update_data.read_output('tasks.json')
+    rows, children = data['index']['rows'], data['index']['children']
+
+    assert [r['id'] for r in rows] == ['T1', 'T1-S1', 'T1-S2', 'T1-S2-a', 'T2', 'T3']
+    assert [r['parent'] for r in rows] == [None, 0, 0, 2, None, None]
+    assert children[0] == [1, 2] and children[2] == [3]
+    assert statistics['total_tasks'] == 6 and statistics['completed_tasks'] == 2
+    assert statistics['hikarimaru_pending'] == 2
+    assert statistics['status_counts'] == {'in_progress': 1, 'pending': 3, 'completed': 2}
+    assert statistics['projects'][0]['roots'] == [0, 4]
+    assert statistics['projects'][1]['assignee_counts'] == {'': 1}
+    assert data['index']['by_assignee']['hikarimaru'] == [1, 3]
+
+
+def test_unchanged_tasks_file_is_not_parsed(tasks_file, monkeypatch):
+    first = update_data.update_tasks_data()
+    tasks_file.touch()
+
+    loads = json.loads
+
+    def loads_state_only(s, *args, **kwargs):
+        # 状態ファイルは文字列で読まれる。tasks.json のバイト列はパースしないこと
+        assert not isinstance(s, bytes), 'tasks.json parsed again'
+        return loads(s, *args, **kwargs)
+    monkeypatch.setattr(update_data.json, 'loads', loads_state_only)
+    assert update_data.update_tasks_data() == first
+
+
+def test_corrupt_tasks_file_fails_the_stage(tasks_file):
+    update_data.update_tasks_data()
+    previous = update_data.read_output('tasks.json')
+    tasks_file.write_text('{"projects": [', encoding='utf-8')
+
+    _, results = update_data.run_pipeline(['tasks'], use_processes=False)
+    assert results['tasks']['status'] == 'failed'
+    assert update_data.read_output('tasks.json') == previous
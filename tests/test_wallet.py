@@ -0,0 +1,75 @@
+import update_data
+from update_data import CONFIG
+
+SPAM_MINT = 'Spam111111111111111111111111111111111111111'
+
+
+def _balances(stale=False):
+    return {
+        'sol_balance': 2.0,
+        'usdc_balance': 50.0,
+        'wbtc_balance': 0,
+        'bnb_balance': 0,
+        'other_tokens': [{'mint': SPAM_MINT, 'symbol': 'SPAM', 'amount': 1000.0, 'decimals': 6}],
+        'wallets': [],
+        'stale': stale,
+        'fetched_at': '2026-02-15T10:00:00',
+    }
+
+
+def _prices(stale=False):
+    def get_token_prices(tokens):
+        # SOL だけ価格が付き、スパムトークンはどのソースにもない
+        return {mint: {'usd': 100.0, 'source': 'file', 'fetched_at': '2026-02-15T10:00:00', 'stale': stale}
+                for mint in tokens if mint == CONFIG['SOL_MINT']}
+    return get_token_prices
+
+
+def test_unpriced_token_does_not_mark_wallet_stale(workspace, monkeypatch):
+    monkeypatch.setattr(update_data, 'get_solana_balances', lambda addresses: _balances())
+    monkeypatch.setattr(update_data, 'get_token_prices', _prices())
+
+    wallet = update_data.update_wallet_data()
+
+    assert wallet['unpriced_mints'] == [SPAM_MINT]
+    assert wallet['stale'] is False
+    assert wallet['total_usd'] == 250.0
+    assert len(update_data.HISTORY.query('wallet')) == 1
+
+
+def test_stale_price_or_balance_skips_snapshot(workspace, monkeypatch):
+    monkeypatch.setattr(update_data, 'get_solana_balances', lambda addresses: _balances())
+    monkeypatch.setattr(update_data, 'get_token_prices', _prices(stale=True))
+    assert update_data.update_wallet_data()['stale'] is True
+
+    monkeypatch.setattr(update_data, 'get_solana_balances', lambda addresses: _balances(stale=True))
+    monkeypatch.setattr(update_data, 'get_token_prices', _prices())
+    assert update_data.update_wallet_data()['stale'] is True
+
+    assert update_data.HISTORY.query('wallet') == []
+
+
+def _no_prices(tokens):
+    return {}
+
+
+def test_unpriced_core_balance_marks_wallet_stale(workspace, monkeypatch):
+    balances = dict(_balances(), sol_balance=10.0, usdc_balance=0.0, other_tokens=[])
+    monkeypatch.setattr(update_data, 'get_solana_balances', lambda addresses: balances)
+    monkeypatch.setattr(update_data, 'get_token_prices', _no_prices)
+
+    wallet = update_data.update_wallet_data()
+
+    assert wallet['total_usd'] == 0.0
+    assert wallet['unpriced_mints'] == [CONFIG['SOL_MINT']]
+    assert wallet['stale'] is True
+    assert update_data.HISTORY.query('wallet') == []
+
+
+def test_previously_priced_token_without_price_marks_wallet_stale(workspace, monkeypatch):
+    update_data.save_state('price_cache', {'prices': {SPAM_MINT: {'usd': 0.5}}, 'failed': {}})
+    monkeypatch.setattr(update_data, 'get_solana_balances', lambda addresses: _balances())
+    monkeypatch.setattr(update_data, 'get_token_prices', _prices())
+
+    assert update_data.update_wallet_data()['stale'] is True
+    assert update_data.HISTORY.query('wallet') == []
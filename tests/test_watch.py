@@ -0,0 +1,38 @@
+import argparse
+
+import update_data
+from update_data import CONFIG, STAGES
+
+
+class FakeWatcher:
+    """1回目の read で渡されたパスを返し、2回目で停止する"""
+
+    def __init__(self, events):
+        self.events = list(events)
+        self.dirs = []
+
+    def read(self, timeout):
+        if not self.events:
+            raise KeyboardInterrupt
+        return [self.events.pop(0)]
+
+
+def test_trade_file_event_does_not_run_timer_stages(workspace, monkeypatch):
+    trade_file = workspace / 'bot' / 'data' / 'trades' / 'trades_2026-02-15.jsonl'
+    monkeypatch.setattr(update_data, 'InotifyWatcher', lambda dirs: FakeWatcher([str(trade_file)]))
+    monkeypatch.setattr(update_data.signal, 'signal', lambda *args: None)
+    monkeypatch.setitem(CONFIG, 'WATCH_DEBOUNCE', 0)
+    calls = []
+
+    def run_update(names, *args, **kwargs):
+        calls.append(names)
+        return {}, {}
+    monkeypatch.setattr(update_data, 'run_update', run_update)
+
+    update_data.watch(argparse.Namespace(stages=list(STAGES), workers=None, force=False))
+
+    initial, event = calls
+    assert {'wallet', 'processes'} <= set(initial)
+    assert 'trades' in event and 'pnl' in event and 'strategies' in event
+    assert 'wallet' not in event
+    assert 'processes' not in event
@@ -6,20 +6,86 @@ Clawdia Dashboard Data Updater
 import os
 import json
 import glob
+import html
 from datetime import datetime, timedelta
 import requests
 import time
 import re
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+import argparse
+import bisect
+import ast
+import gzip
+import hashlib
+import multiprocessing
+import shutil
+import tempfile
+import types
+import ctypes
+import ctypes.util
+import fnmatch
+import select
+import queue
+import signal
+import sqlite3
+import struct
+import sys
+import traceback
+from collections import deque
+from urllib.parse import urlsplit, parse_qs, unquote
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+try:
+    import brotli  # 任意: .json.br を書き出す場合のみ
+except ImportError:
+    brotli = None
+
+try:
+    import orjson  # 任意: JSONL のデコードを速くする
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec  # 任意: orjson がなければこちらを使う
+except ImportError:
+    msgspec = None
 
 # Configuration
 CONFIG = {
-    'SOLANA_RPC_URL': 'https://api.mainnet-beta.solana.com',
+    'SOLANA_RPC_URL': os.environ.get('SOLANA_RPC_URL', 'https://api.mainnet-beta.solana.com'),
+    'COINGECKO_URL': os.environ.get('COINGECKO_URL', 'https://api.coingecko.com/api/v3/simple/price'),
+    'JUPITER_PRICE_URL': os.environ.get('JUPITER_PRICE_URL', 'https://api.jup.ag/price/v2'),
+    'PRICE_FILE': os.environ.get('PRICE_FILE', './prices.json'),  # オフライン用: {ミント or シンボル: USD}
+    'PRICE_SOURCES': ['coingecko', 'jupiter', 'file'],  # 上から順に試す
+    'PRICE_TTL': 60,  # 秒。これより新しい価格は問い合わせない（失敗したソースもこの間は休ませる）
+    'HTTP_DEADLINES': {'solana_rpc': 8.0, 'coingecko': 6.0, 'jupiter': 6.0},  # 秒（リトライ込み）
+    'HTTP_RETRIES': 2,
+    'HTTP_BACKOFF': 0.5,
     'WALLET_ADDRESS': 'CdJSUeHX49eFK8hixbfDKNRLTakYcy59MbVEh8pDnn9U',
+    # 合算する他のボットウォレット（WALLET_ADDRESS は常に含む）
+    'WALLETS': [a for a in os.environ.get('WALLETS', '').split(',') if a],
     'USDC_MINT': 'EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v',
     'WBTC_MINT': '3NZ9JMVBmGAqocybic2c7LQCJScmgsAZ6vQqTDzcqmJh',
     'BNB_MINT': '9gP2kCy3wA1ctvYWQk75guqXuHfrEomqydHLtcTCqiLa',
+    'SOL_MINT': 'So11111111111111111111111111111111111111112',  # wrapped SOL（価格の問い合わせ用）
+    'WORKSPACE_DIR': '..',
     'BOT_DATA_DIR': '../bot/data',
-    'OUTPUT_DIR': './data'
+    'OUTPUT_DIR': './data',
+    'STATE_DIR': './.state',
+    'HISTORY_DB': './.state/history.sqlite3',  # トレード・シグナル・グリッド・ウォレットの履歴
+    'PRECOMPRESS': [],  # 'gz' / 'br' を指定すると圧縮済みの .json.gz / .json.br も書き出す
+    'WATCH_DEBOUNCE': 1.0,  # --watch: 連続したファイル変更をまとめる秒数
+    # processes.json で監視するボット: PIDファイルと、/proc/<pid>/cmdline に含まれるべき文字列
+    'PROCESSES': {
+        'live_trader': {'pid_file': '/tmp/live_trader.pid', 'cmdline': 'live_trader'},
+        'jupiter_grid': {'pid_file': '/tmp/jupiter_grid.pid', 'cmdline': 'jupiter_grid'},
+    },
+    'WATCH_TIMERS': {'wallet': 60, 'processes': 30},  # --watch: ファイル以外の入力を持つステージの更新間隔（秒）
+    'WATCH_FLUSH_SECONDS': 300,  # --watch: メモリ上の状態をディスクに書き出す間隔
+    # node_exporter の textfile collector 用に Prometheus 形式でも書き出す場合のパス（例: /var/lib/node_exporter/update_data.prom）
+    'METRICS_TEXTFILE': os.environ.get('METRICS_TEXTFILE'),
 }
 
 def ensure_output_dir():
@@ -27,189 +93,1548 @@ def ensure_output_dir():
     if not os.path.exists(CONFIG['OUTPUT_DIR']):
         os.makedirs(CONFIG['OUTPUT_DIR'])
 
-def read_jsonl_files(pattern):
-    """JSONLファイルを読み込み、リストに変換"""
-    data = []
+# ─── メトリクス ───
+METRICS_PREFIX = 'update_data_'
+HTTP_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # 秒
+STAGE_DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0)
+
+class Metrics:
+    """プロセス内のカウンタ・ゲージ・ヒストグラム（ラベル付き）
+
+    (名前, ラベル) ごとに数値を辞書に足し込むだけなので、常に有効にしておける。
+    --watch / --serve では起動からの累計、cron 実行では1回分の値になる。
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters, self.gauges, self.histograms = {}, {}, {}
+
+    def reset(self):
+        with self.lock:
+            self.counters, self.gauges, self.histograms = {}, {}, {}
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        key = self._key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        with self.lock:
+            self.gauges[self._key(name, labels)] = value
+
+    def observe(self, name, value, buckets=HTTP_LATENCY_BUCKETS, **labels):
+        """ヒストグラムに1件加える（counts はバケットごと、最後が +Inf）"""
+        key = self._key(name, labels)
+        with self.lock:
+            hist = self.histograms.get(key)
+            if hist is None:
+                hist = self.histograms[key] = {'buckets': list(buckets), 'counts': [0] * (len(buckets) + 1),
+                                               'sum': 0.0, 'count': 0}
+            hist['counts'][bisect.bisect_left(hist['buckets'], value)] += 1
+            hist['sum'] += value
+            hist['count'] += 1
+
+    def cache(self, name, hit, count=1):
+        """キャッシュの当たり・外れを数える"""
+        if count:
+            self.inc('cache_requests_total', count, cache=name, result='hit' if hit else 'miss')
+
+    def snapshot(self):
+        """JSON に書ける形のコピー"""
+        with self.lock:
+            return {
+                'counters': [{'name': n, 'labels': dict(l), 'value': v} for (n, l), v in sorted(self.counters.items())],
+                'gauges': [{'name': n, 'labels': dict(l), 'value': v} for (n, l), v in sorted(self.gauges.items())],
+                'histograms': [{'name': n, 'labels': dict(l), **{k: list(v) if isinstance(v, list) else v
+                                                                  for k, v in h.items()}}
+                               for (n, l), h in sorted(self.histograms.items())],
+            }
+
+    def merge(self, snapshot):
+        """ワーカープロセスで取った snapshot を足し込む"""
+        for item in snapshot['counters']:
+            self.inc(item['name'], item['value'], **item['labels'])
+        for item in snapshot['gauges']:
+            self.set(item['name'], item['value'], **item['labels'])
+        with self.lock:
+            for item in snapshot['histograms']:
+                key = self._key(item['name'], item['labels'])
+                hist = self.histograms.setdefault(key, {'buckets': item['buckets'], 'counts': [0] * len(item['counts']),
+                                                        'sum': 0.0, 'count': 0})
+                hist['counts'] = [a + b for a, b in zip(hist['counts'], item['counts'])]
+                hist['sum'] += item['sum']
+                hist['count'] += item['count']
+
+    def cache_hit_rates(self):
+        """{キャッシュ名: {hits, misses, hit_rate}}"""
+        rates = {}
+        with self.lock:
+            for (name, labels), value in self.counters.items():
+                if name == 'cache_requests_total':
+                    labels = dict(labels)
+                    entry = rates.setdefault(labels['cache'], {'hits': 0, 'misses': 0})
+                    entry['hits' if labels['result'] == 'hit' else 'misses'] += value
+        for entry in rates.values():
+            total = entry['hits'] + entry['misses']
+            entry['hit_rate'] = round(entry['hits'] / total, 4) if total else None
+        return rates
+
+    def prometheus(self):
+        """Prometheus のテキスト形式"""
+        def fmt(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ''
+            escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+            return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+        lines = []
+        with self.lock:
+            for kind, series in (('counter', self.counters), ('gauge', self.gauges)):
+                typed = set()
+                for (name, labels), value in sorted(series.items()):
+                    if name not in typed:
+                        lines.append(f'# TYPE {METRICS_PREFIX}{name} {kind}')
+                        typed.add(name)
+                    lines.append(f'{METRICS_PREFIX}{name}{fmt(labels)} {value}')
+            typed = set()
+            for (name, labels), hist in sorted(self.histograms.items()):
+                if name not in typed:
+                    lines.append(f'# TYPE {METRICS_PREFIX}{name} histogram')
+                    typed.add(name)
+                cumulative = 0
+                for bound, count in zip(hist['buckets'] + ['+Inf'], hist['counts']):
+                    cumulative += count
+                    lines.append(f'{METRICS_PREFIX}{name}_bucket{fmt(labels, [("le", bound)])} {cumulative}')
+                lines.append(f'{METRICS_PREFIX}{name}_sum{fmt(labels)} {hist["sum"]}')
+                lines.append(f'{METRICS_PREFIX}{name}_count{fmt(labels)} {hist["count"]}')
+        return '\n'.join(lines) + '\n'
+
+METRICS = Metrics()
+_stage_context = threading.local()  # 実行中のステージ名（出力のメトリクスのラベル）
+
+def current_stage():
+    return getattr(_stage_context, 'name', None) or 'main'
+
+# ─── 出力（ストリーミング・アトミック書き込み） ───
+COMPRESSED_SUFFIXES = {'gz': '.gz', 'br': '.br'}
+JSON_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+WRITE_CHUNK = 1 << 16  # write_json がまとめて書き込む文字数の目安
+
+def _write_compressed(src_path, path, ext):
+    """src_path を圧縮して path + .gz/.br をアトミックに置き換える"""
+    directory = os.path.dirname(path) or '.'
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as out, open(src_path, 'rb') as src:
+            if ext == 'gz':
+                with gzip.GzipFile(fileobj=out, mode='wb', compresslevel=9, mtime=0) as gz:
+                    shutil.copyfileobj(src, gz)
+            else:
+                compressor = brotli.Compressor(quality=11)
+                for block in iter(lambda: src.read(1 << 16), b''):
+                    out.write(compressor.process(block))
+                out.write(compressor.finish())
+            out.flush()
+            os.fsync(out.fileno())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path + COMPRESSED_SUFFIXES[ext])
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def file_sha256(path):
+    """ファイル内容の SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def write_json(path, data, compress=None):
+    """JSONを一時ファイルへ書き出し、fsync してからアトミックにリネームする
+
+    list / tuple / ジェネレータは要素ごと、dict はトップレベルのキーごとに C のエンコーダで
+    文字列にし、WRITE_CHUNK 程度ためてからまとめて書き込み・ハッシュするので、
+    全体の文字列をメモリに作らない。
+    内容のハッシュが既存ファイルと同じなら置き換えない（mtime を保ちブラウザキャッシュを活かす）。
+    compress（既定は CONFIG['PRECOMPRESS']）に 'gz' / 'br' を指定すると
+    静的サーバーがそのまま返せる圧縮済みの兄弟ファイルも更新する。
+    内容が変わって書き換えた場合は True を返す。
+    """
+    compress = CONFIG['PRECOMPRESS'] if compress is None else compress
+    if brotli is None:
+        compress = [ext for ext in compress if ext != 'br']
+
+    directory = os.path.dirname(path) or '.'
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(path), suffix='.tmp')
+    digest = hashlib.sha256()
+    records = None
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            buffer, buffered = [], 0
+
+            def emit(text):
+                nonlocal buffered
+                buffer.append(text)
+                buffered += len(text)
+                if buffered >= WRITE_CHUNK:
+                    flush()
+
+            def flush():
+                nonlocal buffered
+                chunk = ''.join(buffer).encode('utf-8')
+                digest.update(chunk)
+                f.write(chunk)
+                buffer.clear()
+                buffered = 0
+
+            encode = JSON_ENCODER.encode
+            if isinstance(data, (list, tuple, types.GeneratorType)):
+                emit('[')
+                records = 0
+                for item in data:
+                    emit(',' + encode(item) if records else encode(item))
+                    records += 1
+                emit(']')
+            elif isinstance(data, dict):
+                emit('{')
+                for i, (key, value) in enumerate(data.items()):
+                    member = encode({key: value})[1:-1]  # キーの変換は json.dumps と同じにする
+                    emit(',' + member if i else member)
+                emit('}')
+            else:
+                emit(encode(data))
+            flush()
+            f.flush()
+            os.fsync(f.fileno())
+
+        unchanged = (os.path.exists(path)
+                     and os.path.getsize(path) == os.path.getsize(tmp_path)
+                     and file_sha256(path) == digest.hexdigest())
+        if unchanged:
+            os.remove(tmp_path)
+            src_path = path
+        else:
+            os.chmod(tmp_path, 0o644)  # mkstemp は 0600 で作るため
+            src_path = tmp_path
+
+        for ext in COMPRESSED_SUFFIXES:
+            sibling = path + COMPRESSED_SUFFIXES[ext]
+            if ext in compress:
+                if not unchanged or not os.path.exists(sibling):
+                    _write_compressed(src_path, path, ext)
+            elif os.path.exists(sibling):
+                os.remove(sibling)  # 古い圧縮版を配信させない
+        if not unchanged:
+            os.replace(tmp_path, path)
+        target = 'state' if os.path.abspath(directory).startswith(os.path.abspath(CONFIG['STATE_DIR'])) else 'data'
+        METRICS.inc('output_files_total', stage=current_stage(), target=target,
+                    result='unchanged' if unchanged else 'written')
+        if not unchanged:
+            METRICS.inc('output_bytes_written_total', os.path.getsize(path), stage=current_stage(), target=target)
+            if records is not None:
+                METRICS.inc('output_records_written_total', records, stage=current_stage(), target=target)
+        return not unchanged
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def remove_output(path):
+    """出力ファイルと圧縮済みの兄弟ファイルを削除"""
+    for p in [path] + [path + suffix for suffix in COMPRESSED_SUFFIXES.values()]:
+        if os.path.exists(p):
+            os.remove(p)
+
+# --watch では状態をメモリに保持し、flush_states() でまとめてディスクに書き出す
+_state_cache = None
+_dirty_states = set()
+
+def load_state(name, default=None):
+    """STATE_DIR配下の永続状態を読み込む（壊れていれば初期状態）"""
+    if _state_cache is not None and name in _state_cache:
+        return _state_cache[name]
+    path = os.path.join(CONFIG['STATE_DIR'], f'{name}.json')
+    state = default if default is not None else {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError) as e:
+        print(f"State file {path} unreadable, rebuilding: {e}")
+    if _state_cache is not None:
+        _state_cache[name] = state
+    return state
+
+def save_state(name, state):
+    """永続状態を保存"""
+    if _state_cache is not None:
+        _state_cache[name] = state
+        _dirty_states.add(name)
+        return
+    if not os.path.exists(CONFIG['STATE_DIR']):
+        os.makedirs(CONFIG['STATE_DIR'])
+    write_json(os.path.join(CONFIG['STATE_DIR'], f'{name}.json'), state, compress=())
+
+def flush_states():
+    """メモリ上で更新された状態をディスクに書き出す"""
+    if not os.path.exists(CONFIG['STATE_DIR']):
+        os.makedirs(CONFIG['STATE_DIR'])
+    while _dirty_states:
+        name = _dirty_states.pop()
+        write_json(os.path.join(CONFIG['STATE_DIR'], f'{name}.json'), _state_cache[name], compress=())
+
+CHECKPOINT_TAIL_BYTES = 64
+
+def _read_tail(f, offset):
+    """オフセット直前のバイト列（追記判定用の指紋）"""
+    start = max(0, offset - CHECKPOINT_TAIL_BYTES)
+    f.seek(start)
+    return f.read(offset - start).hex()
+
+# JSONL 1行のデコーダ（orjson → msgspec → 標準ライブラリの順に使えるものを使う）
+if orjson is not None:
+    _fast_loads = orjson.loads
+    JSON_DECODE_ERRORS = (ValueError,)
+elif msgspec is not None:
+    _fast_loads = msgspec.json.Decoder().decode
+    JSON_DECODE_ERRORS = (ValueError, msgspec.DecodeError)
+else:
+    _fast_loads = None
+    JSON_DECODE_ERRORS = (ValueError,)
+
+def decode_json_line(line):
+    """JSONL 1行（bytes）をデコード
+
+    orjson / msgspec は NaN / Infinity（Python の json.dumps が書き出す）を
+    受け付けないので、失敗した行だけ標準ライブラリで読み直す。
+    """
+    if _fast_loads is not None:
+        try:
+            return _fast_loads(line)
+        except JSON_DECODE_ERRORS:
+            pass
+    return json.loads(line)
+
+class RecordError(ValueError):
+    """読めないログ行（reason は 'decode' か 'schema'）"""
+
+    def __init__(self, reason, message):
+        super().__init__(message)
+        self.reason = reason
+
+def _as_str(value):
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    raise TypeError(f'expected a string, got {type(value).__name__}')
+
+def _as_float(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        return float(value)
+    raise TypeError(f'expected a number, got {type(value).__name__}')
+
+def _as_int(value):
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        try:
+            return int(value)
+        except ValueError:
+            value = float(value)  # "1e6" など
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    raise TypeError(f'expected an integer, got {value!r}')
+
+def _as_bool(value):
+    if isinstance(value, bool):
+        return value
+    if value in (0, 1):
+        return bool(value)
+    if isinstance(value, str) and value.lower() in ('true', 'false'):
+        return value.lower() == 'true'
+    raise TypeError(f'expected a boolean, got {value!r}')
+
+def _as_timestamp(value):
+    """Unix 秒は ISO 文字列に変換する"""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return datetime.fromtimestamp(value).isoformat()
+    raise TypeError(f'expected a timestamp, got {type(value).__name__}')
+
+class RecordSchema:
+    """ログ1行をデコードし、フィールドの型をそろえる（時刻の ISO 化もここで行う）
+
+    fields は {フィールド: 変換関数}。値が None のフィールドとスキーマにない
+    フィールドはそのまま残す。変換できないフィールドも値はそのままでレコードは残し、
+    errors に (フィールド, 理由) を追加する。行ごと RecordError にするのは、JSON として
+    読めない・オブジェクトでない・time_field（時刻）が変換できない場合だけ。
+    レコードは dict のまま返す（履歴ストアの raw 列・API 出力がいずれも JSON のため）。
+    """
+
+    __slots__ = ('kind', 'time_field', 'fields')
+
+    def __init__(self, kind, time_field, fields):
+        self.kind = kind
+        self.time_field = time_field
+        self.fields = tuple(fields.items())
+
+    def decode(self, line, errors=None):
+        try:
+            record = decode_json_line(line)
+        except JSON_DECODE_ERRORS as e:
+            raise RecordError('decode', str(e)) from None
+        if not isinstance(record, dict):
+            raise RecordError('schema', f'expected an object, got {type(record).__name__}')
+        get = record.get
+        for field, convert in self.fields:
+            value = get(field)
+            if value is not None:
+                try:
+                    record[field] = convert(value)
+                except (TypeError, ValueError, OverflowError, OSError) as e:
+                    if field == self.time_field:
+                        raise RecordError('schema', f'{field}: {e}') from None
+                    if errors is not None:
+                        errors.append((field, str(e)))
+        return record
+
+TRADE_SCHEMA = RecordSchema('trades', 'timestamp', {
+    'timestamp': _as_timestamp,
+    'signature': _as_str,
+    'status': _as_str,
+    'input_token': _as_str,
+    'output_token': _as_str,
+    'input_amount': _as_float,
+    'output_amount': _as_float,
+    'input_amount_raw': _as_int,
+    'output_amount_raw': _as_int,
+    'fee_lamports': _as_int,
+    'fee_sol': _as_float,
+})
+
+SIGNAL_SCHEMA = RecordSchema('signals', 'checked_at', {
+    'checked_at': _as_timestamp,
+    'pair': _as_str,
+    'action': _as_str,
+    'btc_price': _as_float,
+    'price': _as_float,
+    'cci': _as_float,
+    'cci_value': _as_float,
+    'donchian_low': _as_float,
+    'in_position': _as_bool,
+    'entry_condition_met': _as_bool,
+    'sl_triggered': _as_bool,
+    'donchian_triggered': _as_bool,
+})
+
+GRID_SCHEMA = RecordSchema('grid', 'timestamp', {
+    'timestamp': _as_timestamp,
+    'action': _as_str,
+    'usdc_spent': _as_float,
+    'price': _as_float,
+})
+
+# 隔離ファイルがこれを超えたら .1 に回す
+QUARANTINE_MAX_BYTES = 4 * 1024 * 1024
+
+def quarantine_lines(state_name, file_path, bad):
+    """読めなかった行を STATE_DIR/quarantine/<state_name>.jsonl に退避する
+
+    bad は (バイトオフセット, RecordError, 行のバイト列) のリスト。
+    """
+    directory = os.path.join(CONFIG['STATE_DIR'], 'quarantine')
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'{state_name}.jsonl')
+    try:
+        if os.path.getsize(path) > QUARANTINE_MAX_BYTES:
+            os.replace(path, path + '.1')
+    except OSError:
+        pass
+    now = datetime.now().isoformat()
+    with open(path, 'a', encoding='utf-8') as f:
+        for offset, error, line in bad:
+            f.write(json.dumps({
+                'quarantined_at': now,
+                'file': file_path,
+                'offset': offset,
+                'reason': error.reason,
+                'error': str(error),
+                'line': line.decode('utf-8', 'replace'),
+            }, ensure_ascii=False) + '\n')
+    return path
+
+def read_jsonl_incremental(pattern, state_name, schema=None, sink=None, full=False):
+    """JSONLファイルを差分読み込みし、(今回新しく読んだレコード, 追記以外の変化があったか) を返す
+
+    ファイルごとに inode / size / mtime / 読み込み済みバイトオフセットだけを
+    STATE_DIR に保存し、次回は追記分のみをパースする（レコード自体は状態に持たない）。
+    サイズ縮小・inode変更・オフセット直前の内容不一致（切り詰めやローテーション）
+    を検出した場合はそのファイルだけ先頭から読み直す。full なら全ファイルを先頭から読む。
+    新しい行は schema（RecordSchema）で1回だけデコードする。
+    読めない行は数えて quarantine_lines に退避し、ファイルごとに1行だけ報告する。
+    sink を渡すと新しいレコードをチェックポイントの保存前に渡す（途中で落ちても行を取りこぼさない）。
+    """
+    decode = schema.decode if schema else (lambda line, errors: decode_json_line(line))
+    state = load_state(state_name, {'files': {}})
+    checkpoints = state.setdefault('files', {})
+    # 以前の形式はパース済みの全レコードを状態に持っていた
+    changed = state.pop('records', None) is not None
+    reset = full
+
     files = glob.glob(pattern)
     files.sort()  # 日付順に並べる
-    
+    new_records = []
+
+    # 消えたファイルはチェックポイントから外す（取り込み済みの行は履歴ストアに残る）
+    for gone in set(checkpoints) - set(files):
+        checkpoints.pop(gone, None)
+        changed = reset = True
+
     for file_path in files:
-        print(f"Reading {file_path}...")
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()
-                    if line:
-                        try:
-                            obj = json.loads(line)
-                            data.append(obj)
-                        except json.JSONDecodeError as e:
-                            print(f"JSON parse error in {file_path}: {e}")
+            st = os.stat(file_path)
         except FileNotFoundError:
             print(f"File not found: {file_path}")
+            continue
+
+        cp = None if full else checkpoints.get(file_path)
+        unchanged = cp and cp['inode'] == st.st_ino and cp['size'] == st.st_size and cp['mtime'] == st.st_mtime
+        METRICS.cache('jsonl_checkpoint', unchanged)
+        if unchanged:
+            continue  # 変更なし
+
+        try:
+            with open(file_path, 'rb') as f:
+                offset = 0
+                if (cp and cp['inode'] == st.st_ino and st.st_size >= cp['offset']
+                        and _read_tail(f, cp['offset']) == cp.get('tail')):
+                    offset = cp['offset']
+                elif cp:
+                    print(f"Re-reading {file_path} (truncated or rotated)")
+                    METRICS.inc('jsonl_rereads_total', source=state_name)
+                    reset = True
+
+                f.seek(offset)
+                chunk = f.read()
+                # 書き込み途中の最終行は次回に回す
+                end = chunk.rfind(b'\n') + 1
+                if end:
+                    print(f"Reading {file_path} from byte {offset}...")
+                METRICS.inc('bytes_parsed_total', end, source=state_name)
+                before = len(new_records)
+                bad = []
+                field_errors = []
+                position = offset
+                for raw in chunk[:end].split(b'\n'):
+                    line_offset = position
+                    position += len(raw) + 1
+                    line = raw.strip()
+                    if not line:
+                        continue
+                    try:
+                        obj = decode(line, field_errors)
+                    except RecordError as e:
+                        bad.append((line_offset, e, line))
+                        continue
+                    except JSON_DECODE_ERRORS as e:
+                        bad.append((line_offset, RecordError('decode', str(e)), line))
+                        continue
+                    new_records.append(obj)
+
+                if bad:
+                    for _, error, _ in bad:
+                        if error.reason == 'decode':
+                            METRICS.inc('json_decode_errors_total', source=state_name)
+                        METRICS.inc('records_quarantined_total', source=state_name, reason=error.reason)
+                    path = quarantine_lines(state_name, file_path, bad)
+                    print(f"  {len(bad)} unreadable lines in {file_path} quarantined to {path}")
+                if field_errors:
+                    for field, _ in field_errors:
+                        METRICS.inc('record_field_errors_total', source=state_name, field=field)
+                    fields = sorted({field for field, _ in field_errors})
+                    print(f"  {len(field_errors)} fields in {file_path} kept as written "
+                          f"(not convertible: {', '.join(fields)})")
+                METRICS.inc('records_read_total', len(new_records) - before, source=state_name)
+                offset += end
+                checkpoints[file_path] = {
+                    'inode': st.st_ino,
+                    'size': st.st_size,
+                    'mtime': st.st_mtime,
+                    'offset': offset,
+                    'tail': _read_tail(f, offset),
+                }
+                changed = True
         except Exception as e:
             print(f"Error reading {file_path}: {e}")
-    
-    return data
 
-def get_solana_balance(wallet_address):
-    """Solana RPC APIでウォレット残高を取得"""
-    try:
-        # SOL残高取得
-        sol_payload = {
-            "jsonrpc": "2.0",
-            "id": 1,
-            "method": "getBalance",
-            "params": [wallet_address]
-        }
-        
-        sol_response = requests.post(CONFIG['SOLANA_RPC_URL'], json=sol_payload, timeout=10)
-        sol_data = sol_response.json()
-        
-        if 'result' in sol_data:
-            sol_balance = sol_data['result']['value'] / 1e9  # lamports to SOL
+    if sink and new_records:
+        sink(new_records)
+    if changed:
+        save_state(state_name, state)
+
+    print(f"  {len(new_records)} new records")
+    return new_records, reset
+
+# 種別ごとのログの場所と差分読み込みの状態名
+LOG_SOURCES = {
+    'trades': ('trades/trades_*.jsonl', 'ingest_trades', TRADE_SCHEMA),
+    'signals': ('signal_logs/signals_*.jsonl', 'ingest_signals', SIGNAL_SCHEMA),
+    'grid': ('trades/jgrid_*.jsonl', 'ingest_grid', GRID_SCHEMA),
+}
+
+class LogStore:
+    """各JSONLの追記分を1回だけパースして履歴ストアに取り込み、問い合わせを履歴ストアに委ねる
+
+    パース済みのレコードをメモリや状態ファイルに持たないので、1回の読み込みにかかる時間は
+    履歴全体ではなく新しい行の数に比例する。絞り込みは履歴ストアの token / action / date / pair の索引で行う。
+    """
+
+    def __init__(self):
+        self.new = {}  # 直近の load で新しく読んだレコード
+        self.appended = {}  # 直近の load が末尾への追記だけだったか
+        self._lock = threading.Lock()
+
+    def load(self, kinds=None):
+        """ログを差分読み込みして履歴ストアに取り込む
+
+        履歴ストアがその種類をまだ取り込んでいなければ（作り直した直後など）、チェックポイントを
+        無視して全件を取り込む。行数では判断しない（読めない行しかないファイルを毎回読み直さないため）。
+        """
+        with self._lock:
+            for kind in kinds or LOG_SOURCES:
+                pattern, state_name, schema = LOG_SOURCES[kind]
+                print(f"Loading {kind} logs...")
+                full = not HISTORY.ingested(kind)
+                new_records, reset = read_jsonl_incremental(
+                    os.path.join(CONFIG['BOT_DATA_DIR'], pattern), state_name, schema,
+                    sink=lambda records, kind=kind: HISTORY.upsert(kind, records),
+                    full=full)
+                if full:
+                    HISTORY.mark_ingested(kind)
+                self.appended[kind] = kind in self.new and not reset
+                self.new[kind] = new_records
+        return self
+
+    def values(self, kind, field):
+        """field に現れる値の一覧（昇順）"""
+        return HISTORY.values(kind, field)
+
+    def query(self, kind, **filters):
+        """条件に合うレコードを時刻順に返す（値にリストを渡すとOR、フィールド間はAND）"""
+        return HISTORY.query(kind, **filters)
+
+    def count(self, kind, **filters):
+        return HISTORY.count(kind, **filters)
+
+    def last(self, kind, **filters):
+        """条件に一致する最後のレコード（なければ None）"""
+        found = HISTORY.query(kind, limit=1, **filters)
+        return found[-1] if found else None
+
+LOG_STORE = LogStore()
+
+# ─── 履歴ストア (SQLite) ───
+def _log_table(extra=''):
+    return f"""(
+        key TEXT PRIMARY KEY,  -- signature（なければ行内容のハッシュ）
+        ts INTEGER,            -- エポックミリ秒
+        date TEXT,
+        input_token TEXT,
+        output_token TEXT,
+        action TEXT,{extra}
+        raw TEXT NOT NULL
+    )"""
+
+HISTORY_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS trades {_log_table()};
+CREATE INDEX IF NOT EXISTS trades_ts ON trades(ts);
+CREATE INDEX IF NOT EXISTS trades_input_token ON trades(input_token, ts);
+CREATE INDEX IF NOT EXISTS trades_output_token ON trades(output_token, ts);
+CREATE INDEX IF NOT EXISTS trades_date ON trades(date);
+CREATE TABLE IF NOT EXISTS grid {_log_table()};
+CREATE INDEX IF NOT EXISTS grid_ts ON grid(ts);
+CREATE INDEX IF NOT EXISTS grid_action ON grid(action, ts);
+CREATE TABLE IF NOT EXISTS signals (
+    key TEXT PRIMARY KEY,
+    ts INTEGER,
+    date TEXT,
+    pair TEXT NOT NULL,
+    action TEXT,
+    flags INTEGER NOT NULL,  -- SIGNAL_FLAGS の順のビット
+    raw TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS signals_ts ON signals(ts);
+CREATE INDEX IF NOT EXISTS signals_pair_ts ON signals(pair, ts);
+CREATE INDEX IF NOT EXISTS signals_date ON signals(date);
+CREATE TABLE IF NOT EXISTS ingested (
+    kind TEXT PRIMARY KEY  -- ログファイルから全件を取り込んだことのある種類
+);
+CREATE TABLE IF NOT EXISTS wallet (
+    ts INTEGER PRIMARY KEY,
+    total_usd REAL,
+    raw TEXT NOT NULL
+);
+""" + "".join(f"""
+CREATE TABLE IF NOT EXISTS wallet_{res} (
+    t INTEGER PRIMARY KEY,  -- バケット開始（エポックミリ秒）
+    open REAL, high REAL, low REAL, close REAL,
+    count INTEGER NOT NULL
+);""" for res in ('15m', '1d'))
+
+# ウォレット総資産の保持段階: 生データは WALLET_RAW_RETENTION 秒、
+# それより古い分は (バケット秒数, 保持期間（秒、None は無期限）) のロールアップで残す
+WALLET_RAW_RETENTION = 48 * 3600
+WALLET_TIERS = {
+    '15m': (900, 30 * 86400),
+    '1d': (86400, None),
+}
+
+class HistoryStore:
+    """トレード・シグナル・グリッド・ウォレットの履歴を SQLite（WAL）に蓄積する
+
+    ログは signature（なければ行内容のハッシュ）をキーに upsert するので、
+    同じ行を何度取り込んでも重複しない。JSON出力はこのストアへの問い合わせで作る。
+    接続はスレッドごとに開く（WAL なので読み込みは書き込みを待たない）。
+    """
+
+    LOG_KINDS = ('trades', 'signals', 'grid')
+
+    def __init__(self, path=None):
+        self._path = path
+        self._local = threading.local()
+
+    @property
+    def path(self):
+        return self._path or CONFIG['HISTORY_DB']
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.executescript(HISTORY_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _key(record):
+        if record.get('signature'):
+            return record['signature']
+        canonical = json.dumps(record, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+        return hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+
+    def _row(self, kind, record):
+        ts = record.get('timestamp') or record.get('checked_at')
+        date = ts[:10] if isinstance(ts, str) and len(ts) >= 10 else None
+        raw = json.dumps(record, ensure_ascii=False, separators=(',', ':'))
+        if kind == 'signals':
+            flags = 0
+            for bit, name in enumerate(SIGNAL_FLAGS):
+                if record.get(name):
+                    flags |= 1 << bit
+            return (self._key(record), to_epoch_ms(ts), date, record.get('pair') or 'BTCUSDT',
+                    record.get('action'), flags, raw)
+        tokens = [str(record[f]).upper() if record.get(f) else None for f in ('input_token', 'output_token')]
+        return (self._key(record), to_epoch_ms(ts), date, *tokens, record.get('action'), raw)
+
+    def upsert(self, kind, records):
+        """ログレコードを取り込む（同じキーの行は内容を置き換える）"""
+        if kind == 'signals':
+            columns = ('key', 'ts', 'date', 'pair', 'action', 'flags', 'raw')
         else:
-            print(f"SOL balance error: {sol_data}")
-            sol_balance = 0
-        
-        # 全SPLトークン残高取得
-        token_payload = {
-            "jsonrpc": "2.0",
-            "id": 2,
-            "method": "getTokenAccountsByOwner",
-            "params": [
-                wallet_address,
-                {"programId": "TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA"},
-                {"encoding": "jsonParsed"}
-            ]
-        }
-        
-        token_response = requests.post(CONFIG['SOLANA_RPC_URL'], json=token_payload, timeout=10)
-        token_data = token_response.json()
-        
-        usdc_balance = 0
-        wbtc_balance = 0
-        bnb_balance = 0
-        other_tokens = []
-        
-        if 'result' in token_data and 'value' in token_data['result']:
-            for account in token_data['result']['value']:
-                token_info = account['account']['data']['parsed']['info']
-                mint = token_info.get('mint', '')
-                amount = float(token_info['tokenAmount']['uiAmount'] or 0)
-                if amount == 0:
-                    continue
-                if mint == CONFIG['USDC_MINT']:
-                    usdc_balance = amount
-                elif mint == CONFIG['WBTC_MINT']:
-                    wbtc_balance = amount
-                elif mint == CONFIG['BNB_MINT']:
-                    bnb_balance = amount
-                else:
-                    other_tokens.append({'mint': mint, 'amount': amount})
-        
-        return {
-            'sol_balance': sol_balance,
-            'usdc_balance': usdc_balance,
-            'wbtc_balance': wbtc_balance,
-            'bnb_balance': bnb_balance,
-            'other_tokens': other_tokens
-        }
-        
-    except Exception as e:
-        print(f"Error fetching Solana balance: {e}")
-        return {
-            'sol_balance': 0,
-            'usdc_balance': 0
-        }
+            columns = ('key', 'ts', 'date', 'input_token', 'output_token', 'action', 'raw')
+        updates = ', '.join(f'{c} = excluded.{c}' for c in columns[1:])
+        sql = (f"INSERT INTO {kind} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+               f"ON CONFLICT(key) DO UPDATE SET {updates}")
+        conn = self._conn()
+        with conn:
+            conn.executemany(sql, (self._row(kind, r) for r in records))
+        return len(records)
+
+    def ingested(self, kind):
+        """kind のログファイルをこのストアに取り込んだことがあるか（作り直したストアでは False）"""
+        return self._conn().execute('SELECT 1 FROM ingested WHERE kind = ?', (kind,)).fetchone() is not None
+
+    def mark_ingested(self, kind):
+        conn = self._conn()
+        with conn:
+            conn.execute('INSERT OR IGNORE INTO ingested (kind) VALUES (?)', (kind,))
+
+
+    def add_wallet_snapshot(self, wallet):
+        """スナップショットを1行追記し、各段階のバケットに畳み込んで保持期間外を落とす
+
+        追記・ロールアップとも行数に依らない（バケット1行の upsert）。
+        """
+        ts = to_epoch_ms(wallet.get('timestamp'))
+        usd = wallet.get('total_usd')
+        conn = self._conn()
+        with conn:
+            added = conn.execute('INSERT OR IGNORE INTO wallet (ts, total_usd, raw) VALUES (?, ?, ?)',
+                                 (ts, usd, json.dumps(wallet, ensure_ascii=False))).rowcount
+            if not added:
+                return False  # 同じ時刻のスナップショットは二重に集計しない
+            conn.execute('DELETE FROM wallet WHERE ts < ?', (ts - WALLET_RAW_RETENTION * 1000,))
+            for res, (seconds, retention) in WALLET_TIERS.items():
+                start = ts - ts % (seconds * 1000)
+                conn.execute(
+                    f'INSERT INTO wallet_{res} (t, open, high, low, close, count) VALUES (?, ?, ?, ?, ?, 1) '
+                    f'ON CONFLICT(t) DO UPDATE SET high = max(high, excluded.high), '
+                    f'low = min(low, excluded.low), close = excluded.close, count = count + 1',
+                    (start, usd, usd, usd, usd))
+                if retention:
+                    conn.execute(f'DELETE FROM wallet_{res} WHERE t < ?', (start - retention * 1000,))
+        return True
+
+    def wallet_value_at(self, ts):
+        """ts 時点（以前で最も近い点）の総資産。生データ → 15m → 1d の順に探す"""
+        conn = self._conn()
+        row = conn.execute('SELECT total_usd FROM wallet WHERE ts <= ? ORDER BY ts DESC LIMIT 1', (ts,)).fetchone()
+        for res in WALLET_TIERS:
+            if row:
+                break
+            row = conn.execute(f'SELECT close FROM wallet_{res} WHERE t <= ? ORDER BY t DESC LIMIT 1',
+                               (ts,)).fetchone()
+        return row[0] if row else None
+
+    def equity_curve(self):
+        """粗い段階から順に、より細かい段階が始まる前までをつないだ総資産の推移
+
+        (セグメント情報, t の列, usd の列) を返す。バケットは close を使う。
+        """
+        conn = self._conn()
+        tiers = [(res, seconds, f'wallet_{res}', 't', 'close')
+                 for res, (seconds, _) in reversed(list(WALLET_TIERS.items()))]
+        tiers.append(('raw', None, 'wallet', 'ts', 'total_usd'))
+        starts = [conn.execute(f'SELECT min({t}) FROM {table}').fetchone()[0] for _, _, table, t, _ in tiers]
+        segments, times, values = [], [], []
+        for i, (res, seconds, table, t, value) in enumerate(tiers):
+            # より細かい段階と重なるバケットは使わない
+            until = min([s for s in starts[i + 1:] if s is not None], default=None)
+            sql = f'SELECT {t}, {value} FROM {table}'
+            if until is not None:
+                sql += f' WHERE {t} + {seconds * 1000} <= {int(until)}'
+            rows = conn.execute(sql + f' ORDER BY {t}').fetchall()
+            if not rows:
+                continue
+            segments.append({'resolution': res, 'bucket_seconds': seconds,
+                             'start': rows[0][0], 'end': rows[-1][0], 'count': len(rows)})
+            times.extend(row[0] for row in rows)
+            values.extend(row[1] for row in rows)
+        return segments, times, values
+
+    def _where(self, kind, token=None, pair=None, action=None, date=None, since=None, until=None, flag=None,
+               timed=False):
+        """絞り込み条件（token / pair / action / date はリストを渡すと OR、空のリストは何にも一致しない）
+
+        timed=True なら時刻の読めない（ts が NULL の）行を除く。
+        """
+        clauses, params = [], []
+
+        def match(columns, value):
+            values = list(value) if isinstance(value, (list, tuple, set, frozenset)) else [value]
+            if not values:
+                clauses.append('0')
+                return
+            placeholders = ', '.join('?' * len(values))
+            clauses.append('(' + ' OR '.join(f'{c} IN ({placeholders})' for c in columns) + ')')
+            params.extend(values * len(columns))
+
+        if token or isinstance(token, (list, tuple, set, frozenset)):
+            tokens = [token] if isinstance(token, str) else token
+            match(('input_token', 'output_token'), [str(t).upper() for t in tokens])
+        for column, value in (('pair', pair), ('action', action), ('date', date)):
+            if value or isinstance(value, (list, tuple, set, frozenset)):
+                match((column,), value)
+        if since is not None:
+            clauses.append('ts > ?')
+            params.append(since)
+        if until is not None:
+            clauses.append('ts <= ?')
+            params.append(until)
+        if timed:
+            clauses.append('ts IS NOT NULL')
+        if flag:
+            clauses.append('flags & ? != 0')
+            params.append(1 << SIGNAL_FLAGS.index(flag))
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+    def iter_query(self, kind, limit=None, **filters):
+        """条件に合うレコードを時刻順に返す（since は含まず until は含む、エポックミリ秒）
 
-def get_crypto_prices():
-    """CoinGecko APIで価格情報を取得"""
+        limit を指定すると新しいほうから limit 件（返す順は時刻順のまま）。
+        """
+        where, params = self._where(kind, **filters)
+        if limit:
+            sql = (f'SELECT raw FROM (SELECT raw, ts, rowid AS r FROM {kind}{where} '
+                   f'ORDER BY ts DESC, r DESC LIMIT ?) ORDER BY ts, r')
+            params.append(limit)
+        else:
+            sql = f'SELECT raw FROM {kind}{where} ORDER BY ts, rowid'
+        for (raw,) in self._conn().execute(sql, params):
+            yield json.loads(raw)
+
+    def query(self, kind, limit=None, **filters):
+        return list(self.iter_query(kind, limit, **filters))
+
+    def count(self, kind, **filters):
+        where, params = self._where(kind, **filters)
+        return self._conn().execute(f'SELECT COUNT(*) FROM {kind}{where}', params).fetchone()[0]
+
+    def values(self, kind, field):
+        """field（token / action / date / pair）に現れる値の一覧（昇順）"""
+        if field == 'token':
+            sql = (f'SELECT input_token FROM {kind} WHERE input_token IS NOT NULL '
+                   f'UNION SELECT output_token FROM {kind} WHERE output_token IS NOT NULL ORDER BY 1')
+        elif field in ('action', 'date', 'pair'):
+            sql = f'SELECT DISTINCT {field} FROM {kind} WHERE {field} IS NOT NULL ORDER BY 1'
+        else:
+            raise ValueError(f'unknown field: {field}')
+        return [value for (value,) in self._conn().execute(sql)]
+
+    def signal_days(self):
+        """日ごとの (件数, 最終時刻)（チャンクの書き直し判定用）"""
+        rows = self._conn().execute(
+            'SELECT date, COUNT(*), MAX(ts) FROM signals WHERE date IS NOT NULL GROUP BY date ORDER BY date')
+        return {date: [count, last] for date, count, last in rows}
+
+    def signal_pairs(self):
+        return [pair for (pair,) in self._conn().execute('SELECT DISTINCT pair FROM signals ORDER BY pair')]
+
+    def latest_signals(self):
+        """ペアごとの最新シグナル"""
+        rows = self._conn().execute('SELECT pair, raw, MAX(ts) FROM signals GROUP BY pair ORDER BY pair')
+        return {pair: json.loads(raw) for pair, raw, _ in rows}
+
+HISTORY = HistoryStore()
+
+def update_log_store():
+    """トレード・シグナル・グリッドのログを共有ストアに読み込み、履歴ストアに取り込む"""
+    print("Updating log store...")
+    LOG_STORE.load()
+    for kind in HistoryStore.LOG_KINDS:
+        stored = len(LOG_STORE.new.get(kind, []))
+        if stored:
+            print(f"  {stored} {kind} records upserted into {HISTORY.path}")
+    return LOG_STORE
+
+# ─── HTTP (共有セッション・リトライ・フォールバック) ───
+_http_session = None
+
+def get_http_session():
+    """keep-alive接続を使い回す共有セッション"""
+    global _http_session
+    if _http_session is None:
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=8)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        _http_session = session
+    return _http_session
+
+class FetchError(Exception):
+    """リトライしても取得できなかった"""
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+def fetch_json(endpoint, method, url, **kwargs):
+    """エンドポイントごとのデッドライン内でリトライ（ジッター付き指数バックオフ）"""
+    deadline = time.monotonic() + CONFIG['HTTP_DEADLINES'].get(endpoint, 10)
+    attempts = CONFIG['HTTP_RETRIES'] + 1
+    last_error = None
+
+    for attempt in range(attempts):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        started = time.perf_counter()
+        outcome = 'error'
+        try:
+            response = get_http_session().request(method, url, timeout=remaining, **kwargs)
+            outcome = str(response.status_code)
+            if response.status_code in RETRYABLE_STATUS:
+                raise FetchError(f"HTTP {response.status_code}")
+            response.raise_for_status()
+            return response.json()
+        except (requests.ConnectionError, requests.Timeout, FetchError) as e:
+            if isinstance(e, requests.Timeout):
+                outcome = 'timeout'
+            elif isinstance(e, requests.ConnectionError):
+                outcome = 'connection_error'
+            last_error = e
+        except (requests.RequestException, ValueError) as e:
+            if isinstance(e, ValueError):
+                outcome = 'invalid_json'
+            raise FetchError(f"{endpoint}: {e}") from e
+        finally:
+            METRICS.observe('http_request_duration_seconds', time.perf_counter() - started, endpoint=endpoint)
+            METRICS.inc('http_requests_total', endpoint=endpoint, outcome=outcome)
+
+        if attempt + 1 < attempts:
+            METRICS.inc('http_retries_total', endpoint=endpoint)
+            backoff = CONFIG['HTTP_BACKOFF'] * (2 ** attempt) * random.uniform(0.5, 1.5)
+            time.sleep(max(0, min(backoff, deadline - time.monotonic())))
+
+    raise FetchError(f"{endpoint}: {last_error or 'deadline exceeded'}")
+
+def rpc_batch(calls):
+    """複数の JSON-RPC 呼び出しを1リクエストのバッチで送り、結果を呼び出し順に返す
+
+    calls は (method, params) のリスト。1件でもエラーがあれば FetchError。
+    """
+    if not calls:
+        return []
+    payload = [{"jsonrpc": "2.0", "id": i, "method": method, "params": params}
+               for i, (method, params) in enumerate(calls)]
+    data = fetch_json('solana_rpc', 'POST', CONFIG['SOLANA_RPC_URL'], json=payload)
+    if not isinstance(data, list):
+        raise FetchError(f"batch: {data.get('error', data) if isinstance(data, dict) else data}")
+    by_id = {item.get('id'): item for item in data}
+    results = []
+    for i, (method, _) in enumerate(calls):
+        item = by_id.get(i, {})
+        if 'result' not in item:
+            raise FetchError(f"{method}: {item.get('error', 'missing response')}")
+        results.append(item['result'])
+    return results
+
+_last_good_lock = threading.Lock()
+
+def with_last_good(key, fetch):
+    """取得に成功したら保存し、失敗したら前回成功時の値を stale として返す"""
+    last_good = load_state('last_good')
     try:
-        url = 'https://api.coingecko.com/api/v3/simple/price'
-        params = {
-            'ids': 'solana,bitcoin,binancecoin',
-            'vs_currencies': 'usd'
-        }
-        
-        response = requests.get(url, params=params, timeout=10)
-        data = response.json()
-        
-        return {
-            'sol_price': data.get('solana', {}).get('usd', 0),
-            'btc_price': data.get('bitcoin', {}).get('usd', 0),
-            'bnb_price': data.get('binancecoin', {}).get('usd', 0)
-        }
-        
+        value = fetch()
     except Exception as e:
-        print(f"Error fetching crypto prices: {e}")
+        print(f"Error fetching {key}: {e}")
+        METRICS.inc('last_good_fallbacks_total', key=key)
+        if key in last_good:
+            print(f"  Using last good {key} from {last_good[key]['fetched_at']}")
+            return dict(last_good[key]['value'], stale=True, fetched_at=last_good[key]['fetched_at'])
+        return None
+    fetched_at = datetime.now().isoformat()
+    with _last_good_lock:
+        last_good = load_state('last_good')  # 並行実行中の他キーを消さないよう読み直す
+        last_good[key] = {'value': value, 'fetched_at': fetched_at}
+        save_state('last_good', last_good)
+    return dict(value, stale=False, fetched_at=fetched_at)
+
+TOKEN_PROGRAMS = {
+    'spl-token': 'TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA',
+    'spl-token-2022': 'TokenzQdBNbLqP5VEhdkAS6EPFLC1PHnBqCXEpPxuEb',
+}
+RPC_MAX_ACCOUNTS = 100  # getMultipleAccounts 1回あたりの上限
+
+def wallet_addresses():
+    """残高を合算するウォレット（先頭が WALLET_ADDRESS）"""
+    addresses = [CONFIG['WALLET_ADDRESS']]
+    for address in CONFIG['WALLETS']:
+        if address not in addresses:
+            addresses.append(address)
+    return addresses
+
+def _chunks(items, size):
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+def known_mints():
+    """設定で既知のミント → シンボル"""
+    return {CONFIG['USDC_MINT']: 'USDC', CONFIG['WBTC_MINT']: 'WBTC', CONFIG['BNB_MINT']: 'BNB'}
+
+def resolve_mints(mints):
+    """ミントの decimals / シンボル / プログラムをキャッシュ付きで引く
+
+    未登録のミントだけを getMultipleAccounts（jsonParsed）でまとめて問い合わせる。
+    シンボルは既知のミントか、Token-2022 の tokenMetadata 拡張から取る。
+    """
+    registry = load_state('mint_registry')
+    missing = [m for m in mints if m not in registry]
+    METRICS.cache('mint_registry', True, len(mints) - len(missing))
+    METRICS.cache('mint_registry', False, len(missing))
+    if missing:
+        try:
+            calls = [('getMultipleAccounts', [chunk, {'encoding': 'jsonParsed'}])
+                     for chunk in _chunks(missing, RPC_MAX_ACCOUNTS)]
+            accounts = [a for result in rpc_batch(calls) for a in result['value']]
+        except FetchError as e:
+            print(f"Error resolving mints: {e}")
+            accounts = []
+        for mint, account in zip(missing, accounts):
+            if not account:
+                continue
+            data = account.get('data')
+            info = data.get('parsed', {}).get('info', {}) if isinstance(data, dict) else {}
+            symbol = known_mints().get(mint)
+            for ext in info.get('extensions', []):
+                if ext.get('extension') == 'tokenMetadata':
+                    symbol = symbol or ext.get('state', {}).get('symbol') or None
+            registry[mint] = {
+                'symbol': symbol,
+                'decimals': info.get('decimals'),
+                'program': data.get('program') if isinstance(data, dict) else None,
+            }
+        save_state('mint_registry', registry)
+    return {m: registry.get(m, {'symbol': known_mints().get(m), 'decimals': None, 'program': None})
+            for m in mints}
+
+def get_solana_balances(addresses):
+    """全ウォレットの SOL / SPL・Token-2022 残高を JSON-RPC バッチ1回で取得して合算
+
+    SOL は getMultipleAccounts の lamports、トークンはウォレット×プログラムごとの
+    getTokenAccountsByOwner を同じバッチに詰める（ウォレットが増えても往復は1回）。
+    ミント情報は resolve_mints のキャッシュから引く。
+    """
+    def fetch():
+        calls = [('getMultipleAccounts', [chunk, {'encoding': 'base64', 'dataSlice': {'offset': 0, 'length': 0}}])
+                 for chunk in _chunks(addresses, RPC_MAX_ACCOUNTS)]
+        n_multi = len(calls)
+        for address in addresses:
+            for program in TOKEN_PROGRAMS.values():
+                calls.append(('getTokenAccountsByOwner', [address, {"programId": program}, {"encoding": "jsonParsed"}]))
+        results = rpc_batch(calls)
+
+        accounts = [a for result in results[:n_multi] for a in result['value']]
+        wallets = []
+        totals = {}  # mint -> 数量
+        decimals = {}
+        token_results = iter(results[n_multi:])
+        for address, account in zip(addresses, accounts):
+            holdings = {}
+            for _ in TOKEN_PROGRAMS:
+                for item in next(token_results).get('value', []):
+                    token_info = item['account']['data']['parsed']['info']
+                    mint = token_info.get('mint', '')
+                    amount = float(token_info['tokenAmount']['uiAmount'] or 0)
+                    if amount == 0:
+                        continue
+                    holdings[mint] = holdings.get(mint, 0) + amount
+                    decimals[mint] = token_info['tokenAmount'].get('decimals')
+            for mint, amount in holdings.items():
+                totals[mint] = totals.get(mint, 0) + amount
+            wallets.append({
+                'address': address,
+                'sol_balance': (account or {}).get('lamports', 0) / 1e9,  # lamports to SOL
+                'tokens': holdings,
+            })
+
+        mints = resolve_mints(sorted(totals))
+        def label(mint):
+            return mints[mint]['symbol'] or mint
+        other_tokens = [{
+            'mint': mint,
+            'symbol': mints[mint]['symbol'],
+            'amount': amount,
+            'decimals': mints[mint]['decimals'] if mints[mint]['decimals'] is not None else decimals.get(mint),
+            'program': mints[mint]['program'],
+        } for mint, amount in totals.items() if mint not in known_mints()]
+        for wallet in wallets:
+            wallet['tokens'] = {label(m): a for m, a in wallet['tokens'].items()}
+
         return {
-            'sol_price': 0,
-            'btc_price': 0
+            'sol_balance': sum(w['sol_balance'] for w in wallets),
+            'usdc_balance': totals.get(CONFIG['USDC_MINT'], 0),
+            'wbtc_balance': totals.get(CONFIG['WBTC_MINT'], 0),
+            'bnb_balance': totals.get(CONFIG['BNB_MINT'], 0),
+            'other_tokens': other_tokens,
+            'wallets': wallets,
         }
 
+    return with_last_good('balance', fetch) or {
+        'sol_balance': 0,
+        'usdc_balance': 0,
+        'wbtc_balance': 0,
+        'bnb_balance': 0,
+        'other_tokens': [],
+        'wallets': [],
+        'stale': True,
+        'fetched_at': None
+    }
+
+# ─── 価格 (TTLキャッシュ + 複数ソースのフェイルオーバー) ───
+# CoinGecko の ID で引くミント（それ以外はコントラクトアドレスで引く）
+COINGECKO_IDS = {'SOL_MINT': 'solana', 'WBTC_MINT': 'bitcoin', 'BNB_MINT': 'binancecoin'}
+
+def _coingecko_prices(tokens):
+    ids = {CONFIG[key]: cg_id for key, cg_id in COINGECKO_IDS.items() if CONFIG[key] in tokens}
+    prices = {}
+    if ids:
+        data = fetch_json('coingecko', 'GET', CONFIG['COINGECKO_URL'],
+                          params={'ids': ','.join(ids.values()), 'vs_currencies': 'usd'})
+        prices.update({mint: data.get(cg_id, {}).get('usd') for mint, cg_id in ids.items()})
+    others = [mint for mint in tokens if mint not in ids]
+    if others:
+        # アドレス指定の問い合わせだけ失敗しても、ID で取れた分は使う（残りは次のソースへ）
+        url = CONFIG['COINGECKO_URL'].replace('/simple/price', '/simple/token_price/solana')
+        try:
+            data = fetch_json('coingecko', 'GET', url,
+                              params={'contract_addresses': ','.join(others), 'vs_currencies': 'usd'})
+        except FetchError as e:
+            if not prices:
+                raise
+            print(f"Error fetching token prices from coingecko: {e}")
+            data = {}
+        by_address = {k.lower(): v for k, v in data.items()}
+        prices.update({mint: by_address.get(mint.lower(), {}).get('usd') for mint in others})
+    return prices
+
+def _jupiter_prices(tokens):
+    data = fetch_json('jupiter', 'GET', CONFIG['JUPITER_PRICE_URL'], params={'ids': ','.join(tokens)})
+    return {mint: float(info['price']) for mint, info in (data.get('data') or {}).items()
+            if info and info.get('price') is not None}
+
+def _file_prices(tokens):
+    try:
+        with open(CONFIG['PRICE_FILE'], 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        raise FetchError(f"price file: {e}") from e
+    prices = {}
+    for mint, symbol in tokens.items():
+        value = data.get(mint, data.get(symbol))
+        if isinstance(value, dict):
+            value = value.get('usd')
+        prices[mint] = value
+    return prices
+
+# 価格ソース: 名前 → {ミント: シンボル} を受けて {ミント: USD} を返す関数
+PRICE_SOURCES = {
+    'coingecko': _coingecko_prices,
+    'jupiter': _jupiter_prices,
+    'file': _file_prices,
+}
+
+def get_token_prices(tokens):
+    """{ミント: シンボル} の USD 価格を {ミント: {usd, source, fetched_at, stale}} で返す
+
+    PRICE_TTL 秒以内に取得した価格はキャッシュから返し、残りだけを PRICE_SOURCES の順に
+    まとめて問い合わせる（見つからなかったミントだけ次のソースへ）。失敗したソースは
+    PRICE_TTL の間スキップするので、何度呼んでも上流への問い合わせ頻度は抑えられる。
+    どのソースからも取れなかったミントはキャッシュの古い値を stale として返し、
+    一度も取れたことのないミントは含めない。
+    """
+    cache = load_state('price_cache', {'prices': {}, 'failed': {}})
+    now = time.time()
+    ttl = CONFIG['PRICE_TTL']
+    prices = cache['prices']
+    missing = {m: s for m, s in tokens.items() if now - prices.get(m, {}).get('fetched_ts', 0) > ttl}
+    METRICS.cache('price', True, len(tokens) - len(missing))
+    METRICS.cache('price', False, len(missing))
+
+    tried = False
+    for name in CONFIG['PRICE_SOURCES']:
+        if not missing:
+            break
+        if now - cache['failed'].get(name, 0) <= ttl:
+            continue
+        tried = True
+        try:
+            found = PRICE_SOURCES[name](missing)
+        except Exception as e:
+            print(f"Error fetching prices from {name}: {e}")
+            METRICS.inc('price_source_failures_total', source=name)
+            cache['failed'][name] = now
+            continue
+        fetched_at = datetime.now().isoformat()
+        for mint, usd in found.items():
+            if mint in missing and usd:
+                prices[mint] = {'usd': float(usd), 'source': name, 'fetched_at': fetched_at, 'fetched_ts': now}
+                del missing[mint]
+    if tried:
+        save_state('price_cache', cache)
+
+    result = {}
+    for mint in tokens:
+        if mint in prices:
+            entry = prices[mint]
+            result[mint] = {'usd': entry['usd'], 'source': entry['source'],
+                            'fetched_at': entry['fetched_at'], 'stale': mint in missing}
+    if missing:
+        stale = [tokens[m] or m for m in missing if m in result]
+        unknown = [tokens[m] or m for m in missing if m not in result]
+        if stale:
+            print(f"  Using cached prices for {', '.join(stale)}")
+        if unknown:
+            print(f"  No price for {', '.join(unknown)}")
+    return result
+
+def price_targets():
+    """常に価格を引くミント（SOL / WBTC / BNB と、登録済みのその他のミント）"""
+    targets = {CONFIG['SOL_MINT']: 'SOL', CONFIG['WBTC_MINT']: 'WBTC', CONFIG['BNB_MINT']: 'BNB'}
+    for mint, info in load_state('mint_registry').items():
+        if mint != CONFIG['USDC_MINT']:
+            targets.setdefault(mint, info.get('symbol'))
+    return targets
+
 def update_trades_data():
     """トレードデータを更新"""
     print("Updating trades data...")
-    pattern = os.path.join(CONFIG['BOT_DATA_DIR'], 'trades', 'trades_*.jsonl')
-    trades = read_jsonl_files(pattern)
-    
-    # データの整形（必要に応じて）
-    for trade in trades:
-        # timestampをISO形式に統一
-        if 'timestamp' in trade:
-            try:
-                # Unix timestampの場合
-                if isinstance(trade['timestamp'], (int, float)):
-                    trade['timestamp'] = datetime.fromtimestamp(trade['timestamp']).isoformat()
-            except:
-                pass
+    # 全件をリストにせず、SQLite から読みながら書き出す
+    count = HISTORY.count('trades')
     
     output_path = os.path.join(CONFIG['OUTPUT_DIR'], 'trades.json')
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(trades, f, ensure_ascii=False, indent=2)
+    write_json(output_path, HISTORY.iter_query('trades'))
     
-    print(f"Saved {len(trades)} trades to {output_path}")
-    return trades
+    print(f"Saved {count} trades to {output_path}")
+    return count
+
+# シグナルの真偽値フラグ（flags列のビット順）
+SIGNAL_FLAGS = ('in_position', 'entry_condition_met', 'sl_triggered', 'donchian_triggered')
+
+def to_epoch_ms(ts):
+    """ISO文字列をエポックミリ秒に変換（変換できなければ None）"""
+    try:
+        return int(datetime.fromisoformat(ts).timestamp() * 1000)
+    except (TypeError, ValueError):
+        return None
+
+def build_signal_chunk(date, rows):
+    """1日分のシグナルを列指向（並列配列）に変換
+
+    pair / action は辞書（pairs / actions）へのインデックス、
+    真偽値は SIGNAL_FLAGS の順にビットを立てた flags に詰める。
+    price は btc_price（なければ price）。
+    """
+    pairs, actions = [], []
+    columns = {'t': [], 'pair': [], 'price': [], 'cci': [], 'donchian_low': [], 'action': [], 'flags': []}
+    for row in rows:
+        pair = row.get('pair') or 'BTCUSDT'
+        action = row.get('action') or ''
+        if pair not in pairs:
+            pairs.append(pair)
+        if action not in actions:
+            actions.append(action)
+        flags = 0
+        for bit, name in enumerate(SIGNAL_FLAGS):
+            if row.get(name):
+                flags |= 1 << bit
+        columns['t'].append(to_epoch_ms(row.get('checked_at')))
+        columns['pair'].append(pairs.index(pair))
+        columns['price'].append(row.get('btc_price') or row.get('price'))
+        columns['cci'].append(row.get('cci', row.get('cci_value')))
+        columns['donchian_low'].append(row.get('donchian_low'))
+        columns['action'].append(actions.index(action))
+        columns['flags'].append(flags)
+    return {'date': date, 'count': len(rows), 'pairs': pairs, 'actions': actions, 'columns': columns}
+
+# ダウンサンプル系列の解像度: (バケット秒数, 保持期間（秒、None は無期限）)
+SERIES_RESOLUTIONS = {
+    '1m': (60, 2 * 86400),
+    '15m': (900, 35 * 86400),
+    '1h': (3600, 180 * 86400),
+    '4h': (14400, None),
+}
+SERIES_COLUMNS = ('t', 'open', 'high', 'low', 'close', 'cci_min', 'cci_max', 'cci_last', 'count')
+
+def _merge_into_bucket(bucket, price, cci):
+    """[t, open, high, low, close, cci_min, cci_max, cci_last, count] に1点を加える"""
+    if price is not None:
+        if bucket[1] is None:
+            bucket[1] = price
+        bucket[2] = price if bucket[2] is None else max(bucket[2], price)
+        bucket[3] = price if bucket[3] is None else min(bucket[3], price)
+        bucket[4] = price
+    if cci is not None:
+        bucket[5] = cci if bucket[5] is None else min(bucket[5], cci)
+        bucket[6] = cci if bucket[6] is None else max(bucket[6], cci)
+        bucket[7] = cci
+    bucket[8] += 1
+
+def update_signal_series(signals_dir):
+    """ペア×解像度ごとのOHLC（価格）/ min・max・last（CCI）系列を差分更新して書き出す
+
+    前回処理した最終時刻（watermark）より新しいシグナルだけを履歴ストアから
+    時刻範囲で取り出し、末尾のバケットに畳み込む。状態がなければ全件から作り直す。
+    """
+    state = load_state('signal_series')
+    if 'series' not in state:
+        state = {'series': {}, 'watermark': {}}
+    series = state['series']
+    watermark = state['watermark']
+    etags = state.setdefault('etags', {})
+
+    touched = set()
+    rows = (row for pair in HISTORY.signal_pairs()
+            for row in HISTORY.iter_query('signals', pair=pair, since=watermark.get(pair)))
+    for row in rows:
+        t = to_epoch_ms(row.get('checked_at'))
+        pair = row.get('pair') or 'BTCUSDT'
+        if t is None or t <= watermark.get(pair, -1):
+            continue  # 時刻のないシグナル
+        watermark[pair] = t
+        price = row.get('btc_price') or row.get('price')
+        cci = row.get('cci', row.get('cci_value'))
+        for res, (seconds, _) in SERIES_RESOLUTIONS.items():
+            buckets = series.setdefault(pair, {}).setdefault(res, [])
+            start = t - t % (seconds * 1000)
+            if not buckets or buckets[-1][0] != start:
+                buckets.append([start, None, None, None, None, None, None, None, 0])
+            _merge_into_bucket(buckets[-1], price, cci)
+        touched.add(pair)
+
+    index = {}
+    for pair, by_res in series.items():
+        for res, buckets in by_res.items():
+            seconds, retention = SERIES_RESOLUTIONS[res]
+            if retention and buckets:
+                cutoff = buckets[-1][0] - retention * 1000
+                drop = 0
+                while drop < len(buckets) and buckets[drop][0] < cutoff:
+                    drop += 1
+                del buckets[:drop]
+            file_name = f'series_{pair}_{res}.json'
+            path = os.path.join(signals_dir, file_name)
+            if pair in touched or not os.path.exists(path):
+                payload = {
+                    'pair': pair,
+                    'resolution': res,
+                    'bucket_seconds': seconds,
+                    'count': len(buckets),
+                    'columns': {name: [b[i] for b in buckets] for i, name in enumerate(SERIES_COLUMNS)},
+                }
+                write_json(path, payload)
+                etags.pop(file_name, None)
+            if file_name not in etags:
+                etags[file_name] = file_sha256(path)[:16]
+            index.setdefault(pair, {})[res] = {
+                'file': f'signals/{file_name}',
+                'etag': etags[file_name],
+                'bucket_seconds': seconds,
+                'retention_seconds': retention,
+                'count': len(buckets),
+                'start': buckets[0][0] if buckets else None,
+                'end': buckets[-1][0] if buckets else None,
+            }
+
+    save_state('signal_series', state)
+    return index
 
 def update_signals_data():
-    """シグナルデータを更新"""
+    """シグナルデータを日別の列指向チャンク + manifest として更新"""
     print("Updating signals data...")
-    pattern = os.path.join(CONFIG['BOT_DATA_DIR'], 'signal_logs', 'signals_*.jsonl')
-    signals = read_jsonl_files(pattern)
     
-    # データの整形
-    for signal in signals:
-        if 'checked_at' in signal:
-            try:
-                # Unix timestampの場合
-                if isinstance(signal['checked_at'], (int, float)):
-                    signal['checked_at'] = datetime.fromtimestamp(signal['checked_at']).isoformat()
-            except:
-                pass
+    signals_dir = os.path.join(CONFIG['OUTPUT_DIR'], 'signals')
+    if not os.path.exists(signals_dir):
+        os.makedirs(signals_dir)
+    
+    # 前回から件数・最終時刻が変わった日のチャンクだけ書き直す
+    state = load_state('signal_chunks')
+    days = HISTORY.signal_days()  # {date: [件数, 最終時刻]}
+    dates = list(days)
+    written = 0
+    for date in dates:
+        file_name = f'signals_{date}.json'
+        chunk_path = os.path.join(signals_dir, file_name)
+        fingerprint = days[date]
+        reuse = (date in state and state[date]['fingerprint'] == fingerprint and 'etag' in state[date]['meta']
+                 and os.path.exists(chunk_path))
+        METRICS.cache('signal_chunks', reuse)
+        if reuse:
+            continue
+        chunk = build_signal_chunk(date, HISTORY.query('signals', date=date))
+        write_json(chunk_path, chunk)
+        times = [t for t in chunk['columns']['t'] if t is not None]
+        state[date] = {
+            'fingerprint': fingerprint,
+            'meta': {
+                'date': date,
+                'file': f'signals/{file_name}',
+                # 内容のハッシュ（ダッシュボードのキャッシュキー。件数が同じでも内容が変われば変わる）
+                'etag': file_sha256(chunk_path)[:16],
+                'count': chunk['count'],
+                'start': min(times) if times else None,
+                'end': max(times) if times else None,
+                'pairs': chunk['pairs'],
+            },
+        }
+        written += 1
+    
+    # 消えた日のチャンクを削除
+    for date in set(state) - set(dates):
+        stale_path = os.path.join(signals_dir, f'signals_{date}.json')
+        remove_output(stale_path)
+        del state[date]
+    save_state('signal_chunks', state)
     
-    output_path = os.path.join(CONFIG['OUTPUT_DIR'], 'signals.json')
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(signals, f, ensure_ascii=False, indent=2)
+    series = update_signal_series(signals_dir)
+    total = HISTORY.count('signals')
     
-    print(f"Saved {len(signals)} signals to {output_path}")
-    return signals
+    manifest = {
+        'version': 1,
+        'updated_at': datetime.now().isoformat(),
+        'total': total,
+        'flags': list(SIGNAL_FLAGS),
+        'chunks': [state[d]['meta'] for d in dates],
+        'series': series,
+        # 期間外でもペアごとの最新値は表示できるように
+        'latest': HISTORY.latest_signals(),
+    }
+    output_path = os.path.join(signals_dir, 'manifest.json')
+    write_json(output_path, manifest)
+    
+    print(f"Saved {total} signals in {len(dates)} chunks ({written} rewritten) to {signals_dir}")
+    return total
 
 def update_wallet_data():
     """ウォレットデータを更新"""
     print("Updating wallet data...")
     
-    # 残高取得
-    balance_data = get_solana_balance(CONFIG['WALLET_ADDRESS'])
-    
-    # 価格情報取得
-    prices = get_crypto_prices()
-    
-    # 総資産計算（USD換算）
-    sol_value_usd = balance_data['sol_balance'] * prices['sol_price']
-    wbtc_value_usd = balance_data['wbtc_balance'] * prices['btc_price']
-    bnb_value_usd = balance_data['bnb_balance'] * prices['bnb_price']
-    total_usd = sol_value_usd + balance_data['usdc_balance'] + wbtc_value_usd + bnb_value_usd
+    # 残高（全ウォレットを RPC バッチ1回）と価格（キャッシュ優先）を並行取得
+    symbols = price_targets()
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        prices_future = pool.submit(get_token_prices, symbols)
+        balance_data = get_solana_balances(wallet_addresses())
+        prices = prices_future.result()
+    # 初めて見たミントの価格は残高が分かってから引く
+    new_mints = {t['mint']: t['symbol'] for t in balance_data['other_tokens'] if t['mint'] not in symbols}
+    symbols.update({t['mint']: t['symbol'] for t in balance_data['other_tokens']})
+    if new_mints:
+        prices.update(get_token_prices(new_mints))
+
+    def price_of(mint):
+        return prices[mint]['usd'] if mint in prices else None
+
+    # 総資産計算（USD換算）。価格が一度も取れていないトークンは合計に含めない
+    sol_price = price_of(CONFIG['SOL_MINT'])
+    btc_price = price_of(CONFIG['WBTC_MINT'])
+    bnb_price = price_of(CONFIG['BNB_MINT'])
+    sol_value_usd = balance_data['sol_balance'] * (sol_price or 0)
+    wbtc_value_usd = balance_data['wbtc_balance'] * (btc_price or 0)
+    bnb_value_usd = balance_data['bnb_balance'] * (bnb_price or 0)
+    other_tokens = []
+    for token in balance_data['other_tokens']:
+        price = prices.get(token['mint'])
+        other_tokens.append(dict(token,
+                                 price_usd=price['usd'] if price else None,
+                                 value_usd=token['amount'] * price['usd'] if price else None,
+                                 price_fetched_at=price['fetched_at'] if price else None))
+    other_tokens_usd = sum(t['value_usd'] or 0 for t in other_tokens)
+    total_usd = sol_value_usd + balance_data['usdc_balance'] + wbtc_value_usd + bnb_value_usd + other_tokens_usd
+
+    held = {CONFIG['SOL_MINT']: balance_data['sol_balance'], CONFIG['WBTC_MINT']: balance_data['wbtc_balance'],
+            CONFIG['BNB_MINT']: balance_data['bnb_balance'],
+            **{t['mint']: t['amount'] for t in balance_data['other_tokens']}}
+    unpriced = [mint for mint, amount in held.items() if amount and mint not in prices]
+    used = [prices[mint] for mint, amount in held.items() if amount and mint in prices]
+    # 主要ミントと、以前は価格が取れていたミントの価格欠けは 0 ドル扱いの合計になるので stale。
+    # 一度も価格の付いたことのないトークン（エアドロップのスパムなど）だけは合計から外すだけにする
+    priced_before = load_state('price_cache', {'prices': {}, 'failed': {}})['prices']
+    core = {CONFIG['SOL_MINT'], CONFIG['WBTC_MINT'], CONFIG['BNB_MINT']}
+    missing_prices = [mint for mint in unpriced if mint in core or mint in priced_before]
     
     wallet_data = {
         'timestamp': datetime.now().isoformat(),
@@ -218,19 +1643,32 @@ def update_wallet_data():
         'usdc_balance': balance_data['usdc_balance'],
         'wbtc_balance': balance_data['wbtc_balance'],
         'bnb_balance': balance_data['bnb_balance'],
-        'other_tokens': balance_data.get('other_tokens', []),
-        'sol_price_usd': prices['sol_price'],
-        'btc_price_usd': prices['btc_price'],
-        'bnb_price_usd': prices['bnb_price'],
+        'other_tokens': other_tokens,
+        'wallets': balance_data.get('wallets', []),
+        'sol_price_usd': sol_price,
+        'btc_price_usd': btc_price,
+        'bnb_price_usd': bnb_price,
         'sol_value_usd': sol_value_usd,
         'wbtc_value_usd': wbtc_value_usd,
         'bnb_value_usd': bnb_value_usd,
-        'total_usd': total_usd
+        'other_tokens_usd': other_tokens_usd,
+        'total_usd': total_usd,
+        # シンボル（なければミント）ごとの価格と取得時刻・取得元
+        'prices': {symbols.get(mint) or mint: entry for mint, entry in prices.items()},
+        'unpriced_mints': unpriced,
+        'balance_fetched_at': balance_data['fetched_at'],
+        'prices_fetched_at': min((p['fetched_at'] for p in used), default=None),
+        'stale': balance_data['stale'] or any(p['stale'] for p in used) or bool(missing_prices)
     }
+    # 24時間前の総資産（概要タブの前日比）
+    wallet_data['previous_total_usd'] = HISTORY.wallet_value_at(
+        to_epoch_ms(wallet_data['timestamp']) - 86400 * 1000)
     
     output_path = os.path.join(CONFIG['OUTPUT_DIR'], 'wallet.json')
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(wallet_data, f, ensure_ascii=False, indent=2)
+    write_json(output_path, wallet_data)
+    if not wallet_data['stale']:
+        HISTORY.add_wallet_snapshot(wallet_data)
+    update_equity_curve()
     
     print(f"Saved wallet data to {output_path}")
     print(f"SOL: {balance_data['sol_balance']:.4f} (${sol_value_usd:.2f})")
@@ -239,129 +1677,786 @@ def update_wallet_data():
     
     return wallet_data
 
-def update_tasks_data():
-    """タスクデータを更新（プロジェクト階層構造対応）"""
-    print("Updating tasks data...")
-    
-    tasks_file = '../tasks.json'  # ワークスペースルートのtasks.json
-    
-    tasks_data = {"members": {}, "projects": []}
-    try:
-        if os.path.exists(tasks_file):
-            with open(tasks_file, 'r', encoding='utf-8') as f:
-                tasks_data = json.load(f)
-        else:
-            print(f"Tasks file not found: {tasks_file}")
-    except Exception as e:
-        print(f"Error reading tasks file: {e}")
-        return tasks_data
-    
-    # 統計計算
-    def count_tasks_recursive(tasks):
-        """再帰的にタスク数をカウント"""
-        total = 0
-        completed = 0
-        
-        for task in tasks:
-            total += 1
-            if task.get('status') == 'completed':
-                completed += 1
-            
-            # サブタスクがあれば再帰的にカウント
-            if 'subtasks' in task and task['subtasks']:
-                sub_total, sub_completed = count_tasks_recursive(task['subtasks'])
-                total += sub_total
-                completed += sub_completed
-        
-        return total, completed
-    
-    # プロジェクト別統計計算
+def update_equity_curve():
+    """総資産の推移（日次 → 15分 → 生データをつないだもの）を equity.json に書き出す"""
+    segments, times, values = HISTORY.equity_curve()
+    output_path = os.path.join(CONFIG['OUTPUT_DIR'], 'equity.json')
+    write_json(output_path, {
+        'updated_at': datetime.now().isoformat(),
+        'segments': segments,
+        'columns': {'t': times, 'usd': values},
+    })
+    print(f"Saved {len(times)} equity points to {output_path}")
+
+# ─── 損益 (FIFO) ───
+PNL_QUOTE = 'USDC'
+PNL_EPSILON = 1e-12
+
+def _new_pnl_state():
+    return {'count': 0, 'watermark': None, 'fees_sol': 0.0, 'tokens': {}, 'round_trips': []}
+
+def _pnl_token(state, token):
+    return state['tokens'].setdefault(token, {
+        'lots': deque(), 'realized_usd': 0.0, 'fees_sol': 0.0,
+        'unmatched_qty': 0.0, 'unmatched_proceeds_usd': 0.0,
+    })
+
+def _consume_lots(lots, qty):
+    """先頭のロットから qty を払い出す
+
+    (払い出した数量, その原価, そのロットに載っていた手数料SOL, 最初のロットの時刻) を返す。
+    ロットが足りなければ払い出せた分だけ。
+    """
+    taken = cost = fee_sol = 0.0
+    first = None
+    while qty - taken > PNL_EPSILON and lots:
+        lot = lots[0]
+        take = min(qty - taken, lot['qty'])
+        share = take / lot['qty']
+        first = first or lot['timestamp']
+        taken += take
+        cost += lot['cost_usd'] * share
+        fee_sol += lot['fee_sol'] * share
+        lot['qty'] -= take
+        lot['cost_usd'] -= lot['cost_usd'] * share
+        lot['fee_sol'] -= lot['fee_sol'] * share
+        if lot['qty'] <= PNL_EPSILON:
+            lots.popleft()
+    return taken, cost, fee_sol, first
+
+def apply_trade_fifo(state, trade):
+    """1件のトレードをトークンごとのFIFOロットに反映する
+
+    USDCで買う → 買ったトークンのロットを積む（原価 = 支払ったUSDC）
+    USDCに売る → 古いロットから払い出し、受け取ったUSDCとの差を確定損益にする
+    トークン同士の交換 → 払い出したロットの原価をそのまま受け取ったトークンのロットへ移す
+    ロットの足りない売り（記録開始前から持っていた分など）は原価不明として確定損益に含めない。
+    """
+    fee_sol = float(trade.get('fee_sol') or 0)
+    state['fees_sol'] += fee_sol  # 失敗したトランザクションも手数料はかかる
+    if trade.get('status') != 'Success':
+        return
+    src = str(trade.get('input_token') or '').upper()
+    dst = str(trade.get('output_token') or '').upper()
+    amount_in = float(trade.get('input_amount') or 0)
+    amount_out = float(trade.get('output_amount') or 0)
+    timestamp = trade.get('timestamp')
+    if not src or not dst or amount_in <= 0:
+        return
+
+    if src == PNL_QUOTE:
+        token = _pnl_token(state, dst)
+        token['fees_sol'] += fee_sol
+        token['lots'].append({'qty': amount_out, 'cost_usd': amount_in, 'fee_sol': fee_sol, 'timestamp': timestamp})
+        return
+
+    source = _pnl_token(state, src)
+    source['fees_sol'] += fee_sol
+    taken, cost, lot_fee_sol, first = _consume_lots(source['lots'], amount_in)
+    matched = taken / amount_in
+    if amount_in - taken > PNL_EPSILON:
+        source['unmatched_qty'] += amount_in - taken
+        if dst == PNL_QUOTE:
+            source['unmatched_proceeds_usd'] += amount_out * (1 - matched)
+    if not taken:
+        return
+
+    if dst == PNL_QUOTE:
+        proceeds = amount_out * matched
+        pnl = proceeds - cost
+        source['realized_usd'] += pnl
+        state['round_trips'].append({
+            'token': src,
+            'qty': taken,
+            'buy_usd': cost,
+            'sell_usd': proceeds,
+            'buy_date': first,
+            'sell_date': timestamp,
+            'fee_sol': lot_fee_sol + fee_sol,
+            'pnl': pnl,
+        })
+    else:
+        _pnl_token(state, dst)['lots'].append({
+            'qty': amount_out * matched, 'cost_usd': cost,
+            'fee_sol': lot_fee_sol + fee_sol, 'timestamp': first,
+        })
+
+def wallet_prices(wallet):
+    """wallet.json から トークン → USD価格"""
+    if not wallet:
+        return {PNL_QUOTE: 1.0}
+    prices = {
+        PNL_QUOTE: 1.0,
+        'SOL': wallet.get('sol_price_usd'),
+        'WBTC': wallet.get('btc_price_usd'),
+        'BNB': wallet.get('bnb_price_usd'),
+    }
+    for token in wallet.get('other_tokens', []):
+        if token.get('price_usd') is not None:
+            prices[str(token.get('symbol') or token.get('mint')).upper()] = token['price_usd']
+    return {k: v for k, v in prices.items() if v}
+
+def update_pnl_data():
+    """トレード履歴をFIFOで突き合わせ、確定・含み損益を pnl.json に書き出す
+
+    ロットの状態は保存しておき、前回以降のトレードだけを反映する。
+    件数が合わない（過去の時刻のトレードが後から入った等）ときは全件からやり直す。
+    時刻の読めないトレードは順序が決まらないので、FIFO には含めず untimed_trades に数だけ出す
+    （含めると毎回 since に一致せず件数が合わなくなり、全件やり直しが続く）。
+    """
+    print("Updating PnL data...")
+    state = load_state('pnl')
+    new_trades = HISTORY.query('trades', since=state.get('watermark'), timed=True) if state else []
+    total = HISTORY.count('trades', timed=True)
+    if not state or state['count'] + len(new_trades) != total:
+        state = _new_pnl_state()
+        new_trades = HISTORY.query('trades', timed=True)
+
+    for token in state['tokens'].values():
+        token['lots'] = deque(token['lots'])
+    for trade in new_trades:
+        apply_trade_fifo(state, trade)
+        state['watermark'] = to_epoch_ms(trade.get('timestamp')) or state['watermark']
+    state['count'] = total
+    for token in state['tokens'].values():
+        token['lots'] = list(token['lots'])
+    save_state('pnl', state)
+
+    # 含み損益は最新の価格で評価する（手数料のUSD換算も現在のSOL価格）
+    prices = wallet_prices(read_output('wallet.json'))
+    sol_price = prices.get('SOL', 0)
+    tokens = {}
+    for name, token in sorted(state['tokens'].items()):
+        quantity = sum(lot['qty'] for lot in token['lots'])
+        cost = sum(lot['cost_usd'] for lot in token['lots'])
+        price = prices.get(name)
+        value = quantity * price if price is not None else None
+        tokens[name] = {
+            'quantity': quantity,
+            'cost_usd': cost,
+            'avg_price': cost / quantity if quantity > PNL_EPSILON else None,
+            'price_usd': price,
+            'value_usd': value,
+            'unrealized_usd': value - cost if value is not None else None,
+            'realized_usd': token['realized_usd'],
+            'fees_sol': token['fees_sol'],
+            'unmatched_qty': token['unmatched_qty'],
+            'unmatched_proceeds_usd': token['unmatched_proceeds_usd'],
+            'entry_date': token['lots'][0]['timestamp'] if token['lots'] else None,
+        }
+    realized = sum(t['realized_usd'] for t in tokens.values())
+    unrealized = sum(t['unrealized_usd'] or 0 for t in tokens.values())
+    fees_usd = state['fees_sol'] * sol_price
+    pnl_data = {
+        'updated_at': datetime.now().isoformat(),
+        'totals': {
+            'realized_usd': realized,
+            'unrealized_usd': unrealized,
+            'fees_sol': state['fees_sol'],
+            'fees_usd': fees_usd,
+            'net_usd': realized + unrealized - fees_usd,
+            'round_trips': len(state['round_trips']),
+            'wins': sum(1 for rt in state['round_trips'] if rt['pnl'] > 0),
+            'losses': sum(1 for rt in state['round_trips'] if rt['pnl'] < 0),
+            'untimed_trades': HISTORY.count('trades') - total,
+        },
+        'tokens': tokens,
+        'round_trips': state['round_trips'],
+    }
+    output_path = os.path.join(CONFIG['OUTPUT_DIR'], 'pnl.json')
+    write_json(output_path, pnl_data)
+    print(f"Saved PnL ({len(new_trades)} new trades, realized ${realized:.2f}, unrealized ${unrealized:.2f}) to {output_path}")
+    return pnl_data
+
+# 指示待ち（pending）のタスクを数える担当者
+TASK_OWNER = 'hikarimaru'
+
+def build_task_table(projects):
+    """タスク木を1回の反復走査で平坦化し、索引と集計を作る
+
+    各タスクに行番号 row を書き込み、行は先行順に並べる。
+    children[row] は子の行番号、roots はプロジェクトごとの最上位の行番号、
+    by_status / by_assignee は行番号の索引。
+    """
+    rows, children = [], []
+    by_status, by_assignee = {}, {}
     project_stats = []
-    total_all_tasks = 0
-    completed_all_tasks = 0
-    
-    for project in tasks_data.get('projects', []):
-        project_tasks = project.get('tasks', [])
-        total_tasks, completed_tasks = count_tasks_recursive(project_tasks)
-        
-        progress_percentage = 0
-        if total_tasks > 0:
-            progress_percentage = round((completed_tasks / total_tasks) * 100, 1)
-        
+    for index, project in enumerate(projects):
+        roots = []
+        status_counts, assignee_counts = {}, {}
+        owner_pending = 0
+        stack = [(task, None, 0) for task in reversed(project.get('tasks') or [])]
+        while stack:
+            task, parent, depth = stack.pop()
+            row = len(rows)
+            task['row'] = row
+            status = task.get('status') or ''
+            assignee = task.get('assignee') or ''
+            rows.append({
+                'id': task.get('id'),
+                'project': index,
+                'parent': parent,
+                'depth': depth,
+                'status': status,
+                'assignee': assignee,
+                'completed_at': task.get('completed_at'),
+            })
+            children.append([])
+            (roots if parent is None else children[parent]).append(row)
+            by_status.setdefault(status, []).append(row)
+            by_assignee.setdefault(assignee, []).append(row)
+            status_counts[status] = status_counts.get(status, 0) + 1
+            assignee_counts[assignee] = assignee_counts.get(assignee, 0) + 1
+            if assignee == TASK_OWNER and status == 'pending':
+                owner_pending += 1
+            stack.extend((sub, row, depth + 1) for sub in reversed(task.get('subtasks') or []))
+
+        total_tasks = sum(status_counts.values())
+        completed_tasks = status_counts.get('completed', 0)
         project_stats.append({
-            'id': project['id'],
-            'name': project['name'],
+            'id': project.get('id'),
+            'name': project.get('name'),
             'total_tasks': total_tasks,
             'completed_tasks': completed_tasks,
-            'progress_percentage': progress_percentage
+            'progress_percentage': round(completed_tasks / total_tasks * 100, 1) if total_tasks else 0,
+            'status_counts': status_counts,
+            'assignee_counts': assignee_counts,
+            'hikarimaru_pending': owner_pending,
+            'roots': roots,
         })
-        
-        total_all_tasks += total_tasks
-        completed_all_tasks += completed_tasks
-    
-    # 統計情報を追加
-    tasks_data['statistics'] = {
-        'total_tasks': total_all_tasks,
-        'completed_tasks': completed_all_tasks,
-        'overall_progress': round((completed_all_tasks / total_all_tasks * 100), 1) if total_all_tasks > 0 else 0,
-        'projects': project_stats
+
+    total_all = len(rows)
+    completed_all = len(by_status.get('completed', []))
+    statistics = {
+        'total_tasks': total_all,
+        'completed_tasks': completed_all,
+        'overall_progress': round(completed_all / total_all * 100, 1) if total_all else 0,
+        'status_counts': {status: len(found) for status, found in by_status.items()},
+        'assignee_counts': {assignee: len(found) for assignee, found in by_assignee.items()},
+        'hikarimaru_pending': sum(p['hikarimaru_pending'] for p in project_stats),
+        'projects': project_stats,
     }
+    index = {'rows': rows, 'children': children, 'by_status': by_status, 'by_assignee': by_assignee}
+    return statistics, index
+
+def update_tasks_data():
+    """タスクデータを更新（プロジェクト階層構造対応）
+
+    tasks.json の内容のハッシュが前回と同じで出力もあれば、パースも集計もしない。
+    読めない・壊れている場合は例外を送出し（ステージの失敗）、前回の出力をそのまま残す。
+    """
+    print("Updating tasks data...")
     
+    tasks_file = os.path.join(CONFIG['WORKSPACE_DIR'], 'tasks.json')  # ワークスペースルートのtasks.json
     output_path = os.path.join(CONFIG['OUTPUT_DIR'], 'tasks.json')
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(tasks_data, f, ensure_ascii=False, indent=2)
     
-    print(f"Saved {len(tasks_data.get('projects', []))} projects with {total_all_tasks} total tasks to {output_path}")
-    return tasks_data
+    raw = None
+    try:
+        with open(tasks_file, 'rb') as f:
+            raw = f.read()
+    except FileNotFoundError:
+        print(f"Tasks file not found: {tasks_file}")
+    except OSError as e:
+        raise RuntimeError(f"Error reading tasks file {tasks_file}: {e}") from e
+    
+    sha256 = hashlib.sha256(raw).hexdigest() if raw is not None else 'missing'
+    cache = load_state('tasks_index')
+    hit = cache.get('sha256') == sha256 and os.path.exists(output_path)
+    METRICS.cache('tasks_index', hit)
+    if hit:
+        print(f"Tasks unchanged ({cache['statistics']['total_tasks']} tasks)")
+        return cache['statistics']
+    
+    tasks_data = {"members": {}, "projects": []}
+    if raw is not None:
+        try:
+            tasks_data = json.loads(raw)
+        except ValueError as e:
+            raise RuntimeError(f"Error parsing tasks file {tasks_file}: {e}") from e
+    
+    tasks_data['statistics'], tasks_data['index'] = build_task_table(tasks_data.get('projects', []))
+    write_json(output_path, tasks_data)
+    
+    statistics = tasks_data['statistics']
+    save_state('tasks_index', {'sha256': sha256, 'statistics': statistics})
+    print(f"Saved {len(tasks_data.get('projects', []))} projects with {statistics['total_tasks']} total tasks to {output_path}")
+    return statistics
+
+# ─── 日報（Markdown をサーバー側でサニタイズ済みHTMLに変換） ───
+REPORT_TITLE_LENGTH = 80
+MARKDOWN_SAFE_SCHEMES = ('http://', 'https://')
+
+def _render_inline(text):
+    """行内要素（`code` / **強調** / [リンク](url)）を変換。text はエスケープ前の生テキスト"""
+    parts = text.split('`')
+    if len(parts) % 2 == 0:
+        parts[-2:] = ['`'.join(parts[-2:])]  # 閉じていないバッククォートはそのまま
+    out = []
+    for i, part in enumerate(parts):
+        escaped = html.escape(part, quote=True)
+        if i % 2:
+            out.append(f'<code>{escaped}</code>')
+            continue
+        escaped = re.sub(r'\*\*(.+?)\*\*', r'<strong>\1</strong>', escaped)
+        def link(m):
+            label, url = m.group(1), m.group(2)
+            if not html.unescape(url).lower().startswith(MARKDOWN_SAFE_SCHEMES):
+                return label  # javascript: などはリンクにしない
+            return f'<a href="{url}" target="_blank" rel="noopener noreferrer">{label}</a>'
+        out.append(re.sub(r'\[([^\]]+)\]\(([^)\s]+)\)', link, escaped))
+    return ''.join(out)
+
+def render_markdown(text):
+    """日報の Markdown を HTML に変換する
+
+    見出し・箇条書き（番号付き含む）・コードブロック・水平線・段落のみを扱い、
+    本文は必ずエスケープするので生の HTML やスクリプトは出力されない。
+    """
+    blocks = []
+    paragraph, items, code = [], None, None
+    list_tag = None
+
+    def close_paragraph():
+        if paragraph:
+            blocks.append('<p>' + '<br>'.join(_render_inline(l) for l in paragraph) + '</p>')
+            paragraph.clear()
+
+    def close_list():
+        nonlocal items, list_tag
+        if items is not None:
+            blocks.append(f'<{list_tag}>' + ''.join(f'<li>{_render_inline(i)}</li>' for i in items) + f'</{list_tag}>')
+            items, list_tag = None, None
+
+    for line in text.splitlines():
+        if code is not None:
+            if line.strip().startswith('```'):
+                blocks.append('<pre><code>' + html.escape('\n'.join(code)) + '</code></pre>')
+                code = None
+            else:
+                code.append(line)
+            continue
+        stripped = line.strip()
+        heading = re.match(r'(#{1,4})\s+(.+)', stripped)
+        bullet = re.match(r'[-*+]\s+(.+)', stripped)
+        numbered = re.match(r'\d+[.)]\s+(.+)', stripped)
+        if stripped.startswith('```'):
+            close_paragraph()
+            close_list()
+            code = []
+        elif not stripped:
+            close_paragraph()
+            close_list()
+        elif re.fullmatch(r'(-{3,}|\*{3,}|_{3,})', stripped):
+            close_paragraph()
+            close_list()
+            blocks.append('<hr>')
+        elif heading:
+            close_paragraph()
+            close_list()
+            level = min(len(heading.group(1)) + 1, 5)  # # → h2（カード内の見出し階層に合わせる）
+            title = re.sub(r'\s+#+$', '', heading.group(2))  # 閉じの ## は落とす
+            blocks.append(f'<h{level}>{_render_inline(title)}</h{level}>')
+        elif bullet or numbered:
+            close_paragraph()
+            tag = 'ul' if bullet else 'ol'
+            if list_tag != tag:
+                close_list()
+                items, list_tag = [], tag
+            items.append((bullet or numbered).group(1))
+        else:
+            close_list()
+            paragraph.append(stripped)
+    if code is not None:
+        blocks.append('<pre><code>' + html.escape('\n'.join(code)) + '</code></pre>')
+    close_paragraph()
+    close_list()
+    return '\n'.join(blocks)
+
+def report_title(text):
+    """最初の見出し（なければ最初の行）をプレーンテキストのタイトルにする"""
+    for line in text.splitlines():
+        line = line.strip().lstrip('#').strip()
+        if line:
+            line = re.sub(r'\*\*(.+?)\*\*|`([^`]*)`', lambda m: m.group(1) or m.group(2) or '', line)
+            return line[:REPORT_TITLE_LENGTH]
+    return ''
+
+def _render_report(path, date):
+    """日報ファイル1つを読み込んで {date, title, html}（空なら None）"""
+    with open(path, 'r', encoding='utf-8') as f:
+        content = f.read().strip()
+    if not content:
+        return None
+    return {'date': date, 'title': report_title(content), 'html': render_markdown(content)}
 
 def update_daily_reports_data():
-    """日報データを更新"""
+    """日報データを更新
+
+    memory/YYYY-MM-DD.md の mtime / サイズを .state/daily_reports.json に覚えておき、
+    変わったファイルだけを読み直して HTML に変換する。
+    出力は日付・タイトルだけの索引（daily_reports.json）と、本文を含む月別ファイル
+    （reports/YYYY-MM.json）に分け、ダッシュボードは日報を開いたときに月別ファイルを読む。
+    """
     print("Updating daily reports data...")
     
-    memory_dir = '../memory'  # ワークスペースルートのmemoryディレクトリ
-    reports = []
+    memory_dir = os.path.join(CONFIG['WORKSPACE_DIR'], 'memory')  # ワークスペースルートのmemoryディレクトリ
+    reports_dir = os.path.join(CONFIG['OUTPUT_DIR'], 'reports')
+    if not os.path.exists(reports_dir):
+        os.makedirs(reports_dir)
     
-    try:
-        if os.path.exists(memory_dir):
-            # memory/YYYY-MM-DD.mdファイルを探す
-            pattern = os.path.join(memory_dir, '????-??-??.md')
-            files = glob.glob(pattern)
-            files.sort(reverse=True)  # 新しい日付から
-            
-            for file_path in files:
+    state = load_state('daily_reports')
+    if 'files' not in state:
+        state = {'files': {}, 'months': {}}
+    files, months = state['files'], state['months']
+    
+    # memory/YYYY-MM-DD.mdファイルを探し、mtime / サイズが変わったものを集める
+    found, changed = {}, {}
+    if os.path.exists(memory_dir):
+        for file_path in glob.glob(os.path.join(memory_dir, '????-??-??.md')):
+            date_str = os.path.basename(file_path)[:-3]
+            if date_str not in files:
                 try:
-                    filename = os.path.basename(file_path)
-                    date_str = filename.replace('.md', '')
-                    
-                    # 日付の妥当性チェック
-                    try:
-                        datetime.strptime(date_str, '%Y-%m-%d')
-                    except ValueError:
-                        continue
-                    
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        content = f.read().strip()
-                    
-                    if content:  # 空でないファイルのみ
-                        reports.append({
-                            'date': date_str,
-                            'content': content
-                        })
-                        
-                except Exception as e:
-                    print(f"Error reading {file_path}: {e}")
+                    datetime.strptime(date_str, '%Y-%m-%d')  # 日付の妥当性チェック（初見のファイルのみ）
+                except ValueError:
+                    continue
+            try:
+                st = os.stat(file_path)
+            except OSError as e:
+                print(f"Error reading {file_path}: {e}")
+                continue
+            found[date_str] = file_path
+            entry = files.get(date_str)
+            if not entry or entry['mtime_ns'] != st.st_mtime_ns or entry['size'] != st.st_size:
+                changed[date_str] = st
+    else:
+        print(f"Memory directory not found: {memory_dir}")
+    
+    removed = set(files) - set(found)
+    METRICS.cache('daily_reports', True, len(found) - len(changed))
+    METRICS.cache('daily_reports', False, len(changed))
+    dirty = {d[:7] for d in changed} | {d[:7] for d in removed}
+    dirty |= {m for m in months if not os.path.exists(os.path.join(reports_dir, f'{m}.json'))}
+    
+    rendered = 0
+    for month in sorted(dirty):
+        file_name = f'{month}.json'
+        month_path = os.path.join(reports_dir, file_name)
+        # 変わっていない日報は前回書き出した月別ファイルから引き継ぐ
+        previous = {}
+        try:
+            with open(month_path, 'r', encoding='utf-8') as f:
+                previous = {r['date']: r for r in json.load(f)['reports']}
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        reports = []
+        for date_str in sorted((d for d in found if d.startswith(month)), reverse=True):
+            file_path = found[date_str]
+            if date_str in previous and date_str not in changed:
+                reports.append(previous[date_str])
+                continue
+            try:
+                st = changed.get(date_str) or os.stat(file_path)
+                report = _render_report(file_path, date_str)
+            except (OSError, UnicodeDecodeError) as e:
+                print(f"Error reading {file_path}: {e}")
+                files.pop(date_str, None)
+                continue
+            rendered += 1
+            files[date_str] = {'mtime_ns': st.st_mtime_ns, 'size': st.st_size,
+                               'title': report['title'] if report else None}
+            if report:  # 空でないファイルのみ
+                reports.append(report)
+        for date_str in removed:
+            if date_str.startswith(month):
+                del files[date_str]
+        if reports:
+            write_json(month_path, {'month': month, 'reports': reports})
+            months[month] = {
+                'count': len(reports),
+                # 索引に載せて ?v= に使う（変わった月だけブラウザに取り直させる）
+                'version': hashlib.sha1(JSON_ENCODER.encode(reports).encode('utf-8')).hexdigest()[:12],
+            }
         else:
-            print(f"Memory directory not found: {memory_dir}")
-            
-    except Exception as e:
-        print(f"Error updating daily reports: {e}")
+            remove_output(month_path)
+            months.pop(month, None)
+    save_state('daily_reports', state)
     
+    index = {
+        'version': 1,
+        'updated_at': datetime.now().isoformat(),
+        'count': sum(m['count'] for m in months.values()),
+        'months': [{'month': m, 'file': f'reports/{m}.json', **months[m]}
+                   for m in sorted(months, reverse=True)],
+        # 新しい日付から
+        'reports': [{'date': d, 'title': files[d]['title'], 'month': d[:7]}
+                    for d in sorted(files, reverse=True) if files[d]['title'] is not None],
+    }
     output_path = os.path.join(CONFIG['OUTPUT_DIR'], 'daily_reports.json')
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(reports, f, ensure_ascii=False, indent=2)
+    write_json(output_path, index)
     
-    print(f"Saved {len(reports)} daily reports to {output_path}")
-    return reports
+    print(f"Saved {index['count']} daily reports in {len(months)} months ({rendered} rendered) to {output_path}")
+    return index
+
+# ─── プロセス監視（PIDファイル + /proc） ───
+CLK_TCK = os.sysconf('SC_CLK_TCK') if hasattr(os, 'sysconf') else 100
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+PID_START_TOLERANCE = 5  # 秒。PIDファイルより後に起動したプロセスは PID の再利用とみなす
+_boot_time = None
+
+def boot_time():
+    """/proc/stat の btime（起動時刻のエポック秒）"""
+    global _boot_time
+    if _boot_time is None:
+        with open('/proc/stat', 'r') as f:
+            _boot_time = next(int(line.split()[1]) for line in f if line.startswith('btime '))
+    return _boot_time
+
+def read_proc_stat(pid):
+    """/proc/<pid>/stat から (状態, CPU tick 合計, 起動 tick, RSS バイト)"""
+    with open(f'/proc/{pid}/stat', 'r') as f:
+        raw = f.read()
+    fields = raw[raw.rindex(')') + 2:].split()  # comm は空白や括弧を含みうる。fields[0] が3番目の項目
+    return fields[0], int(fields[11]) + int(fields[12]), int(fields[19]), int(fields[21]) * PAGE_SIZE
+
+def probe_process(name, spec, previous=None):
+    """PIDファイルのプロセスが生きているかを fork せずに調べる
+
+    /proc/<pid>/cmdline に spec['cmdline'] が含まれ、起動時刻が PIDファイルの mtime 以前なら
+    本物とみなし、稼働時間・RSS・CPU使用率を返す。previous（前回の sample）が同じプロセスなら
+    CPU使用率はその間の平均、そうでなければ起動からの平均。
+    /proc がない環境では kill(pid, 0) の生存確認だけ行う（verified は False）。
+    """
+    result = {
+        'name': name, 'pid_file': spec['pid_file'], 'pid': None, 'running': False, 'verified': False,
+        'reason': None, 'started_at': None, 'uptime_seconds': None, 'rss_bytes': None,
+        'cpu_seconds': None, 'cpu_percent': None, 'sample': None,
+    }
+    try:
+        with open(spec['pid_file'], 'r') as f:
+            pid = int(f.read().split()[0])
+        pid_mtime = os.path.getmtime(spec['pid_file'])
+    except FileNotFoundError:
+        result['reason'] = 'no_pid_file'
+        return result
+    except (OSError, ValueError, IndexError):
+        result['reason'] = 'bad_pid_file'
+        return result
+    result['pid'] = pid
+
+    if not os.path.isdir('/proc/self'):
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            result['reason'] = 'not_running'
+            return result
+        except PermissionError:
+            pass  # 他ユーザーのプロセスでも生きてはいる
+        result['running'] = True
+        result['reason'] = 'unverified'
+        return result
+
+    try:
+        with open(f'/proc/{pid}/cmdline', 'rb') as f:
+            cmdline = f.read().replace(b'\0', b' ').decode('utf-8', 'replace').strip()
+        state, cpu_ticks, start_ticks, rss = read_proc_stat(pid)
+    except (FileNotFoundError, ProcessLookupError):
+        result['reason'] = 'not_running'
+        return result
+    if state in ('Z', 'X'):
+        result['reason'] = 'not_running'
+        return result
+    if spec['cmdline'] not in cmdline:
+        result['reason'] = 'cmdline_mismatch'
+        return result
+    started = boot_time() + start_ticks / CLK_TCK
+    if started > pid_mtime + PID_START_TOLERANCE:
+        result['reason'] = 'pid_reused'
+        return result
+
+    now = time.time()
+    uptime = max(now - started, 0.0)
+    cpu_seconds = cpu_ticks / CLK_TCK
+    if previous and previous.get('pid') == pid and previous.get('start_ticks') == start_ticks and now > previous['at']:
+        cpu_percent = (cpu_ticks - previous['cpu_ticks']) / CLK_TCK / (now - previous['at']) * 100
+    else:
+        cpu_percent = cpu_seconds / uptime * 100 if uptime else 0.0
+    result.update({
+        'running': True,
+        'verified': True,
+        'started_at': datetime.fromtimestamp(started).isoformat(timespec='seconds'),
+        'uptime_seconds': round(uptime),
+        'rss_bytes': rss,
+        'cpu_seconds': round(cpu_seconds, 2),
+        'cpu_percent': round(cpu_percent, 1),
+        'sample': {'pid': pid, 'start_ticks': start_ticks, 'cpu_ticks': cpu_ticks, 'at': now},
+    })
+    return result
+
+def update_processes_data():
+    """CONFIG['PROCESSES'] の各ボットの生存状態・稼働時間・RSS・CPUを processes.json に書き出す"""
+    print("Updating processes data...")
+    
+    samples = load_state('process_samples')
+    processes = []
+    for name, spec in CONFIG['PROCESSES'].items():
+        info = probe_process(name, spec, samples.get(name))
+        sample = info.pop('sample')
+        if sample:
+            samples[name] = sample
+        else:
+            samples.pop(name, None)
+        processes.append(info)
+    save_state('process_samples', samples)
+    
+    data = {'updated_at': datetime.now().isoformat(), 'processes': processes}
+    output_path = os.path.join(CONFIG['OUTPUT_DIR'], 'processes.json')
+    write_json(output_path, data)
+    
+    running = sum(p['running'] for p in processes)
+    print(f"Saved {len(processes)} processes ({running} running) to {output_path}")
+    return data
+
+def process_status(name):
+    """processes ステージが書いた processes.json からボットの状態を引く（なければその場で調べる）"""
+    path = os.path.join(CONFIG['OUTPUT_DIR'], 'processes.json')
+    if os.path.exists(path):
+        for info in (read_output('processes.json') or {}).get('processes', []):
+            if info.get('name') == name:
+                return info
+    return probe_process(name, CONFIG['PROCESSES'][name])
+
+# ─── 戦略設定（ボットのソースを ast で読む） ───
+# 戦略タイプごとの表示パラメータ: 設定キー → 既定値。ここにないタイプは設定の値をそのまま params にする
+STRATEGY_PARAMS = {
+    'CCI': {'cci_period': None, 'cci_threshold': None, 'sl_pct': None, 'donchian_period': None,
+            'ema_trend_period': 0},
+    'BOLLINGER': {'bb_period': None, 'bb_std': None, 'ema_fast': None, 'ema_slow': None,
+                  'rsi_period': None, 'rsi_exit': None, 'sl_pct': None},
+}
+STRATEGY_COMMON_KEYS = ('strategy', 'enabled', 'trade_symbol')
+# グリッドBotの表示パラメータ → jupiter_grid.py の定数名（または GRID_CONFIG / CONFIG 辞書のキー）の候補
+GRID_PARAMS = {
+    'grid_spacing_pct': ('GRID_SPACING_PCT', 'GRID_SPACING', 'grid_spacing_pct'),
+    'tp_pct': ('TP_PCT', 'TAKE_PROFIT_PCT', 'tp_pct'),
+    'sl_pct': ('SL_PCT', 'STOP_LOSS_PCT', 'sl_pct'),
+    'budget': ('BUDGET', 'BUDGET_USDC', 'TRADE_AMOUNT_USDC', 'budget'),
+}
+GRID_CONFIG_DICTS = ('GRID_CONFIG', 'CONFIG')
+
+_UNRESOLVED = object()
+
+def _constant_value(node, scope):
+    """式ノードを実行せずに値へ評価する（リテラル・既出の定数・環境変数の既定値のみ）"""
+    if isinstance(node, ast.Constant):
+        return node.value if not isinstance(node.value, (bytes, complex)) else _UNRESOLVED
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+        value = _constant_value(node.operand, scope)
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return -value if isinstance(node.op, ast.USub) else value
+        return _UNRESOLVED
+    if isinstance(node, ast.Name):
+        return scope.get(node.id, _UNRESOLVED)
+    if isinstance(node, ast.Dict):
+        # 評価できない項目（**展開や関数呼び出し）だけを落とす
+        result = {}
+        for key_node, value_node in zip(node.keys, node.values):
+            key = _constant_value(key_node, scope) if key_node is not None else _UNRESOLVED
+            value = _constant_value(value_node, scope)
+            if key is not _UNRESOLVED and value is not _UNRESOLVED and isinstance(key, (str, int, float, bool)):
+                result[key] = value
+        return result
+    if isinstance(node, (ast.List, ast.Tuple, ast.Set)):
+        items = [_constant_value(e, scope) for e in node.elts]
+        return _UNRESOLVED if _UNRESOLVED in items else items
+    if isinstance(node, ast.Call) and not node.keywords:
+        func = node.func
+        name = func.id if isinstance(func, ast.Name) else func.attr if isinstance(func, ast.Attribute) else None
+        # float(...) / int(...) などの変換
+        if isinstance(func, ast.Name) and name in ('float', 'int', 'str', 'bool') and len(node.args) == 1:
+            value = _constant_value(node.args[0], scope)
+            if value is _UNRESOLVED:
+                return value
+            try:
+                if name == 'bool' and isinstance(value, str):
+                    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+                return {'float': float, 'int': int, 'str': str, 'bool': bool}[name](value)
+            except (TypeError, ValueError):
+                return _UNRESOLVED
+        # os.environ.get('X', 既定値) / os.getenv('X', 既定値) は既定値を使う
+        if name in ('get', 'getenv') and len(node.args) == 2:
+            owner = ast.unparse(func.value) if isinstance(func, ast.Attribute) else ''
+            if owner in ('os.environ', 'environ', 'os') or name == 'getenv':
+                return _constant_value(node.args[1], scope)
+    return _UNRESOLVED
+
+def parse_module_constants(source):
+    """モジュール直下の定数代入（NAME = ... / NAME: T = ... / NAME['key'] = ...）を辞書にする
+
+    ast で構文解析するだけでコードは実行しない。評価できない値の代入は無視する。
+    """
+    scope = {}
+    for stmt in ast.parse(source).body:
+        if isinstance(stmt, ast.Assign):
+            targets, value_node = stmt.targets, stmt.value
+        elif isinstance(stmt, ast.AnnAssign) and stmt.value is not None:
+            targets, value_node = [stmt.target], stmt.value
+        else:
+            continue
+        value = _constant_value(value_node, scope)
+        for target in targets:
+            if isinstance(target, ast.Name):
+                if value is _UNRESOLVED:
+                    scope.pop(target.id, None)  # 上書きされて値が分からなくなった
+                else:
+                    scope[target.id] = value
+            elif (isinstance(target, ast.Subscript) and isinstance(target.value, ast.Name)
+                  and isinstance(scope.get(target.value.id), dict) and value is not _UNRESOLVED):
+                key = _constant_value(target.slice, scope)
+                if isinstance(key, (str, int, float, bool)):
+                    scope[target.value.id][key] = value
+    return scope
+
+def read_module_constants(path):
+    """ボットのソースから定数を読み、.state/module_constants.json にキャッシュする
+
+    mtime / サイズが同じなら読み直さず、変わっていても内容のハッシュが同じなら構文解析はしない。
+    ファイルがなければ FileNotFoundError、構文エラーなら SyntaxError をそのまま送出する。
+    """
+    key = os.path.abspath(path)
+    st = os.stat(path)
+    cache = load_state('module_constants')
+    entry = cache.get(key)
+    if entry and entry['mtime_ns'] == st.st_mtime_ns and entry['size'] == st.st_size:
+        METRICS.cache('module_constants', True)
+        return entry['constants']
+    with open(path, 'rb') as f:
+        raw = f.read()
+    sha256 = hashlib.sha256(raw).hexdigest()
+    METRICS.cache('module_constants', bool(entry and entry['sha256'] == sha256))
+    if entry and entry['sha256'] == sha256:
+        constants = entry['constants']
+    else:
+        # JSON に載る形（タプル・集合はリスト、キーは文字列）にそろえてからキャッシュする
+        constants = json.loads(JSON_ENCODER.encode(parse_module_constants(raw.decode('utf-8'))))
+    cache[key] = {'mtime_ns': st.st_mtime_ns, 'size': st.st_size, 'sha256': sha256, 'constants': constants}
+    save_state('module_constants', cache)
+    return constants
+
+def strategy_params(config):
+    """STRATEGY_PARAMS に従って戦略設定から表示パラメータを取り出す"""
+    schema = STRATEGY_PARAMS.get(config.get('strategy'))
+    if schema is None:
+        return {k: v for k, v in config.items() if k not in STRATEGY_COMMON_KEYS}
+    return {k: config.get(k, default) for k, default in schema.items()}
+
+def grid_params(constants):
+    """GRID_PARAMS の候補名を定数 → 設定辞書の順に探す（見つからなければ None）"""
+    sources = [constants] + [constants[name] for name in GRID_CONFIG_DICTS
+                             if isinstance(constants.get(name), dict)]
+    params = {}
+    for param, names in GRID_PARAMS.items():
+        params[param] = next((src[n] for src in sources for n in names if n in src), None)
+    return params
 
 def update_portfolio_strategies():
     """ライブBotの戦略設定一覧を生成"""
@@ -372,112 +2467,59 @@ def update_portfolio_strategies():
     strategies = []
     
     try:
-        # Parse TRADING_PAIRS from live_trader.py
-        import ast
-        with open(live_trader_path, 'r') as f:
-            content = f.read()
-        
-        # Find TRADING_PAIRS dict
-        start = content.find('TRADING_PAIRS = {')
-        if start >= 0:
-            # Find matching closing brace
-            depth = 0
-            end = start + len('TRADING_PAIRS = ')
-            for i, ch in enumerate(content[end:], end):
-                if ch == '{':
-                    depth += 1
-                elif ch == '}':
-                    depth -= 1
-                    if depth == 0:
-                        end = i + 1
-                        break
-            
-            try:
-                pairs_str = content[start + len('TRADING_PAIRS = '):end]
-                pairs = ast.literal_eval(pairs_str)
-                
-                for pair_id, config in pairs.items():
-                    strat = {
-                        "pair_id": pair_id,
-                        "strategy": config.get("strategy", "?"),
-                        "enabled": config.get("enabled", True),
-                        "trade_symbol": config.get("trade_symbol", pair_id[:3]),
-                        "params": {},
-                    }
-                    
-                    if config.get("strategy") == "CCI":
-                        strat["params"] = {
-                            "cci_period": config.get("cci_period"),
-                            "cci_threshold": config.get("cci_threshold"),
-                            "sl_pct": config.get("sl_pct"),
-                            "donchian_period": config.get("donchian_period"),
-                            "ema_trend_period": config.get("ema_trend_period", 0),
-                        }
-                    elif config.get("strategy") == "BOLLINGER":
-                        strat["params"] = {
-                            "bb_period": config.get("bb_period"),
-                            "bb_std": config.get("bb_std"),
-                            "ema_fast": config.get("ema_fast"),
-                            "ema_slow": config.get("ema_slow"),
-                            "rsi_period": config.get("rsi_period"),
-                            "rsi_exit": config.get("rsi_exit"),
-                            "sl_pct": config.get("sl_pct"),
-                        }
-                    
-                    strategies.append(strat)
-            except Exception as e:
-                print(f"  Error parsing TRADING_PAIRS: {e}")
-    except Exception as e:
+        pairs = read_module_constants(live_trader_path).get('TRADING_PAIRS', {})
+        for pair_id, config in pairs.items():
+            if not isinstance(config, dict):
+                continue
+            strategies.append({
+                "pair_id": pair_id,
+                "strategy": config.get("strategy", "?"),
+                "enabled": config.get("enabled", True),
+                "trade_symbol": config.get("trade_symbol", pair_id[:3]),
+                "params": strategy_params(config),
+            })
+    except (OSError, SyntaxError, UnicodeDecodeError) as e:
         print(f"  Error reading live_trader.py: {e}")
     
     # Add Jupiter Grid Bot info
     try:
-        import subprocess
-        grid_running = 'jupiter_grid' in subprocess.run(
-            ['ps', 'aux'], capture_output=True, text=True).stdout
+        grid_process = process_status('jupiter_grid')
+        grid_running = grid_process['running']
         
-        if grid_running or os.path.exists('/tmp/jupiter_grid.pid'):
+        if grid_running or grid_process['reason'] != 'no_pid_file':
+            # パラメータはグリッドBot本体の設定から（読めなければ None）
+            grid_path = os.path.join(CONFIG['BOT_DATA_DIR'], '..', 'jupiter_grid.py')
+            try:
+                params = grid_params(read_module_constants(grid_path))
+            except (OSError, SyntaxError, UnicodeDecodeError) as e:
+                print(f"  Error reading jupiter_grid.py: {e}")
+                params = dict.fromkeys(GRID_PARAMS)
+            params["exchange"] = "Jupiter (Solana)"
             grid_strat = {
                 "pair_id": "SOL_GRID",
                 "strategy": "GRID",
                 "enabled": grid_running,
                 "trade_symbol": "SOL",
-                "params": {
-                    "grid_spacing_pct": 1.5,
-                    "tp_pct": 1.5,
-                    "sl_pct": 1.5,
-                    "budget": 20.0,
-                    "exchange": "Jupiter (Solana)",
-                },
+                "params": params,
                 "bot_type": "jupiter_grid",
             }
             
-            # Read grid trade log for stats
-            grid_trades = []
-            grid_log_pattern = os.path.join(CONFIG['BOT_DATA_DIR'], 'trades', 'jgrid_*.jsonl')
-            for f in sorted(glob.glob(grid_log_pattern)):
-                with open(f) as fh:
-                    for line in fh:
-                        try:
-                            grid_trades.append(json.loads(line.strip()))
-                        except:
-                            pass
-            
-            buys = [t for t in grid_trades if t.get('action') == 'buy']
-            sells_tp = [t for t in grid_trades if t.get('action') == 'sell_tp']
-            sells_sl = [t for t in grid_trades if t.get('action') == 'sell_sl']
+            # Grid trade stats (indexed by action)
+            buys = LOG_STORE.count('grid', action='buy')
+            tp_exits = LOG_STORE.count('grid', action='sell_tp')
+            sl_exits = LOG_STORE.count('grid', action='sell_sl')
             
             grid_strat["stats"] = {
-                "total_trades": len(buys) + len(sells_tp) + len(sells_sl),
-                "buys": len(buys),
-                "tp_exits": len(sells_tp),
-                "sl_exits": len(sells_sl),
-                "win_rate": round(len(sells_tp) / max(len(sells_tp) + len(sells_sl), 1) * 100, 1),
+                "total_trades": buys + tp_exits + sl_exits,
+                "buys": buys,
+                "tp_exits": tp_exits,
+                "sl_exits": sl_exits,
+                "win_rate": round(tp_exits / max(tp_exits + sl_exits, 1) * 100, 1),
             }
             
             # Check if currently holding position (pid file + recent buy without sell)
-            if buys and len(buys) > len(sells_tp) + len(sells_sl):
-                last_buy = buys[-1]
+            if buys and buys > tp_exits + sl_exits:
+                last_buy = LOG_STORE.query('grid', action='buy')[-1]
                 grid_strat["position"] = {
                     "entry_time": last_buy.get('timestamp', ''),
                     "usdc_spent": last_buy.get('usdc_spent', 0),
@@ -487,85 +2529,818 @@ def update_portfolio_strategies():
     except Exception as e:
         print(f"  Error reading grid bot info: {e}")
     
-    # Add positions info from live_trader signal logs
+    # Per-strategy trade stats from the token index
     try:
-        # Read recent signal logs for CCI positions
-        signal_pattern = os.path.join(CONFIG['BOT_DATA_DIR'], 'signal_logs', 'signals_*.jsonl')
-        signal_files = sorted(glob.glob(signal_pattern))
-        
-        # Read trade logs for position tracking
-        trade_pattern = os.path.join(CONFIG['BOT_DATA_DIR'], 'trades', 'trades_*.jsonl')
-        trade_files = sorted(glob.glob(trade_pattern))
-        all_trades = []
-        for f in trade_files[-7:]:  # Last 7 days
-            with open(f) as fh:
-                for line in fh:
-                    try:
-                        all_trades.append(json.loads(line.strip()))
-                    except:
-                        pass
-        
-        # Calculate per-strategy stats
+        last_7_dates = LOG_STORE.values('trades', 'date')[-7:]  # Last 7 days with trades
+        traded_tokens = LOG_STORE.values('trades', 'token')
         for strat in strategies:
             if strat.get('strategy') == 'CCI':
-                symbol = strat.get('trade_symbol', '')
-                strat_trades = [t for t in all_trades if symbol.upper() in str(t.get('output_token', '')).upper() 
-                               or symbol.upper() in str(t.get('input_token', '')).upper()]
+                # シンボルを含むトークンをすべて数える（BTCUSDT の既定 'BTC' で WBTC も拾う）
+                symbol = strat.get('trade_symbol', '').upper()
+                tokens = [t for t in traded_tokens if symbol in t]
                 strat["stats"] = {
-                    "total_trades": len(strat_trades),
-                    "last_7d_trades": len(strat_trades),
+                    "total_trades": LOG_STORE.count('trades', token=tokens),
+                    "last_7d_trades": LOG_STORE.count('trades', token=tokens, date=last_7_dates),
                 }
     except Exception as e:
         print(f"  Error reading position data: {e}")
     
     output_path = os.path.join(CONFIG['OUTPUT_DIR'], 'strategies.json')
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(strategies, f, ensure_ascii=False, indent=2)
+    write_json(output_path, strategies)
     
     print(f"  Saved {len(strategies)} strategies to {output_path}")
     return strategies
 
 
-def main():
+# ─── パイプライン ───
+# inputs/outputs の対応から依存関係を決め、独立したステージは並列に実行する。
+# kind: 'cpu' はプロセスプール、'io' はスレッドプール（ネットワークや、共有ログストアを参照するステージ）
+# 入力の接頭辞: bot: は BOT_DATA_DIR、ws: は WORKSPACE_DIR からの glob、file: は絶対パス、
+# store: はメモリ上の共有データ（指紋には含めないので、元になるファイルも併記する）、
+# net: はネットワーク、proc: は実行中のプロセス（どちらも指紋が取れないので毎回実行）
+STAGES = {
+    'logs': {
+        'func': update_log_store,
+        'kind': 'io',
+        'inputs': ['bot:trades/trades_*.jsonl', 'bot:signal_logs/signals_*.jsonl', 'bot:trades/jgrid_*.jsonl'],
+        'outputs': ['store:logs'],
+        'summary': lambda r: {},
+    },
+    'trades': {
+        'func': update_trades_data,
+        'kind': 'io',
+        'inputs': ['store:logs', 'bot:trades/trades_*.jsonl'],
+        'outputs': ['trades.json'],
+        'summary': lambda r: {'trades_count': r},
+    },
+    'signals': {
+        'func': update_signals_data,
+        'kind': 'io',
+        'inputs': ['store:logs', 'bot:signal_logs/signals_*.jsonl'],
+        'outputs': ['signals/manifest.json'],
+        'summary': lambda r: {'signals_count': r},
+    },
+    'wallet': {
+        'func': update_wallet_data,
+        'kind': 'io',
+        'inputs': ['net:solana_rpc', 'net:coingecko'],
+        'outputs': ['wallet.json', 'equity.json'],
+        'summary': lambda r: {'wallet_total_usd': r.get('total_usd', 0)},
+    },
+    'pnl': {
+        'func': update_pnl_data,
+        'kind': 'io',
+        'inputs': ['trades.json', 'wallet.json'],
+        'outputs': ['pnl.json'],
+        'summary': lambda r: {'realized_pnl_usd': r['totals']['realized_usd'],
+                              'unrealized_pnl_usd': r['totals']['unrealized_usd']},
+    },
+    'tasks': {
+        'func': update_tasks_data,
+        'kind': 'cpu',
+        'inputs': ['ws:tasks.json'],
+        'outputs': ['tasks.json'],
+        'summary': lambda r: {'tasks_count': r['total_tasks']},
+    },
+    'daily_reports': {
+        'func': update_daily_reports_data,
+        'kind': 'io',
+        'inputs': ['ws:memory/????-??-??.md'],
+        'outputs': ['daily_reports.json'],
+        'summary': lambda r: {'daily_reports_count': r['count']},
+    },
+    'strategies': {
+        'func': update_portfolio_strategies,
+        'kind': 'io',
+        # processes.json（グリッドBotの生存状態）は毎回更新されるので、このステージも毎回実行される
+        'inputs': ['bot:../live_trader.py', 'bot:../jupiter_grid.py', 'store:logs', 'bot:trades/trades_*.jsonl',
+                   'bot:trades/jgrid_*.jsonl', 'processes.json'],
+        'outputs': ['strategies.json'],
+        'summary': lambda r: {},
+    },
+    'processes': {
+        'func': update_processes_data,
+        'kind': 'io',
+        'inputs': ['proc:bots'],
+        'outputs': ['processes.json'],
+        'summary': lambda r: {'processes_running': sum(p['running'] for p in r['processes'])},
+    },
+}
+
+def _init_worker(config):
+    """ワーカープロセスの初期化（spawn では親の CONFIG の変更を引き継がないので渡し直す）"""
+    CONFIG.update(config)
+
+def _run_stage(name):
+    """ワーカー内でステージを実行し、(サマリー項目, 所要秒数, メトリクス) を返す
+
+    結果本体はプロセス間で受け渡さず、summary.json に必要な値だけを返す。
+    ワーカープロセスではこのステージの分のメトリクスを返し、親プロセスで足し込む（スレッドでは None）。
+    """
+    in_worker = multiprocessing.parent_process() is not None
+    if in_worker:
+        METRICS.reset()  # このワーカーで前に実行したステージの分を数えない
+    _stage_context.name = name
+    started = time.perf_counter()
+    try:
+        result = STAGES[name]['func']()
+    finally:
+        _stage_context.name = None
+    seconds = time.perf_counter() - started
+    return STAGES[name]['summary'](result), seconds, METRICS.snapshot() if in_worker else None
+
+def with_dependencies(names):
+    """指定ステージに、その入力を生成するステージを（推移的に）加える"""
+    producers = {out: n for n in STAGES for out in STAGES[n]['outputs']}
+    selected = []
+    def visit(name):
+        if name in selected:
+            return
+        for i in STAGES[name]['inputs']:
+            if i in producers and producers[i] != name:
+                visit(producers[i])
+        selected.append(name)
+    for name in names:
+        visit(name)
+    return selected
+
+def with_dependents(names):
+    """指定ステージに、その出力ファイルを入力に持つステージを（推移的に）加える"""
+    selected = list(names)
+    for name in selected:
+        outputs = [out for out in STAGES[name]['outputs'] if not out.startswith('store:')]
+        for other in STAGES:
+            if other not in selected and any(out in STAGES[other]['inputs'] for out in outputs):
+                selected.append(other)
+    return [n for n in STAGES if n in selected]
+
+def stage_dependencies(names):
+    """各ステージが依存する（同じ実行に含まれる）ステージの集合"""
+    producers = {out: n for n in names for out in STAGES[n]['outputs']}
+    return {
+        n: {producers[i] for i in STAGES[n]['inputs'] if producers.get(i, n) != n}
+        for n in names
+    }
+
+def resolve_input(spec):
+    """入力指定を実ファイルのリストに解決（ファイルでない入力は None）"""
+    kind, _, target = spec.partition(':')
+    base = {'bot': CONFIG['BOT_DATA_DIR'], 'ws': CONFIG['WORKSPACE_DIR'], 'file': ''}.get(kind)
+    if base is None:
+        return None
+    return sorted(glob.glob(os.path.join(base, target)))
+
+def stage_fingerprint(name, memo=None):
+    """ステージ入力（ファイルの size / mtime、依存ステージの入力）の指紋
+
+    ネットワーク入力を含むステージは None（毎回実行）。
+    """
+    memo = {} if memo is None else memo
+    if name in memo:
+        return memo[name]
+    producers = {out: n for n in STAGES for out in STAGES[n]['outputs']}
+    digest = hashlib.sha1()
+    fingerprint = None
+    for spec in STAGES[name]['inputs']:
+        if spec.startswith('store:'):
+            continue
+        if spec in producers:
+            upstream = stage_fingerprint(producers[spec], memo)
+            if upstream is None:
+                break
+            digest.update(f'{spec}={upstream}\n'.encode())
+            continue
+        paths = resolve_input(spec)
+        if paths is None:
+            break
+        digest.update(f'{spec}:{len(paths)}\n'.encode())
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            digest.update(f'{path}|{st.st_size}|{st.st_mtime_ns}\n'.encode())
+    else:
+        fingerprint = digest.hexdigest()
+    memo[name] = fingerprint
+    return fingerprint
+
+def plan_stages(names, force=False):
+    """入力が前回から変わっていないステージを除き、(実行するステージ, 指紋) を返す"""
+    saved = load_state('stage_inputs')
+    memo = {}
+    fingerprints = {n: stage_fingerprint(n, memo) for n in names}
+
+    def outputs_exist(n):
+        return all(os.path.exists(os.path.join(CONFIG['OUTPUT_DIR'], out))
+                   for out in STAGES[n]['outputs'] if not out.startswith('store:'))
+
+    to_run = {n for n in names
+              if force or fingerprints[n] is None or fingerprints[n] != saved.get(n) or not outputs_exist(n)}
+    # 共有ストアのようにメモリ上の出力を持つステージは、依存するステージが実行されるなら実行する
+    deps = stage_dependencies(names)
+    for n in reversed(names):
+        if n in to_run:
+            to_run.update(d for d in deps[n]
+                          if any(out.startswith('store:') for out in STAGES[d]['outputs']))
+    return to_run, fingerprints
+
+def run_pipeline(names, max_workers=None, force=False, use_processes=True):
+    """依存関係を満たしたステージから並列実行し、(サマリー項目, ステージ結果) を返す
+
+    入力の指紋が前回と同じステージは実行せず 'unchanged' とする（force で無効化）。
+    use_processes=False ではすべてスレッドで実行する（常駐モードでメモリ上の状態を共有するため）。
+    cpu ステージのプロセスは spawn で起動する（他のスレッドが持っていたロックを fork で引き継がないため）。
+    """
+    deps = stage_dependencies(names)
+    to_run, fingerprints = plan_stages(names, force)
+    cpu_stages = [n for n in to_run if STAGES[n]['kind'] == 'cpu'] if use_processes else []
+    saved = load_state('stage_inputs')
+    pending = set(names)
+    running = {}
+    summary_fields = {}
+    results = {}
+
+    if cpu_stages:
+        processes = ProcessPoolExecutor(max_workers=min(max_workers or len(cpu_stages), len(cpu_stages)),
+                                        mp_context=multiprocessing.get_context('spawn'),
+                                        initializer=_init_worker, initargs=(dict(CONFIG),))
+    else:
+        processes = ThreadPoolExecutor(1)
+    with processes, ThreadPoolExecutor(max_workers=max_workers) as threads:
+        while pending or running:
+            progressed = False
+            for name in [n for n in names if n in pending]:
+                if any(results.get(d, {}).get('status') not in ('ok', 'unchanged') for d in deps[name]):
+                    if all(d in results for d in deps[name]):
+                        # 依存ステージが失敗したのでスキップ
+                        pending.discard(name)
+                        results[name] = {'status': 'skipped', 'seconds': 0}
+                        print(f"  Skipping {name}: dependency failed")
+                        progressed = True
+                    continue
+                pending.discard(name)
+                progressed = True
+                METRICS.cache('stage_inputs', name not in to_run)
+                if name not in to_run:
+                    results[name] = {'status': 'unchanged', 'seconds': 0}
+                    print(f"  Skipping {name}: inputs unchanged")
+                    continue
+                pool = processes if name in cpu_stages else threads
+                running[pool.submit(_run_stage, name)] = (name, time.perf_counter())
+
+            if not running:
+                if pending and not progressed:
+                    raise RuntimeError(f"Circular stage dependencies: {', '.join(sorted(pending))}")
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, submitted = running.pop(future)
+                try:
+                    fields, seconds, worker_metrics = future.result()
+                    if worker_metrics:
+                        METRICS.merge(worker_metrics)
+                    summary_fields.update(fields)
+                    results[name] = {'status': 'ok', 'seconds': round(seconds, 3)}
+                    if fingerprints[name] is not None:
+                        saved[name] = fingerprints[name]
+                except Exception as e:
+                    print(f"  ❌ Stage {name} failed: {e}")
+                    results[name] = {'status': 'failed', 'seconds': round(time.perf_counter() - submitted, 3),
+                                     'error': str(e)}
+                    saved.pop(name, None)
+
+    save_state('stage_inputs', saved)
+    for name in names:
+        METRICS.inc('stage_runs_total', stage=name, status=results[name]['status'])
+        if results[name]['status'] in ('ok', 'failed'):
+            METRICS.observe('stage_duration_seconds', results[name]['seconds'], STAGE_DURATION_BUCKETS, stage=name)
+            METRICS.set('stage_last_duration_seconds', results[name]['seconds'], stage=name)
+    return summary_fields, {n: results[n] for n in names}
+
+def update_output_manifest():
+    """data/ 以下の各ファイルのバージョンと ETag を manifest.json に書き出す
+
+    size / mtime が変わったファイルだけハッシュを計算し直す。
+    """
+    state = load_state('output_manifest')
+    files = {}
+    root = CONFIG['OUTPUT_DIR']
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            if not filename.endswith('.json') or filename.startswith('.'):
+                continue
+            path = os.path.join(dirpath, filename)
+            rel = os.path.relpath(path, root).replace(os.sep, '/')
+            if rel == 'manifest.json':
+                continue
+            st = os.stat(path)
+            prev = state.get(rel)
+            unchanged = prev and prev['size'] == st.st_size and prev['mtime_ns'] == st.st_mtime_ns
+            METRICS.cache('output_manifest', unchanged)
+            if unchanged:
+                files[rel] = prev
+                continue
+            sha = file_sha256(path)
+            version = prev['version'] + (prev['sha256'] != sha) if prev else 1
+            files[rel] = {'sha256': sha, 'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'version': version}
+    save_state('output_manifest', files)
+
+    manifest = {
+        'generated_at': datetime.now().isoformat(),
+        'files': {
+            rel: {
+                'version': info['version'],
+                'etag': f'"{info["sha256"][:16]}"',
+                'size': info['size'],
+                'modified': datetime.fromtimestamp(info['mtime_ns'] / 1e9).isoformat(),
+            }
+            for rel, info in sorted(files.items())
+        },
+    }
+    write_json(os.path.join(root, 'manifest.json'), manifest)
+    return manifest
+
+def parse_args(argv=None):
+    """コマンドライン引数"""
+    parser = argparse.ArgumentParser(description='Clawdia Dashboard Data Updater')
+    parser.add_argument('--only', metavar='STAGES',
+                        help=f"実行するステージをカンマ区切りで指定 ({','.join(STAGES)})")
+    parser.add_argument('--workers', type=int, default=None, help='プールごとの最大ワーカー数')
+    parser.add_argument('--force', action='store_true', help='入力が変わっていないステージも実行する')
+    parser.add_argument('--watch', action='store_true',
+                        help='常駐してファイル変更に反応する（wallet は WATCH_TIMERS の間隔で更新）')
+    parser.add_argument('--serve', type=int, metavar='PORT',
+                        help='--watch に加えて静的ファイルを配信し、変更を /events (SSE) で通知する')
+    parser.add_argument('--host', default='127.0.0.1',
+                        help='--serve の待ち受けアドレス（既定はローカルのみ。外部に公開する場合は 0.0.0.0）')
+    parser.add_argument('--precompress', metavar='FORMATS',
+                        help="圧縮済みの兄弟ファイルも書き出す (gz,br)")
+    args = parser.parse_args(argv)
+
+    if args.precompress:
+        formats = [f.strip() for f in args.precompress.split(',') if f.strip()]
+        unknown = [f for f in formats if f not in COMPRESSED_SUFFIXES]
+        if unknown:
+            parser.error(f"unknown format(s): {', '.join(unknown)} (choose from gz, br)")
+        if 'br' in formats and brotli is None:
+            print("brotli module not installed, skipping .br output")
+        CONFIG['PRECOMPRESS'] = formats
+
+    args.stages = list(STAGES)
+    if args.only:
+        args.stages = [n.strip() for n in args.only.split(',') if n.strip()]
+        unknown = [n for n in args.stages if n not in STAGES]
+        if unknown:
+            parser.error(f"unknown stage(s): {', '.join(unknown)} (choose from {', '.join(STAGES)})")
+        args.stages = with_dependencies(args.stages)
+    return args
+
+def run_update(names, max_workers=None, force=False, use_processes=True):
+    """パイプラインを実行し、summary.json と manifest.json を更新する"""
+    # 各データを更新（独立したステージは並列）
+    started = time.perf_counter()
+    fields, stage_results = run_pipeline(names, max_workers, force, use_processes)
+    wall_seconds = time.perf_counter() - started
+    
+    # サマリー作成（今回実行しなかったステージの値は前回のものを引き継ぐ）
+    summary_path = os.path.join(CONFIG['OUTPUT_DIR'], 'summary.json')
+    summary = {
+        'trades_count': 0,
+        'signals_count': 0,
+        'tasks_count': 0,
+        'daily_reports_count': 0,
+        'wallet_total_usd': 0
+    }
+    try:
+        with open(summary_path, 'r', encoding='utf-8') as f:
+            summary.update(json.load(f))
+    except (OSError, ValueError):
+        pass
+    summary.update(fields)
+    summary['last_updated'] = datetime.now().isoformat()
+    summary['stages'] = {**summary.get('stages', {}), **stage_results}
+    summary['pipeline_seconds'] = round(wall_seconds, 3)
+    
+    write_json(summary_path, summary)
+    METRICS.set('pipeline_seconds', round(wall_seconds, 3))
+    METRICS.set('last_run_timestamp_seconds', round(time.time(), 3))
+    # metrics.json も manifest の対象なので、ETag がずれないよう先に書く
+    write_metrics()
+    update_output_manifest()
+
+    failed = [n for n, r in stage_results.items() if r['status'] not in ('ok', 'unchanged')]
+    print(f"\n{'⚠️ Update completed with errors' if failed else '✅ Update completed successfully!'}")
+    for name, r in stage_results.items():
+        print(f"  ⏱ {name}: {r['seconds']:.3f}s ({r['status']})")
+    print(f"  ⏱ total wall clock: {wall_seconds:.3f}s")
+    print(f"📊 {summary['trades_count']} trades, {summary['signals_count']} signals")
+    print(f"📋 {summary['tasks_count']} tasks, {summary['daily_reports_count']} daily reports")
+    print(f"💰 Portfolio: ${summary['wallet_total_usd']:.2f}")
+    return summary, stage_results
+
+def write_metrics():
+    """data/metrics.json（と METRICS_TEXTFILE があれば Prometheus 形式）を書き出す"""
+    metrics = {
+        'generated_at': datetime.now().isoformat(),
+        'cache_hit_rates': METRICS.cache_hit_rates(),
+        **METRICS.snapshot(),
+    }
+    write_json(os.path.join(CONFIG['OUTPUT_DIR'], 'metrics.json'), metrics)
+    if CONFIG['METRICS_TEXTFILE']:
+        # textfile collector が書き込み途中を読まないようリネームで置き換える
+        path = CONFIG['METRICS_TEXTFILE']
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(METRICS.prometheus())
+        os.replace(tmp_path, path)
+
+# ─── 常駐モード (--watch) ───
+class InotifyWatcher:
+    """inotify でディレクトリを監視（Linux、ctypes経由）"""
+
+    MASK = 0x2 | 0x8 | 0x40 | 0x80 | 0x100 | 0x200  # MODIFY | CLOSE_WRITE | MOVED_FROM/TO | CREATE | DELETE
+    EVENT = struct.Struct('iIII')
+
+    def __init__(self, dirs):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self.dirs = {}
+        for d in dirs:
+            wd = libc.inotify_add_watch(self.fd, os.fsencode(d), self.MASK)
+            if wd < 0:
+                print(f"  Cannot watch {d}: {os.strerror(ctypes.get_errno())}")
+                continue
+            self.dirs[wd] = d
+
+    def read(self, timeout):
+        """イベントのあったパスのリスト（timeout 秒までブロック）"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            buf = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return []
+        paths = []
+        offset = 0
+        while offset + self.EVENT.size <= len(buf):
+            wd, _, _, length = self.EVENT.unpack_from(buf, offset)
+            offset += self.EVENT.size
+            name = buf[offset:offset + length].rstrip(b'\0')
+            offset += length
+            if wd in self.dirs:
+                paths.append(os.path.join(self.dirs[wd], os.fsdecode(name)))
+        return paths
+
+class PollingWatcher:
+    """inotify が使えない環境用（size / mtime を定期的に比較）"""
+
+    def __init__(self, dirs, interval=2.0):
+        self.dirs = dirs
+        self.interval = interval
+        self.snapshot = self._scan()
+
+    def _scan(self):
+        snapshot = {}
+        for d in self.dirs:
+            try:
+                for entry in os.scandir(d):
+                    st = entry.stat()
+                    snapshot[entry.path] = (st.st_size, st.st_mtime_ns)
+            except OSError:
+                continue
+        return snapshot
+
+    def read(self, timeout):
+        time.sleep(max(0, min(timeout, self.interval)))
+        snapshot = self._scan()
+        changed = [p for p in set(snapshot) | set(self.snapshot) if snapshot.get(p) != self.snapshot.get(p)]
+        self.snapshot = snapshot
+        return changed
+
+def watch_targets():
+    """各ステージのファイル入力から (監視ディレクトリ, [(パターン, ステージ)]) を作る"""
+    dirs = set()
+    patterns = []
+    for name, stage in STAGES.items():
+        for spec in stage['inputs']:
+            kind, _, target = spec.partition(':')
+            base = {'bot': CONFIG['BOT_DATA_DIR'], 'ws': CONFIG['WORKSPACE_DIR'], 'file': ''}.get(kind)
+            if base is None:
+                continue
+            pattern = os.path.normpath(os.path.join(base, target))
+            patterns.append((pattern, name))
+            if os.path.isdir(os.path.dirname(pattern)):
+                dirs.add(os.path.dirname(pattern))
+    return sorted(dirs), patterns
+
+def watch(args, bus=None):
+    """ファイル変更に反応して影響のあるステージだけを再実行する常駐モード
+
+    bus を渡すと、各更新の差分を SSE で配信する。
+    """
+    global _state_cache
+    _state_cache = {}
+    # systemd / kill からの停止でも状態を書き出してから終了する
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    dirs, patterns = watch_targets()
+    try:
+        watcher = InotifyWatcher(dirs)
+        print(f"👀 Watching {len(watcher.dirs)} directories (inotify)")
+    except (OSError, AttributeError) as e:
+        watcher = PollingWatcher(dirs)
+        print(f"👀 Watching {len(dirs)} directories (polling, inotify unavailable: {e})")
+
+    debounce = CONFIG['WATCH_DEBOUNCE']
+    timers = {name: seconds for name, seconds in CONFIG['WATCH_TIMERS'].items() if name in args.stages}
+    file_stages = [n for n in args.stages if n not in timers]
+
+    def run(names, force=False):
+        try:
+            # 出力を読む下流のステージ（wallet → pnl など）も続けて更新する。
+            # タイマーで回すステージ（wallet / processes）は、ファイルのイベントから引き込まず
+            # 前回の出力をそのまま読ませる
+            selected = [n for n in with_dependents(names) if n in args.stages]
+            names = [n for n in with_dependencies(selected) if n not in timers or n in selected]
+            _, stage_results = run_update(names, args.workers, force, use_processes=False)
+            if bus:
+                publish_changes(bus, stage_results)
+        except Exception as e:
+            print(f"\n❌ Update failed: {e}")
+            traceback.print_exc()
+
+    # 初回のステージが unchanged で飛ばされてもストアは埋めておく（以降の更新を追記として扱える）
+    LOG_STORE.load()
+    run(args.stages, args.force)
+    now = time.monotonic()
+    next_timer = {name: now + seconds for name, seconds in timers.items()}
+    next_flush = now + CONFIG['WATCH_FLUSH_SECONDS']
+    changed = set()
+    first_event = last_event = None
+
+    try:
+        while True:
+            now = time.monotonic()
+            wakeups = list(next_timer.values()) + [next_flush]
+            if changed:
+                # 連続した書き込みはまとめる（ただし待ちすぎない）
+                wakeups.append(min(last_event + debounce, first_event + debounce * 5))
+            paths = watcher.read(max(0, min(wakeups) - now))
+            now = time.monotonic()
+
+            for path in paths:
+                path = os.path.normpath(path)
+                hit = {name for pattern, name in patterns if fnmatch.fnmatch(path, pattern)}
+                if hit & set(file_stages):
+                    changed |= hit & set(file_stages)
+                    first_event = first_event or now
+                    last_event = now
+
+            due = []
+            if changed and (now >= last_event + debounce or now >= first_event + debounce * 5):
+                due += sorted(changed)
+                changed = set()
+                first_event = last_event = None
+            for name, at in next_timer.items():
+                if now >= at:
+                    due.append(name)
+                    next_timer[name] = now + timers[name]
+            if due:
+                print(f"\n🔄 {datetime.now().strftime('%H:%M:%S')} updating: {', '.join(due)}")
+                run(due)
+            if now >= next_flush:
+                flush_states()
+                next_flush = now + CONFIG['WATCH_FLUSH_SECONDS']
+    except KeyboardInterrupt:
+        print("\nStopping watcher...")
+    finally:
+        flush_states()
+
+# ─── ライブ配信 (--serve) ───
+class EventBus:
+    """SSE クライアントへ変更イベントを配る"""
+
+    def __init__(self):
+        self.clients = set()
+        self.lock = threading.Lock()
+        self.seq = 0
+
+    def subscribe(self):
+        q = queue.Queue(maxsize=256)
+        with self.lock:
+            self.clients.add(q)
+        return q
+
+    def unsubscribe(self, q):
+        with self.lock:
+            self.clients.discard(q)
+
+    def publish(self, event, data):
+        payload = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+        with self.lock:
+            self.seq += 1
+            for q in self.clients:
+                try:
+                    q.put_nowait((self.seq, event, payload))
+                except queue.Full:
+                    pass  # 遅いクライアントは再接続時に全体を読み直す
+
+# 差分を送らず、ダッシュボードに読み直してもらう出力
+RELOAD_OUTPUTS = {
+    'pnl': 'pnl.json',
+    'tasks': 'tasks.json',
+    'daily_reports': 'daily_reports.json',
+    'strategies': 'strategies.json',
+    'processes': 'processes.json',
+}
+
+def read_output(name):
+    """書き出し済みの出力を読み直す（なければ None）"""
+    try:
+        with open(os.path.join(CONFIG['OUTPUT_DIR'], name), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"  Cannot read {name}: {e}")
+        return None
+
+def publish_changes(bus, stage_results):
+    """実行したステージの結果から差分イベントを作って配信する"""
+    ran = {name for name, r in stage_results.items() if r['status'] == 'ok'}
+    reload_files = [RELOAD_OUTPUTS[name] for name in RELOAD_OUTPUTS if name in ran]
+
+    # 切り詰め・ローテーションなど追記以外の変化は読み直してもらう
+    if 'trades' in ran:
+        if not LOG_STORE.appended.get('trades'):
+            reload_files.append('trades.json')
+        elif LOG_STORE.new.get('trades'):
+            bus.publish('trades', {'append': LOG_STORE.new['trades']})
+
+    if 'signals' in ran:
+        if not LOG_STORE.appended.get('signals'):
+            reload_files.append('signals/manifest.json')
+        elif LOG_STORE.new.get('signals'):
+            # 追記分は日別チャンクと同じ列形式で送り、manifest（件数・latest）は丸ごと差し替えてもらう
+            by_date = {}
+            for row in LOG_STORE.new['signals']:
+                by_date.setdefault(str(row.get('checked_at') or '')[:10], []).append(row)
+            bus.publish('signals', {
+                'append': [build_signal_chunk(date, rows) for date, rows in by_date.items()],
+                'manifest': read_output('signals/manifest.json'),
+            })
+
+    if 'wallet' in ran:
+        bus.publish('wallet', {'wallet': read_output('wallet.json')})
+
+    if reload_files:
+        bus.publish('reload', {'files': reload_files})
+
+# --serve で配信するダッシュボードのファイル（SERVED_DIRS は配下のファイルすべて）
+SERVED_FILES = ('index.html', 'dashboard.js', 'styles.css')
+SERVED_DIRS = ('data',)
+
+def served_path(route):
+    """URL のパス（エンコードされたまま）を配信するファイルの相対パスにする（対象外は None）
+
+    デコードしてから判定するので、%2e などで .state/ や親ディレクトリは指せない。
+    """
+    parts = [part for part in unquote(route).split('/') if part]
+    if not parts:
+        return 'index.html'
+    if any(part.startswith('.') or '\\' in part or '\0' in part for part in parts):
+        return None
+    if len(parts) == 1 and parts[0] in SERVED_FILES:
+        return parts[0]
+    if len(parts) > 1 and parts[0] in SERVED_DIRS:
+        return '/'.join(parts)
+    return None
+
+class LiveRequestHandler(SimpleHTTPRequestHandler):
+    """ダッシュボードの静的ファイル配信 + /events（Server-Sent Events）+ /metrics（Prometheus）
+
+    配信するのは SERVED_FILES / SERVED_DIRS だけで、作業ディレクトリの他のファイルは 404。
+    """
+
+    bus = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def end_headers(self):
+        # data/ 以下は常に再検証させる（manifest の ETag 付きURLはそのままキャッシュされる）
+        if self.path.startswith('/data/') and '?v=' not in self.path:
+            self.send_header('Cache-Control', 'no-cache')
+        super().end_headers()
+
+    def translate_path(self, path):
+        relative = served_path(urlsplit(path).path)
+        return os.path.join(self.directory, *relative.split('/')) if relative else ''
+
+    def send_head(self):
+        path = self.translate_path(self.path)
+        if not path or os.path.isdir(path):
+            self.send_error(404)
+            return None
+        return super().send_head()
+
+    def do_GET(self):
+        route = urlsplit(self.path).path
+        if route.startswith('/api/'):
+            return self.send_history(route[len('/api/'):], parse_qs(urlsplit(self.path).query))
+        if route == '/metrics':
+            return self.send_metrics()
+        if route != '/events':
+            return super().do_GET()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'keep-alive')
+        self.end_headers()
+        q = self.bus.subscribe()
+        try:
+            self.wfile.write(b'retry: 3000\n\n')
+            self.wfile.flush()
+            while True:
+                try:
+                    seq, event, payload = q.get(timeout=15)
+                    message = f'id: {seq}\nevent: {event}\ndata: {payload}\n\n'
+                except queue.Empty:
+                    message = ': ping\n\n'  # プロキシに切られないように
+                self.wfile.write(message.encode('utf-8'))
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            self.bus.unsubscribe(q)
+
+    def send_history(self, kind, params):
+        """/api/<trades|signals|grid|wallet>?token=&pair=&action=&date=&since=&until=&flag=&limit="""
+        if kind not in HistoryStore.LOG_KINDS + ('wallet',):
+            return self.send_error(404)
+        filters = {name: values[-1] for name, values in params.items()
+                   if name in ('token', 'pair', 'action', 'date', 'flag') and values}
+        try:
+            for name in ('since', 'until'):
+                if name in params:
+                    value = params[name][-1]
+                    filters[name] = int(value) if value.lstrip('-').isdigit() else to_epoch_ms(value)
+            limit = int(params['limit'][-1]) if 'limit' in params else None
+            if filters.get('flag') and filters['flag'] not in SIGNAL_FLAGS:
+                raise ValueError(f"unknown flag: {filters['flag']}")
+            if kind == 'wallet' and set(filters) - {'since', 'until'}:
+                raise ValueError('wallet supports since / until only')
+            body = json.dumps(HISTORY.query(kind, limit, **filters), ensure_ascii=False).encode('utf-8')
+        except (ValueError, sqlite3.Error) as e:
+            return self.send_error(400, str(e))
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_metrics(self):
+        """起動からの累計メトリクスを Prometheus のテキスト形式で返す"""
+        body = METRICS.prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def start_live_server(port, bus, host='127.0.0.1'):
+    """ダッシュボードを配信し /events でイベントを流すサーバーをバックグラウンドで起動"""
+    handler = type('Handler', (LiveRequestHandler,), {'bus': bus})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"🌐 Serving dashboard on http://{host}:{server.server_port} (live updates at /events)")
+    return server
+
+def main(argv=None):
     """メイン処理"""
+    args = parse_args(argv)
     print("🤖 Clawdia Dashboard Data Updater")
     print(f"Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     
     # 出力ディレクトリ作成
     ensure_output_dir()
     
+    if args.serve:
+        bus = EventBus()
+        start_live_server(args.serve, bus, args.host)
+        watch(args, bus)
+        return
+    if args.watch:
+        watch(args)
+        return
+    
     try:
-        # 各データを更新
-        trades = update_trades_data()
-        signals = update_signals_data()
-        wallet = update_wallet_data()
-        tasks = update_tasks_data()
-        daily_reports = update_daily_reports_data()
-        strategies = update_portfolio_strategies()
-        
-        # サマリー作成
-        summary = {
-            'last_updated': datetime.now().isoformat(),
-            'trades_count': len(trades),
-            'signals_count': len(signals),
-            'tasks_count': len(tasks),
-            'daily_reports_count': len(daily_reports),
-            'wallet_total_usd': wallet.get('total_usd', 0)
-        }
-        
-        summary_path = os.path.join(CONFIG['OUTPUT_DIR'], 'summary.json')
-        with open(summary_path, 'w', encoding='utf-8') as f:
-            json.dump(summary, f, ensure_ascii=False, indent=2)
-        
-        print(f"\n✅ Update completed successfully!")
-        print(f"📊 {summary['trades_count']} trades, {summary['signals_count']} signals")
-        print(f"📋 {summary['tasks_count']} tasks, {summary['daily_reports_count']} daily reports")
-        print(f"💰 Portfolio: ${summary['wallet_total_usd']:.2f}")
-        
+        run_update(args.stages, args.workers, args.force)
     except Exception as e:
         print(f"\n❌ Update failed: {e}")
-        import traceback
         traceback.print_exc()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()